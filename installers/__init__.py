@@ -10,10 +10,11 @@ import zipfile
 import invoke
 import packaging.version
 import pkg_resources
-import requests
 
 import shims
 
+from pythonup import httpclient
+
 
 VERSION = '3.6.8'
 
@@ -99,9 +100,12 @@ ASSETSDIR.mkdir(exist_ok=True)
 SHIMSDIR = ROOT.parent.joinpath('shims')
 
 
+HTTP_SESSION = httpclient.Session()
+
+
 def download_file(url, path):
     print('Downloading {}'.format(url))
-    response = requests.get(url, stream=True)
+    response = HTTP_SESSION.get(url, stream=True)
     response.raise_for_status()
     path.write_bytes(response.content)
 
@@ -186,6 +190,16 @@ def build_lib_python(libdir, arch):
         str(pythondir.joinpath('pythonup')),
     )
 
+    # Compile version definitions so lookups don't read every JSON file.
+    # Imported here since it needs winreg, and tasks load this module on any
+    # platform.
+    from pythonup import versions
+    packagedir = pythondir.joinpath('pythonup')
+    versions.compile_catalog(
+        path=packagedir.joinpath(versions.CATALOG_PATH.name),
+        versions_dir=packagedir.joinpath('versions'),
+    )
+
     # Write runtime configurations.
     with pythondir.joinpath('pythonup', 'installation.json').open('w') as f:
         json.dump({
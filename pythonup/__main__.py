@@ -21,18 +21,19 @@ def cli(ctx, version):
             ctx.exit(1)
 
 
-@cli.command(help='Install a Python version.')
-@click.argument('version')
+@cli.command(help='Install Python versions.')
+@click.argument('version', nargs=-1, required=True)
 @click.option(
-    '--use/--no-use', default=None, help='Use version after installation.',
+    '--use/--no-use', default=None, help='Use versions after installation.',
 )
 @click.option(
     '--file', 'from_file', type=click.Path(exists=True),
     help='Specify an installer to not downloading one.',
 )
-def install(**kwargs):
+@click.pass_context
+def install(ctx, **kwargs):
     from .operations.install import install
-    install(**kwargs)
+    install(ctx, **kwargs)
 
 
 @cli.command(help='Uninstall a Python version.')
@@ -59,8 +60,8 @@ def upgrade(ctx, **kwargs):
     upgrade(ctx, **kwargs)
 
 
-@cli.command(help='Download installer of given Python version.')
-@click.argument('version')
+@cli.command(help='Download installers of given Python versions.')
+@click.argument('version', nargs=-1, required=True)
 @click.option(
     '--dest', 'dest_dir', type=click.Path(exists=True, file_okay=False),
     help='Download installer to this directory.',
@@ -72,6 +73,68 @@ def download(ctx, **kwargs):
     download(ctx, **kwargs)
 
 
+@cli.group(help='Manage cached installers.')
+def cache():
+    pass
+
+
+@cache.command(name='list', help='List cached installers.')
+def cache_list(**kwargs):
+    from .operations.cache import list_
+    list_(**kwargs)
+
+
+@cache.command(
+    help='Remove least recently used installers until the cache fits.',
+    short_help='Evict old installers.',
+)
+@click.option(
+    '--max-size', type=click.IntRange(min=0), default=None,
+    help='Size limit in MiB (defaults to the configured limit).',
+)
+def prune(**kwargs):
+    from .operations.cache import prune
+    prune(**kwargs)
+
+
+@cache.command(help='Remove all cached installers.')
+def clear(**kwargs):
+    from .operations.cache import clear
+    clear(**kwargs)
+
+
+@cli.group(help='Export and import offline installer bundles.')
+def bundle():
+    pass
+
+
+@bundle.command(
+    name='export',
+    help='Write installers of Python versions into a bundle.',
+)
+@click.argument('version', nargs=-1, required=True)
+@click.option(
+    '-o', '--output', required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help='Path to write the bundle to.',
+)
+@click.pass_context
+def bundle_export(ctx, **kwargs):
+    from .operations.bundle import export
+    export(ctx, **kwargs)
+
+
+@bundle.command(
+    name='import',
+    help='Add installers from a bundle to the installer cache.',
+)
+@click.argument('bundle', type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def bundle_import(ctx, **kwargs):
+    from .operations.bundle import import_
+    import_(ctx, **kwargs)
+
+
 @cli.command(help='Set active Python versions.')
 @click.argument('version', nargs=-1)
 @click.option(
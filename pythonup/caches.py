@@ -0,0 +1,286 @@
+import contextlib
+import operator
+import os
+import time
+import re
+import shutil
+
+import attr
+
+from . import configs, locks, mirrors, utils
+
+
+# Size limit of the installer cache, in MiB, unless configured otherwise.
+DEFAULT_CACHE_SIZE_LIMIT = 1024
+
+# Number of concurrent connections per download, unless configured otherwise.
+DEFAULT_DOWNLOAD_SEGMENTS = 4
+
+# Partial downloads untouched for this long, in seconds, are abandoned.
+PARTIAL_MAX_AGE = 24 * 60 * 60
+
+MD5_SUM_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def is_valid_md5_sum(value):
+    """Check a checksum is safe to use as a path component in the cache.
+    """
+    return isinstance(value, str) and MD5_SUM_RE.fullmatch(value) is not None
+
+
+def check_md5_sum(md5_sum):
+    if not is_valid_md5_sum(md5_sum):
+        raise ValueError('invalid MD5 checksum: {!r}'.format(md5_sum))
+
+
+def check_filename(filename):
+    if filename in ('', '.', '..') or os.path.basename(filename) != filename:
+        raise ValueError('invalid installer filename: {!r}'.format(filename))
+
+
+@attr.s
+class CacheEntry:
+
+    md5_sum = attr.ib()
+    path = attr.ib()
+    size = attr.ib()
+    last_used = attr.ib()
+
+    @property
+    def name(self):
+        return self.path.name
+
+
+@attr.s
+class InstallerCache:
+    """Verified installers on disk, addressed by their MD5 checksums.
+
+    Each installer lives in ``<root>/<md5_sum>/<filename>``. The file's mtime
+    is bumped whenever the entry is used, and serves as the LRU timestamp for
+    eviction. Fetching an entry is guarded by a lock file, so concurrent
+    processes asking for the same installer share one transfer.
+    """
+    root = attr.ib()
+    size_limit = attr.ib(default=DEFAULT_CACHE_SIZE_LIMIT * 1024 * 1024)
+    segments = attr.ib(default=1)
+    downloader = attr.ib(default=utils.download_file)
+
+    def _get_entry_dir(self, md5_sum):
+        check_md5_sum(md5_sum)
+        return self.root.joinpath(md5_sum)
+
+    def _get_lock(self, md5_sum):
+        check_md5_sum(md5_sum)
+        return locks.FileLock(self.root.joinpath('{}.lock'.format(md5_sum)))
+
+    def _iter_entry_files(self, md5_sum):
+        try:
+            paths = list(self._get_entry_dir(md5_sum).iterdir())
+        except FileNotFoundError:
+            return
+        for path in paths:
+            # Hidden files are in-progress downloads.
+            if path.is_file() and not path.name.startswith('.'):
+                yield path
+
+    def get(self, md5_sum):
+        """Get path to a cached installer, or None if it is not cached.
+        """
+        for path in self._iter_entry_files(md5_sum):
+            with contextlib.suppress(OSError):
+                os.utime(str(path))
+            return path
+        return None
+
+    def fetch(self, url, md5_sum, *, filename=None, show_progress=True,
+              keep=frozenset()):
+        """Get path to a cached installer, downloading it if needed.
+
+        Entries with checksums in ``keep`` are not evicted to make room, so
+        installers fetched earlier in a batch stay available.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._get_lock(md5_sum):
+            # Another process may have fetched it while we were waiting.
+            path = self.get(md5_sum)
+            if path is None:
+                container = self._get_entry_dir(md5_sum)
+                container.mkdir(exist_ok=True)
+                path = self.downloader(
+                    url, filename=filename, container=container,
+                    verifier=utils.HashVerifier('md5', md5_sum),
+                    segments=self.segments, show_progress=show_progress,
+                )
+        self.prune(keep=keep | {md5_sum})
+        return path
+
+    def _store(self, md5_sum, filename, write, keep):
+        check_md5_sum(md5_sum)
+        check_filename(filename)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._get_lock(md5_sum):
+            path = self.get(md5_sum)
+            if path is None:
+                container = self._get_entry_dir(md5_sum)
+                container.mkdir(exist_ok=True)
+                path = container.joinpath(filename)
+                temp = container.joinpath('.{}.part'.format(filename))
+                verifier = utils.HashVerifier('md5', md5_sum)
+                try:
+                    write(temp, verifier)
+                    verifier.verify()
+                except BaseException:
+                    with contextlib.suppress(FileNotFoundError):
+                        temp.unlink()
+                    raise
+                os.replace(str(temp), str(path))
+        self.prune(keep=keep | {md5_sum})
+        return path
+
+    def ingest(self, source, md5_sum, *, keep=frozenset()):
+        """Copy a local installer into the cache, if it matches ``md5_sum``.
+
+        The file is copied with the OS's fast-copy path, and verified before
+        being moved into place. ``keep`` is as in :meth:`fetch`.
+        """
+        def write(temp, verifier):
+            utils.copy_file(source, temp)
+            utils.feed_file(temp, verifier)
+
+        return self._store(md5_sum, source.name, write, keep)
+
+    def ingest_stream(self, f, md5_sum, filename, *, keep=frozenset()):
+        """Write an installer from a file object into the cache.
+
+        The data is verified as it is written, in a single pass. ``keep`` is
+        as in :meth:`fetch`.
+        """
+        def write(temp, verifier):
+            with temp.open('wb') as out:
+                chunks = iter(lambda: f.read(utils.MAX_CHUNK_SIZE), b'')
+                utils.write_chunks(out, chunks, verifier=verifier)
+
+        return self._store(md5_sum, filename, write, keep)
+
+    def iter_entries(self):
+        try:
+            entry_dirs = [
+                p for p in self.root.iterdir()
+                if p.is_dir() and is_valid_md5_sum(p.name)
+            ]
+        except FileNotFoundError:
+            return
+        for entry_dir in entry_dirs:
+            for path in self._iter_entry_files(entry_dir.name):
+                stat = path.stat()
+                yield CacheEntry(
+                    md5_sum=entry_dir.name, path=path,
+                    size=stat.st_size, last_used=stat.st_mtime,
+                )
+
+    def _remove_entry_dir(self, md5_sum, *, blocking=True, partial=False):
+        """Remove an entry's directory and lock file.
+
+        Returns False if ``blocking`` is False and the entry is in use, or
+        if ``partial`` is True and the entry turns out to be complete.
+        """
+        lock = self._get_lock(md5_sum)
+        try:
+            lock.acquire(blocking=blocking)
+        except locks.LockUnavailable:
+            return False
+        try:
+            # A download may have finished since the caller looked.
+            if partial and any(self._iter_entry_files(md5_sum)):
+                return False
+            with contextlib.suppress(FileNotFoundError):
+                shutil.rmtree(str(self._get_entry_dir(md5_sum)))
+            # Windows can't remove a file we hold open. Try after release.
+            with contextlib.suppress(OSError):
+                lock.path.unlink()
+        finally:
+            lock.release()
+        with contextlib.suppress(OSError):
+            lock.path.unlink()
+        return True
+
+    def remove(self, entry):
+        self._remove_entry_dir(entry.md5_sum)
+
+    def remove_partials(self, max_age=PARTIAL_MAX_AGE):
+        """Remove leftovers of failed or interrupted downloads.
+
+        Entries without a complete installer are removed if nothing in them
+        was touched for ``max_age`` seconds, and lock files of entries that
+        no longer exist are removed. Entries being downloaded are skipped.
+        Returns checksums of removed entries.
+        """
+        try:
+            paths = list(self.root.iterdir())
+        except FileNotFoundError:
+            return []
+        names = {p.name for p in paths}
+        deadline = time.time() - max_age
+        removed = []
+        for path in paths:
+            if path.is_dir() and is_valid_md5_sum(path.name):
+                md5_sum = path.name
+                if any(self._iter_entry_files(md5_sum)):
+                    continue
+                try:
+                    mtimes = [p.stat().st_mtime for p in path.iterdir()]
+                    newest = max(mtimes, default=path.stat().st_mtime)
+                except FileNotFoundError:   # Changed while scanning.
+                    continue
+                if max_age and newest > deadline:
+                    continue
+            elif path.suffix == '.lock' and is_valid_md5_sum(path.stem):
+                md5_sum = path.stem
+                if md5_sum in names:
+                    continue
+            else:
+                continue
+            if self._remove_entry_dir(md5_sum, blocking=False, partial=True):
+                removed.append(md5_sum)
+        return removed
+
+    def prune(self, size_limit=None, *, keep=frozenset()):
+        """Evict least recently used entries until the cache fits.
+
+        Entries with checksums in ``keep`` are never evicted. Returns a list
+        of evicted entries.
+        """
+        if size_limit is None:
+            size_limit = self.size_limit
+        self.remove_partials()
+        entries = sorted(
+            self.iter_entries(), key=operator.attrgetter('last_used'),
+        )
+        total = sum(e.size for e in entries)
+        evicted = []
+        for entry in entries:
+            if total <= size_limit:
+                break
+            if entry.md5_sum in keep:
+                continue
+            self.remove(entry)
+            total -= entry.size
+            evicted.append(entry)
+        return evicted
+
+    def clear(self):
+        self.remove_partials(0)
+        return self.prune(0)
+
+
+def get_installer_cache():
+    limit = configs.get_setting('cache_size_limit', DEFAULT_CACHE_SIZE_LIMIT)
+    segments = configs.get_setting(
+        'download_segments', DEFAULT_DOWNLOAD_SEGMENTS,
+    )
+    return InstallerCache(
+        root=configs.get_cache_dir_path().joinpath('installers'),
+        size_limit=int(limit) * 1024 * 1024,
+        segments=max(int(segments), 1),
+        downloader=mirrors.get_mirror_pool().download_file,
+    )
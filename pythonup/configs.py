@@ -1,21 +1,112 @@
 import json
+import os
 import pathlib
 
+import attr
+
+from . import fileio, locks
+
+
+@attr.s
+class Configuration:
+    """Installation configuration, read from ``installation.json``.
+
+    The file is read once, when a value is first needed. Directories are
+    created and resolved on first use, and remembered afterwards.
+    """
+    path = attr.ib()
+    _values = attr.ib(init=False, default=None, repr=False)
+    _directories = attr.ib(init=False, default=attr.Factory(dict), repr=False)
+
+    def get_value(self, key):
+        if self._values is None:
+            with self.path.open() as f:
+                self._values = json.load(f)
+        return self._values[key]
+
+    def get_directory(self, key):
+        try:
+            return self._directories[key]
+        except KeyError:
+            pass
+        path = self.path.parent.joinpath(self.get_value(key))
+        path.mkdir(parents=True, exist_ok=True)
+        path = path.resolve(strict=True)
+        self._directories[key] = path
+        return path
+
+    def get_link_directory(self, key):
+        """Get a directory that may be a link, without following the link.
+
+        The parent is resolved, and the directory is created if missing.
+        """
+        try:
+            return self._directories[key]
+        except KeyError:
+            pass
+        path = self.path.parent.joinpath(self.get_value(key))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path = path.parent.resolve(strict=True).joinpath(path.name)
+        if not os.path.lexists(str(path)):
+            path.mkdir()
+        self._directories[key] = path
+        return path
+
+    def get_subdirectory(self, key, name):
+        """Get a directory inside a configured one, creating it if needed.
+        """
+        cache_key = (key, name)
+        try:
+            return self._directories[cache_key]
+        except KeyError:
+            pass
+        path = self.get_directory(key).joinpath(name)
+        path.mkdir(exist_ok=True)
+        self._directories[cache_key] = path
+        return path
+
+
+_configuration = None
+
+
+def get_configuration():
+    global _configuration
+    if _configuration is None:
+        _configuration = Configuration(
+            path=pathlib.Path(__file__).with_name('installation.json'),
+        )
+    return _configuration
+
+
+def invalidate():
+    """Forget loaded configuration, so it is read again on next access.
+    """
+    global _configuration, _conf
+    _configuration = None
+    _conf = None
+
 
 def get_value(key):
-    with pathlib.Path(__file__).with_name('installation.json').open() as f:
-        data = json.load(f)
-    return data[key]
+    return get_configuration().get_value(key)
 
 
 def get_directory(key):
-    path = pathlib.Path(__file__).parent.joinpath(get_value(key))
-    path.mkdir(parents=True, exist_ok=True)
-    return path.resolve(strict=True)
+    return get_configuration().get_directory(key)
+
+
+def get_base_dir_path():
+    return get_directory('base_dir')
 
 
 def get_scripts_dir_path():
-    return get_directory('scripts_dir')
+    # This is a link to a materialized directory. Don't resolve it, so the
+    # path stays the same when the link is switched.
+    return get_configuration().get_link_directory('scripts_dir')
+
+
+def get_scripts_store_path():
+    scripts_dir = get_scripts_dir_path()
+    return scripts_dir.with_name('{}.d'.format(scripts_dir.name))
 
 
 def get_cmd_dir_path():
@@ -30,27 +121,92 @@ def get_shim_path():
     return get_directory('shims_dir').joinpath('shim.exe')
 
 
+def get_cache_dir_path():
+    return get_configuration().get_subdirectory('base_dir', 'cache')
+
+
 def get_conf_path():
-    path = get_directory('base_dir').joinpath('config')
-    path.touch(mode=0o644, exist_ok=True)
-    return path
+    return get_base_dir_path().joinpath('config')
 
 
 def safe_load(f):
     try:
-        return json.load(f)
+        data = json.load(f)
     except json.JSONDecodeError:
         return {}
+    if not isinstance(data, dict):
+        return {}
+    return data
+
+
+def get_conf_stamp(path):
+    """Identify a version of the config file, or None if there is none.
+
+    The file is always replaced, never written in place, so each version is
+    a new file.
+    """
+    try:
+        stat = os.stat(str(path))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def read_conf(path):
+    try:
+        f = path.open()
+    except FileNotFoundError:
+        return {}
+    with f:
+        return safe_load(f)
+
+
+# Last read config, as (path, stamp, data).
+_conf = None
+
+
+def load_conf():
+    """Read the config file, or reuse it if it has not changed since.
+
+    This does not take the lock. Writes replace the file atomically, so a
+    reader sees either the old or new version in whole.
+    """
+    global _conf
+    path = get_conf_path()
+    stamp = get_conf_stamp(path)
+    if stamp is None:
+        return {}
+    if _conf is not None and _conf[:2] == (path, stamp):
+        return _conf[2]
+    data = read_conf(path)
+    _conf = (path, stamp, data)
+    return data
+
+
+def update_conf(update):
+    """Change the config file.
+
+    ``update`` is called with the current values, and should change them in
+    place. Writers are serialized with a lock, so concurrent changes to
+    different keys are not lost.
+    """
+    path = get_conf_path()
+    with locks.FileLock(path.with_name('config.lock')):
+        data = read_conf(path)
+        update(data)
+        fileio.write_json_atomic(path, data)
+
+
+def get_setting(key, default=None):
+    return load_conf().get(key, default)
 
 
 def get_active_names():
-    with get_conf_path().open() as f:
-        data = safe_load(f)
-    return data.get('using', [])
+    return load_conf().get('using', [])
 
 
 def set_active_names(names):
-    with get_conf_path().open('w+') as f:
-        data = safe_load(f)
-        data['using'] = names
-        json.dump(data, f)
+    def update(data):
+        data['using'] = list(names)
+
+    update_conf(update)
@@ -0,0 +1,56 @@
+"""Reading and writing PythonUp's JSON state files.
+
+Files are replaced atomically, so a concurrent reader sees either the old
+or the new content in whole. Only the standard library is used here, so
+:mod:`pythonup.relink` can use this without loading the rest of PythonUp.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+
+# Attempts to replace a file. On Windows, this fails while another process
+# has the file open to read it.
+REPLACE_ATTEMPTS = 20
+
+
+def replace_file(source, target):
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(str(source), str(target))
+        except PermissionError:
+            if attempt + 1 >= REPLACE_ATTEMPTS:
+                raise
+            time.sleep(0.05)
+        else:
+            return
+
+
+def write_json_atomic(path, data):
+    """Write ``data`` as JSON to ``path`` via a temporary file.
+
+    The temporary file is removed if anything fails.
+    """
+    fd, temp_name = tempfile.mkstemp(
+        dir=os.path.dirname(str(path)),
+        prefix='.{}.'.format(os.path.basename(str(path))), suffix='.tmp',
+    )
+    try:
+        with open(fd, 'w') as f:
+            json.dump(data, f)
+        replace_file(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def read_json(path, default=None):
+    """Read JSON from ``path``, or ``default`` if it is missing or invalid.
+    """
+    try:
+        with open(str(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
@@ -0,0 +1,76 @@
+import threading
+
+import requests
+import requests.adapters
+import urllib3.util.retry
+
+from . import configs
+
+
+DEFAULT_POOL_SIZE = 16
+
+# Connect and read timeouts, in seconds.
+DEFAULT_TIMEOUT = (10, 60)
+
+DEFAULT_RETRIES = 3
+
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+# Transient server-side statuses worth retrying.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class Session(requests.Session):
+    """A session with pooled keep-alive connections, retries, and timeouts.
+
+    Connections are reused across requests to the same host, so only the
+    first request pays for the TCP and TLS handshakes. Connection errors and
+    transient server errors are retried with exponential backoff. Errors in
+    the middle of a response body are not retried here; callers streaming a
+    download should resume it themselves.
+    """
+    def __init__(self, *, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR):
+        super().__init__()
+        self.timeout = timeout
+        retry = urllib3.util.retry.Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            raise_on_status=False,
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def get_options():
+    timeout = configs.get_setting('http_timeout')
+    return {
+        'pool_size': configs.get_setting('http_pool_size', DEFAULT_POOL_SIZE),
+        'timeout': DEFAULT_TIMEOUT if timeout is None else timeout,
+        'retries': configs.get_setting('http_retries', DEFAULT_RETRIES),
+    }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Get the process-wide session, configured by user settings.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = Session(**get_options())
+        return _session
@@ -3,11 +3,101 @@ import contextlib
 import itertools
 import os
 import pathlib
-import re
 import subprocess
+import threading
 
 import attr
 
+from . import configs, fileio, peinfo
+
+
+# Prints everything we want to know about an interpreter as a Python literal.
+# This needs to work on every Python version PythonUp can install.
+PROBE_SCRIPT = (
+    'import sys, sysconfig; '
+    'print(repr((tuple(sys.version_info[:3]), sys.maxsize <= 2 ** 32, '
+    'sys.prefix, sysconfig.get_path("scripts"))))'
+)
+
+
+@attr.s
+class ProbeResult:
+
+    version_info = attr.ib(converter=tuple)
+    is_32bit = attr.ib()
+    prefix = attr.ib()
+    scripts_dir = attr.ib()
+
+
+def run_probe(python):
+    """Run an interpreter to find out about it.
+    """
+    output = subprocess.check_output(
+        [str(python), '-c', PROBE_SCRIPT], encoding='utf-8',
+    )
+    version_info, is_32bit, prefix, scripts_dir = ast.literal_eval(
+        output.strip(),
+    )
+    return ProbeResult(
+        version_info=version_info, is_32bit=bool(is_32bit),
+        prefix=prefix, scripts_dir=scripts_dir,
+    )
+
+
+@attr.s
+class ProbeCache:
+    """Results of interpreter probes, saved to ``path``.
+
+    A result is reused as long as the interpreter's size and mtime are
+    unchanged, so an interpreter is only run again after it is replaced.
+    """
+    path = attr.ib()
+    prober = attr.ib(default=run_probe)
+    _entries = attr.ib(init=False, default=None, repr=False)
+    _lock = attr.ib(
+        init=False, default=attr.Factory(threading.Lock), repr=False,
+    )
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = fileio.read_json(self.path, {})
+        return self._entries
+
+    def _save(self):
+        fileio.write_json_atomic(self.path, self._entries)
+
+    def get(self, python):
+        stat = python.stat()
+        key = os.path.normcase(str(python))
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            return ProbeResult(**entry['result'])
+        result = self.prober(python)
+        with self._lock:
+            self._load()[key] = {
+                'fingerprint': fingerprint,
+                'result': attr.asdict(result),
+            }
+            self._save()
+        return result
+
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+
+def get_probe_cache():
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = ProbeCache(
+                path=configs.get_base_dir_path().joinpath('probes.json'),
+            )
+        return _probe_cache
+
 
 @attr.s
 class Installation:
@@ -26,23 +116,37 @@ class Installation:
     def pip(self):
         return self.scripts_dir.joinpath('pip.exe')
 
+    def probe(self):
+        return get_probe_cache().get(self.python)
+
+    def _iter_version_binaries(self):
+        yield self.python
+        # Older versions only carry version resources in the DLL. Try
+        # pythonXY.dll before python3.dll.
+        dlls = self.path.glob('python[0-9]*.dll')
+        yield from sorted(dlls, key=lambda p: (-len(p.name), p.name))
+
     def get_version_info(self):
-        # TODO: Remove stderr redirection after dropping older Pythons.
-        output = subprocess.check_output(
-            [str(self.python), '--version'],
-            stderr=subprocess.STDOUT, encoding='ascii',
-        ).strip()
-        match = re.match(r'^Python (\d+)\.(\d+)\.(\d+)$', output)
-        return tuple(int(x) for x in match.groups())
+        """Read the interpreter's version, running it only if needed.
+        """
+        for path in self._iter_version_binaries():
+            try:
+                info = peinfo.read_pe_info(path)
+            except (OSError, peinfo.PEFormatError):
+                continue
+            if info.file_version is not None:
+                return info.python_version_info
+        return self.probe().version_info
 
     def is_32bit(self):
-        """Ask the interpreter about its bitness.
+        """Find the interpreter's bitness, running it only if needed.
 
         The return value should match :ref:`.metadata.is_python_32bit()`.
         """
-        return bool(ast.eval_literal(subprocess.check_output([
-            self.python, '-c', '"import sys; print(sys.maxsize <= 2 ** 32)"',
-        ]).strip()))
+        try:
+            return peinfo.read_pe_info(self.python).is_32bit
+        except (OSError, peinfo.PEFormatError):
+            return self.probe().is_32bit
 
     def find_script(self, name):
         names = itertools.chain([name], [
@@ -0,0 +1,154 @@
+import os
+import time
+
+try:
+    import msvcrt
+except ImportError:     # Not on Windows.
+    msvcrt = None
+    import fcntl
+
+
+class LockUnavailable(OSError):
+    pass
+
+
+def _lock(f, *, blocking):
+    if msvcrt is None:
+        flags = fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(f.fileno(), flags)
+        except BlockingIOError:
+            raise LockUnavailable(f.name)
+        return
+
+    # msvcrt.LK_LOCK gives up after ~10 seconds, so we do our own polling.
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if not blocking:
+                raise LockUnavailable(f.name)
+            time.sleep(0.05)
+        else:
+            return
+
+
+def _unlock(f):
+    if msvcrt is None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """An exclusive lock held on ``path`` across processes.
+
+    The lock file is created if needed. A holder may remove it before
+    release; contenders waiting on the removed file then retry with a new
+    one.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __repr__(self):
+        return 'FileLock({!r})'.format(str(self.path))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def _is_current(self, f):
+        try:
+            stat = os.stat(str(self.path))
+        except FileNotFoundError:
+            return False
+        return os.path.samestat(os.fstat(f.fileno()), stat)
+
+    def acquire(self, *, blocking=True):
+        while True:
+            f = open(str(self.path), 'a+b')
+            try:
+                f.seek(0)
+                _lock(f, blocking=blocking)
+            except BaseException:
+                f.close()
+                raise
+            # The file may be removed by its previous holder while we wait
+            # for it. Contenders must all lock the same file, so start over.
+            if self._is_current(f):
+                break
+            _unlock(f)
+            f.close()
+        self._file = f
+
+    def release(self):
+        f, self._file = self._file, None
+        if f is None:
+            return
+        try:
+            _unlock(f)
+        finally:
+            f.close()
+
+
+class Coalescer:
+    """Run a task in one process at a time, coalescing concurrent requests.
+
+    A request marks the task dirty, and runs it if no other process is. If
+    one is, the request returns immediately, and the running process runs
+    the task again before it exits, covering all requests made meanwhile.
+    This suits tasks that bring something up to date, where a run reflects
+    everything that happened before it started.
+    """
+    def __init__(self, lock, dirty_path):
+        self.lock = lock
+        self.dirty_path = dirty_path
+
+    def __repr__(self):
+        return 'Coalescer({!r}, {!r})'.format(self.lock, str(self.dirty_path))
+
+    def _mark_dirty(self):
+        open(str(self.dirty_path), 'ab').close()
+
+    def _clear_dirty(self):
+        """Clear the dirty flag. Returns whether it was set.
+        """
+        try:
+            os.unlink(str(self.dirty_path))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def request(self, task):
+        """Request the task to run.
+
+        Returns True if it is run in this process, False if left to another.
+        """
+        self._mark_dirty()
+        ran = False
+        while True:
+            try:
+                self.lock.acquire(blocking=False)
+            except LockUnavailable:
+                return ran
+            try:
+                while self._clear_dirty():
+                    task()
+                    ran = True
+            finally:
+                self.lock.release()
+            # A request made after the last check, but before the release,
+            # found the lock taken, and left it to us.
+            if not os.path.exists(str(self.dirty_path)):
+                return ran
@@ -0,0 +1,105 @@
+import hashlib
+
+import attr
+
+from . import fileio
+
+
+# Bump this when the manifest layout changes.
+MANIFEST_FORMAT = 1
+
+
+def get_stat_fingerprint(stat):
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def get_stat(path):
+    """Fingerprint a source file as ``[size, mtime_ns, inode]``.
+
+    On Windows, stat results from ``os.scandir`` have no inode. Fingerprints
+    from those are compared by size and mtime only; see :func:`same_stat`.
+    """
+    return get_stat_fingerprint(path.stat())
+
+
+def same_stat(a, b):
+    """Compare two source fingerprints.
+
+    An inode of 0 means it is unknown, so only size and mtime are compared.
+    """
+    if len(a) > 2 and len(b) > 2 and a[2] and b[2]:
+        return a == b
+    return a[:2] == b[:2]
+
+
+def get_target_stat(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def get_file_digest(path):
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def get_data_digest(data):
+    return hashlib.md5(data).hexdigest()
+
+
+@attr.s
+class ManifestEntry:
+    """A script published into the scripts directory.
+
+    ``kind`` is either ``file`` (a copy of ``source``) or ``shim`` (a shim
+    launching ``source``). ``digest`` is the MD5 of the copied file, or of
+    the shim's command data.
+    """
+    kind = attr.ib()
+    source = attr.ib()
+    source_stat = attr.ib(converter=list)
+    digest = attr.ib()
+    target_stat = attr.ib(converter=list)
+
+
+@attr.s
+class Manifest:
+    """Record of scripts published into the scripts directory.
+
+    ``sources`` maps directories read and written by the last activation to
+    their mtimes, or is None if unknown. ``loaded`` is False if there was no
+    usable manifest on disk, in which case nothing is known about what is in
+    the directory.
+    """
+    path = attr.ib()
+    entries = attr.ib(default=attr.Factory(dict))
+    shim_stat = attr.ib(default=None)
+    sources = attr.ib(default=None)
+    loaded = attr.ib(default=False)
+
+    def save(self):
+        data = {
+            'format': MANIFEST_FORMAT,
+            'shim_stat': self.shim_stat,
+            'sources': self.sources,
+            'entries': {
+                name: attr.asdict(entry)
+                for name, entry in sorted(self.entries.items())
+            },
+        }
+        fileio.write_json_atomic(self.path, data)
+
+
+def load_manifest(path):
+    data = fileio.read_json(path)
+    try:
+        if data['format'] != MANIFEST_FORMAT:
+            raise ValueError(data['format'])
+        entries = {
+            name: ManifestEntry(**entry)
+            for name, entry in data['entries'].items()
+        }
+    except (ValueError, KeyError, TypeError):
+        return Manifest(path=path)
+    return Manifest(
+        path=path, entries=entries, shim_stat=data.get('shim_stat'),
+        sources=data.get('sources'), loaded=True,
+    )
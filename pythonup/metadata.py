@@ -3,60 +3,17 @@ import struct
 import sys
 import winreg
 
-
-PYTHON_KEY_PATHS = [
-    (winreg.HKEY_CURRENT_USER, 'Software\\Python\\PythonCore'),
-    (winreg.HKEY_LOCAL_MACHINE, 'Software\\Python\\PythonCore'),
-    (winreg.HKEY_LOCAL_MACHINE, 'Software\\Wow6432Node\\Python\\PythonCore'),
-]
+from . import registry
 
 
 def get_install_path(name):
-    for root, prefix in PYTHON_KEY_PATHS:
-        keypath = '{}\\{}\\InstallPath'.format(prefix, name)
-        try:
-            key = winreg.OpenKey(root, keypath)
-        except FileNotFoundError:
-            continue
-        install_path, _ = winreg.QueryValueEx(key, '')
-        winreg.CloseKey(key)
-        return pathlib.Path(install_path).resolve(strict=True)
-    raise FileNotFoundError(
-        'Software\\Python\\PythonCore\\{}\\InstallPath'.format(name),
-    )
-
-
-def find_uninstaller_id(name):
-    # Look for EVERY entry in the uninstaller list to find one that looks like
-    # the matching version's uninstaller. This is crazy, but the best way I
-    # can think of right now. And it's still faster than downloading the MSI.
-    key = winreg.OpenKey(
-        winreg.HKEY_LOCAL_MACHINE,
-        'Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall',
-    )
-
-    match = None
-    subkey_count, _, _ = winreg.QueryInfoKey(key)
-    for i in range(subkey_count):
-        sub_name = winreg.EnumKey(key, i)
-        subkey = winreg.OpenKey(key, sub_name)
-        try:
-            display_name, _ = winreg.QueryValueEx(subkey, 'DisplayName')
-            publisher, _ = winreg.QueryValueEx(subkey, 'Publisher')
-        except FileNotFoundError:
-            continue
-        finally:
-            winreg.CloseKey(subkey)
-        if (display_name.startswith('Python {}.'.format(name)) and
-                publisher == 'Python Software Foundation'):
-            match = sub_name
-            break
-
-    winreg.CloseKey(key)
-
-    if not match:
-        raise FileNotFoundError
-    return match
+    try:
+        install_path = registry.get_install_paths()[name]
+    except KeyError:
+        raise FileNotFoundError(
+            'Software\\Python\\PythonCore\\{}\\InstallPath'.format(name),
+        )
+    return pathlib.Path(install_path).resolve(strict=True)
 
 
 def get_bundle_cache_path(name):
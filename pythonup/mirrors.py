@@ -0,0 +1,187 @@
+import concurrent.futures
+import threading
+import time
+
+import attr
+
+from . import configs, fileio, httpclient, utils
+
+
+# All installer URLs in version definitions start with this.
+OFFICIAL_PREFIX = 'https://www.python.org/ftp/python'
+
+# Probes should be cheap; a mirror slower than this is as good as down.
+PROBE_TIMEOUT = (3, 3)
+
+# A mirror failing this many times in a row is skipped for a while.
+MAX_FAILURES = 3
+
+# Seconds to skip a failing mirror before trying it again.
+COOLDOWN = 10 * 60
+
+
+def rewrite_url(url, prefix):
+    """Rewrite an official installer URL to point to a mirror.
+
+    Returns None if the URL does not come from the official server.
+    """
+    if not url.startswith(OFFICIAL_PREFIX + '/'):
+        return None
+    return prefix.rstrip('/') + url[len(OFFICIAL_PREFIX):]
+
+
+@attr.s
+class MirrorHealth:
+
+    latency = attr.ib(default=None)
+    failures = attr.ib(default=0)
+    last_failure = attr.ib(default=None)
+
+    def is_cooling_down(self, now):
+        return (
+            self.failures >= MAX_FAILURES and
+            self.last_failure is not None and
+            now - self.last_failure < COOLDOWN
+        )
+
+
+@attr.s
+class MirrorPool:
+    """Mirrors to download installers from, and how they did recently.
+
+    Before a transfer, mirrors are probed with HEAD requests, and tried in
+    the order of their latency. A mirror is skipped for a while after
+    repeated failures. Health records are saved to ``state_path``, so they
+    carry over between runs.
+    """
+    prefixes = attr.ib()
+    state_path = attr.ib()
+    _health = attr.ib(init=False, default=None, repr=False)
+    _lock = attr.ib(
+        init=False, default=attr.Factory(threading.Lock), repr=False,
+    )
+
+    def _load(self):
+        if self._health is not None:
+            return self._health
+        data = fileio.read_json(self.state_path, {})
+        self._health = {
+            prefix: MirrorHealth(**data.get(prefix, {}))
+            for prefix in self.prefixes
+        }
+        return self._health
+
+    def _save(self):
+        data = {p: attr.asdict(h) for p, h in self._health.items()}
+        fileio.write_json_atomic(self.state_path, data)
+
+    def get_health(self, prefix):
+        with self._lock:
+            return self._load()[prefix]
+
+    def record_success(self, prefix, latency=None):
+        with self._lock:
+            health = self._load()[prefix]
+            health.failures = 0
+            if latency is not None:
+                health.latency = latency
+            self._save()
+
+    def record_failure(self, prefix):
+        with self._lock:
+            health = self._load()[prefix]
+            health.failures += 1
+            health.last_failure = time.time()
+            self._save()
+
+    def _probe(self, session, url):
+        start = time.perf_counter()
+        try:
+            response = session.head(
+                url, allow_redirects=True, timeout=PROBE_TIMEOUT,
+            )
+        except OSError:
+            return None
+        if not response.ok:
+            return None
+        return time.perf_counter() - start
+
+    def rank(self, url):
+        """Return ``(prefix, url)`` candidates to download ``url`` from.
+
+        Mirrors that answer a probe are listed first, fastest first. Mirrors
+        that fail the probe, or are cooling down, come last.
+        """
+        candidates = []
+        for prefix in self.prefixes:
+            mirror_url = rewrite_url(url, prefix)
+            if mirror_url is not None:
+                candidates.append((prefix, mirror_url))
+        if len(candidates) < 2:
+            return candidates
+
+        now = time.time()
+        cooling = []
+        probing = []
+        for candidate in candidates:
+            if self.get_health(candidate[0]).is_cooling_down(now):
+                cooling.append(candidate)
+            else:
+                probing.append(candidate)
+
+        latencies = []
+        if probing:
+            session = httpclient.Session(retries=0, pool_size=len(probing))
+            with concurrent.futures.ThreadPoolExecutor(len(probing)) as ex:
+                latencies = list(ex.map(
+                    lambda c: self._probe(session, c[1]), probing,
+                ))
+            session.close()
+
+        healthy = []
+        unhealthy = []
+        for candidate, latency in zip(probing, latencies):
+            if latency is None:
+                self.record_failure(candidate[0])
+                unhealthy.append(candidate)
+            else:
+                self.record_success(candidate[0], latency)
+                healthy.append((latency, candidate))
+        healthy.sort(key=lambda pair: pair[0])
+        return [c for _, c in healthy] + unhealthy + cooling
+
+    def download_file(self, url, **kwargs):
+        """Download from the best mirror, failing over to the next on errors.
+
+        Takes the same arguments as :func:`pythonup.utils.download_file`.
+        """
+        candidates = self.rank(url) or [(None, url)]
+        # Health is only used to choose between mirrors. Don't save it if
+        # there is no choice.
+        tracked = len(candidates) > 1
+        for i, (prefix, mirror_url) in enumerate(candidates):
+            try:
+                path = utils.download_file(mirror_url, **kwargs)
+            except (OSError, utils.DownloadIntegrityError):
+                if tracked:
+                    self.record_failure(prefix)
+                if i + 1 >= len(candidates):
+                    raise
+                continue
+            if tracked:
+                self.record_success(prefix)
+            return path
+
+
+def get_mirror_pool():
+    """Configured mirrors, followed by the official server.
+    """
+    prefixes = []
+    for prefix in list(configs.get_setting('mirrors', [])) + [OFFICIAL_PREFIX]:
+        prefix = prefix.rstrip('/')
+        if prefix not in prefixes:
+            prefixes.append(prefix)
+    return MirrorPool(
+        prefixes=prefixes,
+        state_path=configs.get_base_dir_path().joinpath('mirrors.json'),
+    )
@@ -0,0 +1,138 @@
+import contextlib
+import json
+import pathlib
+import posixpath
+import zipfile
+
+import click
+
+from .. import __version__
+from .. import caches
+from ..versions import (
+    VersionNotFoundError, get_version_data_path, load_version_data,
+)
+
+from .common import unique_versions, version_command
+from .download import iter_installers
+
+
+INDEX_NAME = 'index.json'
+
+# Bump this when the bundle layout changes incompatibly.
+BUNDLE_FORMAT = 1
+
+
+def get_spec_arcname(name):
+    return posixpath.join('versions', '{}.json'.format(name))
+
+
+def get_installer_arcname(version, installer):
+    return posixpath.join('installers', version.md5_sum, installer.name)
+
+
+def write_bundle(zf, versions):
+    entries = []
+    for version, installer in iter_installers(versions):
+        if installer is None:
+            return False
+        spec_arcname = get_spec_arcname(version.name)
+        zf.write(
+            str(get_version_data_path(version.name)), spec_arcname,
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+        # Installers are compressed already. Store them as-is.
+        installer_arcname = get_installer_arcname(version, installer)
+        zf.write(str(installer), installer_arcname)
+        entries.append({
+            'name': version.name,
+            'url': version.url,
+            'md5_sum': version.md5_sum,
+            'installer': installer_arcname,
+            'spec': spec_arcname,
+        })
+    index = {
+        'format': BUNDLE_FORMAT,
+        'pythonup': __version__,
+        'versions': sorted(entries, key=lambda e: e['name']),
+    }
+    zf.writestr(INDEX_NAME, json.dumps(index, indent=4))
+    return True
+
+
+@version_command(plural=True)
+def export(ctx, versions, output):
+    versions = unique_versions(versions)
+    output = pathlib.Path(output)
+    with zipfile.ZipFile(str(output), 'w') as zf:
+        ok = write_bundle(zf, versions)
+    if not ok:
+        with contextlib.suppress(FileNotFoundError):
+            output.unlink()
+        ctx.exit(1)
+    click.echo('Exported {} to {}'.format(
+        ', '.join(str(v) for v in versions), output,
+    ))
+
+
+def get_known_checksums(name):
+    try:
+        data = load_version_data(name)
+    except VersionNotFoundError:
+        return set()
+    variants = [data] + [data[k] for k in ('amd64', 'x86') if k in data]
+    return {v['md5_sum'] for v in variants if 'md5_sum' in v}
+
+
+def import_(ctx, bundle):
+    cache = caches.get_installer_cache()
+    with zipfile.ZipFile(str(bundle)) as zf:
+        index = json.loads(zf.read(INDEX_NAME).decode('utf-8'))
+        if index.get('format') != BUNDLE_FORMAT:
+            click.echo('Unsupported bundle format: {}'.format(
+                index.get('format'),
+            ), err=True)
+            ctx.exit(1)
+        total = 0
+        failed = False
+        # Keep installers imported earlier, even if the bundle is too big.
+        keep = frozenset(
+            e['md5_sum'] for e in index['versions']
+            if caches.is_valid_md5_sum(e.get('md5_sum'))
+        )
+        for entry in index['versions']:
+            # The checksum and file name become paths in the cache.
+            filename = posixpath.basename(entry['installer'])
+            try:
+                caches.check_md5_sum(entry['md5_sum'])
+                caches.check_filename(filename)
+            except ValueError as e:
+                click.echo('Skipping Python {}: {}'.format(
+                    entry['name'], e,
+                ), err=True)
+                failed = True
+                continue
+            if entry['md5_sum'] not in get_known_checksums(entry['name']):
+                click.echo(
+                    'WARNING: Python {} in bundle does not match the '
+                    'definition in this PythonUp, and will not be used '
+                    'unless PythonUp is upgraded.'.format(entry['name']),
+                    err=True,
+                )
+            # Stream straight out of the archive into the cache.
+            with zf.open(entry['installer']) as f:
+                path = cache.ingest_stream(
+                    f, entry['md5_sum'], filename, keep=keep,
+                )
+            total += path.stat().st_size
+            click.echo('Imported Python {} ({})'.format(
+                entry['name'], path.name,
+            ))
+    if total > cache.size_limit:
+        click.echo(
+            'WARNING: Bundle is larger than the installer cache limit. Some '
+            'installers will be evicted by later downloads. Set '
+            'cache_size_limit to keep all of them.',
+            err=True,
+        )
+    if failed:
+        ctx.exit(1)
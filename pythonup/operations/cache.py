@@ -0,0 +1,47 @@
+import datetime
+import operator
+
+import click
+
+from .. import caches
+
+
+def format_size(size):
+    return '{:.1f} MiB'.format(size / 1024 / 1024)
+
+
+def list_():
+    cache = caches.get_installer_cache()
+    entries = sorted(
+        cache.iter_entries(),
+        key=operator.attrgetter('last_used'), reverse=True,
+    )
+    if not entries:
+        click.echo('Installer cache is empty.', err=True)
+        return
+    for entry in entries:
+        last_used = datetime.datetime.fromtimestamp(entry.last_used)
+        click.echo('{}  {:>10}  {}  {}'.format(
+            entry.md5_sum, format_size(entry.size),
+            last_used.strftime('%Y-%m-%d %H:%M'), entry.name,
+        ))
+    click.echo('Total: {} in {}'.format(
+        format_size(sum(e.size for e in entries)), cache.root,
+    ))
+
+
+def _report_evicted(evicted):
+    for entry in evicted:
+        click.echo('Removed {} ({})'.format(entry.name, entry.md5_sum))
+    click.echo('Freed {}.'.format(format_size(sum(e.size for e in evicted))))
+
+
+def prune(max_size):
+    cache = caches.get_installer_cache()
+    if max_size is not None:
+        max_size = max_size * 1024 * 1024
+    _report_evicted(cache.prune(max_size))
+
+
+def clear():
+    _report_evicted(caches.get_installer_cache().clear())
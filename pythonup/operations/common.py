@@ -1,3 +1,4 @@
+import collections
 import functools
 
 import click
@@ -47,6 +48,22 @@ def get_versions(*, installed_only):
     return [v for v in vers if should_include(v)]
 
 
+def get_active_versions():
+    """Load the active versions, skipping names that are not known.
+
+    This does not need a click context, unlike :func:`get_version`.
+    """
+    force_32 = not metadata.can_install_64bit()
+    active_versions = []
+    for name in get_active_names():
+        try:
+            version = versions.get_version(name, force_32=force_32)
+        except versions.VersionNotFoundError:
+            continue
+        active_versions.append(version)
+    return active_versions
+
+
 def get_version(name):
     force_32 = not metadata.can_install_64bit()
     try:
@@ -61,6 +78,14 @@ def get_version(name):
     return version
 
 
+def unique_versions(versions):
+    """Remove duplicate versions, keeping the first appearance.
+    """
+    return list(collections.OrderedDict(
+        (version.name, version) for version in versions
+    ).values())
+
+
 def version_command(*, plural=False, wild_versions=()):
     if wild_versions:
         def _get_version(n):
@@ -1,29 +1,112 @@
+import concurrent.futures
 import pathlib
 import shutil
 
 import click
 
-from .. import utils
+from .. import caches, configs, sources, utils
 
-from .common import version_command
+from .common import unique_versions, version_command
 
 
-def download_installer(version):
+# Number of installers to download at once, unless configured otherwise.
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+
+def ingest_local_installer(cache, version, *, keep=frozenset()):
+    local_installers = sources.iter_local_installers(
+        version.url, sources.get_sources(),
+    )
+    for path in local_installers:
+        try:
+            installer = cache.ingest(path, version.md5_sum, keep=keep)
+        except (OSError, utils.DownloadIntegrityError) as e:
+            click.echo('Skipping {} ({})'.format(path, e), err=True)
+            continue
+        click.echo('Copied installer from {}'.format(path))
+        return installer
+    return None
+
+
+def download_installer(version, *, show_progress=True, keep=frozenset()):
+    """Get an installer from the cache, a local source, or the Internet.
+
+    Cached installers with checksums in ``keep`` are not evicted to make
+    room for this one.
+    """
+    cache = caches.get_installer_cache()
+    installer = cache.get(version.md5_sum)
+    if installer is not None:
+        click.echo('Using cached installer {}'.format(installer))
+        return installer
+    installer = ingest_local_installer(cache, version, keep=keep)
+    if installer is not None:
+        return installer
     click.echo('Downloading {}'.format(version.url))
-    return utils.download_file(version.url, check=version.check_installer)
+    return cache.fetch(
+        version.url, version.md5_sum, show_progress=show_progress, keep=keep,
+    )
+
 
+def iter_installers(versions):
+    """Download installers concurrently, yielding them as they are verified.
 
-@version_command()
-def download(ctx, version, dest_dir, force):
-    installer = download_installer(version)
+    Yields ``(version, path)`` pairs in the order downloads finish. Failed
+    downloads are reported, and yielded with ``None`` as path.
+    """
+    if len(versions) == 1:
+        yield versions[0], download_installer(versions[0])
+        return
+
+    # Don't let one download evict another's installer before it is used.
+    keep = frozenset(v.md5_sum for v in versions)
+    workers = configs.get_setting(
+        'download_workers', DEFAULT_DOWNLOAD_WORKERS,
+    )
+    with concurrent.futures.ThreadPoolExecutor(max(int(workers), 1)) as ex:
+        futures = {
+            ex.submit(
+                download_installer, v, show_progress=False, keep=keep,
+            ): v
+            for v in versions
+        }
+        for future in concurrent.futures.as_completed(futures):
+            version = futures[future]
+            try:
+                path = future.result()
+            except (OSError, utils.DownloadIntegrityError) as e:
+                click.echo('Failed to download {}.\n{}: {}'.format(
+                    version, type(e).__name__, e,
+                ), err=True)
+                path = None
+            else:
+                click.echo('Downloaded {}'.format(path.name))
+            yield version, path
+
+
+@version_command(plural=True)
+def download(ctx, versions, dest_dir, force):
+    versions = unique_versions(versions)
     if dest_dir is None:
         dest_dir = pathlib.Path.cwd()
-    target = pathlib.Path(dest_dir, installer.name)
-    if target.exists() and not force:
-        click.echo('Target exists: {}'.format(target), err=True)
-        click.echo('NOTE: Use --force to overwrite destination.', err=True)
+
+    # Check all targets upfront so we don't fail after downloading.
+    for version in versions:
+        target = pathlib.Path(dest_dir, version.url.rsplit('/', 1)[-1])
+        if target.exists() and not force:
+            click.echo('Target exists: {}'.format(target), err=True)
+            click.echo('NOTE: Use --force to overwrite destination.', err=True)
+            ctx.exit(1)
+
+    failed = False
+    for version, installer in iter_installers(versions):
+        if installer is None:
+            failed = True
+            continue
+        target = pathlib.Path(dest_dir, installer.name)
+        shutil.copy2(str(installer), str(target))
+        click.echo('{} installer is downloaded successfully to {}'.format(
+            version, target,
+        ))
+    if failed:
         ctx.exit(1)
-    shutil.move(str(installer), str(target))
-    click.echo('{} installer is downloaded successfully to {}'.format(
-        version, target,
-    ))
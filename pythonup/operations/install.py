@@ -1,48 +1,82 @@
 import functools
 import pathlib
+import subprocess
 
 import click
 
+from .. import registry
 from .common import (
     check_installation,
-    get_active_names, get_version, get_versions, version_command,
+    get_active_names, get_version, get_versions,
+    unique_versions, version_command,
 )
-from .download import download_installer
+from .download import download_installer, iter_installers
 from .link import (
     activate, link_commands, unlink_commands, update_active_versions,
 )
 
 
-@version_command()
-def install(version, use, from_file):
-    check_installation(
-        version, installed=False,
-        on_exit=functools.partial(link_commands, version),
-    )
+@version_command(plural=True)
+def install(ctx, versions, use, from_file):
+    versions = unique_versions(versions)
+    if from_file is not None and len(versions) > 1:
+        click.echo('--file cannot be used with multiple versions.', err=True)
+        ctx.exit(1)
 
-    if from_file is None:
-        installer_path = download_installer(version)
-    else:
-        installer_path = pathlib.Path(from_file)
+    present = [v for v in versions if v.is_installed()]
+    pending = [v for v in versions if v not in present]
+    for version in present:
+        click.echo('{} is already installed.'.format(version), err=True)
+    if not pending:
+        for version in present:
+            link_commands(version)
+        ctx.exit(1)
 
     if use is None and not get_versions(installed_only=True):
         use = True
-        click.echo('Will use {} after installation.'.format(version))
+        click.echo('Will use {} after installation.'.format(
+            ', '.join(str(v) for v in pending),
+        ))
 
-    click.echo('Running installer {}'.format(installer_path))
-    dirpath = version.install(str(installer_path))
+    if from_file is None:
+        installers = iter_installers(pending)
+    else:
+        installers = [(pending[0], pathlib.Path(from_file))]
+
+    # Installers hold a machine-wide mutex, so they can only run one by one.
+    # Each starts as soon as it is downloaded, while others keep downloading.
+    installed = []
+    for version, installer_path in installers:
+        if installer_path is None:
+            continue
+        click.echo('Running installer {}'.format(installer_path))
+        try:
+            dirpath = version.install(str(installer_path))
+        except (subprocess.CalledProcessError, OSError) as e:
+            # Keep going, so versions installed so far are still linked.
+            click.echo('Failed to install {}.\n{}: {}'.format(
+                version, type(e).__name__, e,
+            ), err=True)
+            continue
+        finally:
+            registry.invalidate()
+        click.echo('{} is installed successfully to {}'.format(
+            version, dirpath,
+        ))
+        installed.append(version)
 
-    link_commands(version)
-    click.echo('{} is installed successfully to {}'.format(
-        version, dirpath,
-    ))
+    for version in present + installed:
+        link_commands(version)
 
-    if use:
-        versions = [
+    if use and installed:
+        active_versions = [
             get_version(n)
             for n in get_active_names()
-        ] + [version]
-        activate(versions, allow_empty=True)
+        ] + [v for v in pending if v in installed]
+        activate(active_versions, allow_empty=True)
+
+    if present or len(installed) != len(pending):
+        ctx.exit(1)
 
 
 @version_command()
@@ -62,6 +96,7 @@ def uninstall(version, from_file):
 
     click.echo('Running uninstaller {}'.format(uninstaller_path))
     version.uninstall(str(uninstaller_path))
+    registry.invalidate()
     unlink_commands(version)
     click.echo('{} is uninstalled successfully.'.format(version))
 
@@ -93,6 +128,7 @@ def upgrade(ctx, version, pre, from_file):
 
     click.echo('Running installer {}'.format(installer_path))
     version.upgrade(str(installer_path))
+    registry.invalidate()
 
     link_commands(version)
     click.echo('{} is upgraded successfully at {}'.format(
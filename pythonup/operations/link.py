@@ -2,16 +2,18 @@ import collections
 import enum
 import filecmp
 import itertools
+import os
 import shutil
 import sys
 
+import attr
 import click
 
-from .. import configs
+from .. import configs, locks, manifests, relink, scriptdirs, shimio
 
 from .common import (
-    check_installation, get_active_names, get_version,
-    set_active_versions, version_command,
+    check_installation, get_active_names, get_active_versions, get_version,
+    set_active_versions, unique_versions, version_command,
 )
 
 
@@ -21,12 +23,78 @@ class Overwrite(enum.Enum):
     smart = 'smart'
 
 
-def safe_publish(target, *, overwrite, comparer, writer, quiet):
-    should_write = (overwrite == Overwrite.yes or (
-        overwrite == Overwrite.smart and not (target.exists() and comparer())
-    ))
-    if not should_write:
+class LinkStrategy(enum.Enum):
+    copy = 'copy'
+    hardlink = 'hardlink'
+    symlink = 'symlink'
+    auto = 'auto'   # Hard link if on the same volume, copy otherwise.
+
+
+def get_link_strategy():
+    value = configs.get_setting('link_strategy', LinkStrategy.copy.value)
+    try:
+        return LinkStrategy(value)
+    except ValueError:
+        click.echo('WARNING: Unknown link_strategy {!r}, using copy.'.format(
+            value,
+        ), err=True)
+        return LinkStrategy.copy
+
+
+def remove_target(target):
+    """Remove a target before writing it.
+
+    Writing into an existing file would write through a hard link into its
+    source, so targets are always replaced instead.
+    """
+    try:
+        target.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def is_same_volume(source, target):
+    return source.stat().st_dev == target.parent.stat().st_dev
+
+
+def link_file(source, target, strategy):
+    remove_target(target)
+    if strategy == LinkStrategy.auto:
+        if is_same_volume(source, target):
+            strategy = LinkStrategy.hardlink
+        else:
+            strategy = LinkStrategy.copy
+    try:
+        if strategy == LinkStrategy.hardlink:
+            os.link(str(source), str(target))
+            return
+        if strategy == LinkStrategy.symlink:
+            os.symlink(str(source), str(target))
+            return
+    except OSError:
+        # Not supported by the file system, or not permitted. Copy instead.
+        pass
+    shutil.copy2(str(source), str(target))
+
+
+def is_same_file(source, target):
+    try:
+        return os.path.samefile(str(source), str(target))
+    except OSError:
         return False
+
+
+def safe_publish(target, *, overwrite, comparer, writer, quiet):
+    """Write a target file, depending on the overwrite mode.
+
+    Returns True if the target is known to be up to date afterwards, i.e.
+    it is written successfully, or found to be identical.
+    """
+    if overwrite != Overwrite.yes and target.exists():
+        if overwrite == Overwrite.no:
+            return False
+        if comparer():
+            return True
     if not quiet:
         click.echo('  {}'.format(target.name))
     try:
@@ -39,46 +107,47 @@ def safe_publish(target, *, overwrite, comparer, writer, quiet):
     return True
 
 
-def publish_file(source, target, *, overwrite, quiet):
+def publish_file(source, target, *, overwrite, quiet,
+                 strategy=LinkStrategy.copy):
 
     def comp():
+        # Links are compared by file ID, without reading them.
+        if is_same_file(source, target):
+            return True
         return filecmp.cmp(str(source), str(target))
 
     def copy():
-        shutil.copy2(str(source), str(target))
+        link_file(source, target, strategy)
 
     return safe_publish(
         target, quiet=quiet, overwrite=overwrite, comparer=comp, writer=copy,
     )
 
 
-def publish_shim(source, target, *, relink, overwrite, quiet):
-    """Write a shim.
+def get_snapshot_path():
+    return configs.get_scripts_store_path().joinpath(relink.SNAPSHOT_NAME)
 
-    A shim is an pre-compiled executable, with extra data appended to the end
-    of it. The extra data contain what command(s) the shim should attempt to
-    execute when launched. Arguments are seperated by NULL characters, and
-    commands (if there are multiple) are seperated by line feeds. Two extra
-    line feeds signify the end of the command sequence.
 
-    The extra data are encoded with UTF-8, and written *backwards* into the
-    executable. This makes it easier to read data out.
-    """
+def get_shim_data(source, *, relink):
     cmds = [[str(source.resolve(strict=True))]]
     if relink:
         cmds.append([
-            sys.executable, '-m', 'pythonup',
-            'link', '--all', '--overwrite=smart', '--no-user-friendly',
+            sys.executable, '-m', 'pythonup.relink', str(get_snapshot_path()),
         ])
-    data = bytes(reversed(
-        ('\n'.join('\0'.join(args) for args in cmds) + '\n\n').encode('utf-8')
-    ))
+    return shimio.encode_trailer(cmds)
+
+
+def publish_shim(source, target, *, relink, overwrite, quiet):
+    """Write a shim. See :mod:`pythonup.shimio` for the format.
+    """
+    data = get_shim_data(source, relink=relink)
+    template = shimio.get_template()
 
     def comp():
-        return target.read_bytes().endswith(data)
+        return template.matches(target, data)
 
     def write():
-        target.write_bytes(configs.get_shim_path().read_bytes() + data)
+        template.write(target, data)
 
     return safe_publish(
         target, quiet=quiet, overwrite=overwrite, comparer=comp, writer=write,
@@ -86,7 +155,8 @@ def publish_shim(source, target, *, relink, overwrite, quiet):
 
 
 def safe_unlink(p):
-    if not p.exists():
+    # Don't follow symbolic links; a dangling one should be removed too.
+    if not os.path.lexists(str(p)):
         return
     try:
         p.unlink()
@@ -94,88 +164,371 @@ def safe_unlink(p):
         click.echo('Failed to remove {} ({})'.format(p, e), err=True)
 
 
-def collect_version_scripts(versions):
-    names = set()
-    scripts = []
-    shims = []
-    for version in versions:
-        version_scripts_dir = version.get_installation().scripts_dir
-        if not version_scripts_dir.is_dir():
-            continue
-        for path in version_scripts_dir.iterdir():
-            blacklisted_stems = {
+@attr.s(frozen=True)
+class ScriptRules:
+    """How scripts of a version are published, by their stems.
+    """
+    blacklisted_stems = attr.ib()
+    shimmed_stems = attr.ib()
+
+    @classmethod
+    def for_version(cls, version):
+        return cls(
+            blacklisted_stems=frozenset({
                 # Encourage people to always use qualified commands.
                 'easy_install', 'pip',
                 # Fully qualified pip is already populated on installation.
                 'pip{}'.format(version.arch_free_name),
-            }
-            shimmed_stems = {
+            }),
+            shimmed_stems=frozenset({
                 # Major version names, e.g. "pip3".
                 'pip{}'.format(version.version_info[0]),
                 # Fully-qualified easy_install.
                 'easy_install-{}'.format(version.arch_free_name),
-            }
-            if path.name in names or path.stem in blacklisted_stems:
+            }),
+        )
+
+    def get_kind(self, name):
+        """Get how to publish a script, or None if it should not be.
+        """
+        stem = os.path.splitext(name)[0]
+        if stem in self.blacklisted_stems:
+            return None
+        if stem in self.shimmed_stems:
+            return 'shim'
+        return 'file'
+
+
+@attr.s(frozen=True)
+class Script:
+    """A script to publish, found in a version's Scripts directory.
+
+    ``kind`` is ``file`` or ``shim``, as in the manifest. ``stat`` is the
+    source's fingerprint, as :func:`pythonup.manifests.get_stat` returns.
+    """
+    name = attr.ib()
+    kind = attr.ib()
+    path = attr.ib()
+    stat = attr.ib(repr=False)
+
+
+def scan_version_scripts(version, scripts_dir):
+    """Find scripts to publish in a version's Scripts directory.
+
+    This is one ``os.scandir`` pass. Entries carry their file types, and on
+    Windows their stat results too, so no file is looked up on its own.
+    """
+    rules = ScriptRules.for_version(version)
+    try:
+        it = os.scandir(str(scripts_dir))
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with it:
+        for entry in it:
+            kind = rules.get_kind(entry.name)
+            if kind is None:
                 continue
-            names.add(path.name)
-            if path.stem in shimmed_stems:
-                shims.append(path)
-            else:
-                scripts.append(path)
-    return scripts, shims
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:   # Removed while scanning.
+                continue
+            yield Script(
+                name=entry.name, kind=kind,
+                path=scripts_dir.joinpath(entry.name),
+                stat=manifests.get_stat_fingerprint(stat),
+            )
 
 
-def activate(versions, *, overwrite=Overwrite.yes,
-             allow_empty=False, quiet=False):
-    if not allow_empty and not versions:
-        click.echo('No active versions.', err=True)
-        click.get_current_context().exit(1)
+def scan_scripts(sources):
+    """Find scripts to publish from ``(version, scripts_dir)`` pairs.
+
+    If several versions have scripts of the same name, the first one wins.
+    """
+    scripts = collections.OrderedDict()
+    for version, scripts_dir in sources:
+        for script in scan_version_scripts(version, scripts_dir):
+            scripts.setdefault(script.name, script)
+    return list(scripts.values())
+
+
+def is_published(entry, kind, source, source_stat, target, get_digest):
+    """Check a manifest entry to see if a target needs to be written.
+
+    The source's stat is compared first. If it changed but the content did
+    not (e.g. the file is reinstalled), the entry is updated in place.
+    """
+    if entry is None or entry.kind != kind or entry.source != str(source):
+        return False
+    try:
+        target_stat = manifests.get_target_stat(target)
+    except FileNotFoundError:
+        return False
+    if target_stat != entry.target_stat:
+        return False
+    # Shim data is cheap to compute, and changes with the relink command.
+    if kind == 'shim' and get_digest() != entry.digest:
+        return False
+    if not manifests.same_stat(source_stat, entry.source_stat):
+        if get_digest() != entry.digest:
+            return False
+        entry.source_stat = source_stat
+    return True
 
-    source_scripts, shimmed_scripts = collect_version_scripts(versions)
-    scripts_dir = configs.get_scripts_dir_path()
 
-    using_scripts = set()
+def publish_tracked(manifest, kind, source, target, *,
+                    overwrite, quiet, relink=False,
+                    strategy=LinkStrategy.copy, source_stat=None):
+    """Publish a script into the scripts directory, recording it.
 
-    # TODO: Distinguish between `use` and automatic hook after shimmed pip
-    # execution. The latter should only write scripts that actually chaged, or
-    # at least should only log those writes (and overwrite others silently).
-    if source_scripts or shimmed_scripts or versions:
+    Nothing is written if the manifest shows the target is up to date.
+    Returns whether the target is up to date afterwards.
+    """
+    if source_stat is None:
+        try:
+            source_stat = manifests.get_stat(source)
+        except FileNotFoundError:
+            return False
+    if kind == 'file':
+        def get_digest():
+            return manifests.get_file_digest(source)
+    else:
+        def get_digest():
+            return manifests.get_data_digest(
+                get_shim_data(source, relink=relink),
+            )
+
+    entry = manifest.entries.get(target.name)
+    if is_published(entry, kind, source, source_stat, target, get_digest):
+        return True
+
+    if kind == 'file':
+        ok = publish_file(
+            source, target,
+            overwrite=overwrite, quiet=quiet, strategy=strategy,
+        )
+    else:
+        ok = publish_shim(
+            source, target, relink=relink, overwrite=overwrite, quiet=quiet,
+        )
+    if ok:
+        manifest.entries[target.name] = manifests.ManifestEntry(
+            kind=kind, source=str(source), source_stat=source_stat,
+            digest=get_digest(),
+            target_stat=manifests.get_target_stat(target),
+        )
+    return ok
+
+
+def load_scripts_manifest(path):
+    manifest = manifests.load_manifest(path)
+
+    # Shims are rewritten if the shim executable changes.
+    try:
+        shim_stat = manifests.get_target_stat(configs.get_shim_path())
+    except FileNotFoundError:
+        shim_stat = None
+    if manifest.shim_stat != shim_stat:
+        manifest.entries = {
+            name: entry for name, entry in manifest.entries.items()
+            if entry.kind != 'shim'
+        }
+        manifest.shim_stat = shim_stat
+        manifest.sources = None
+    return manifest
+
+
+def get_sources_stat(installations, scripts_dir):
+    """Fingerprint directories activation reads from and writes to.
+
+    Installing or removing a script changes its directory's mtime.
+    """
+    paths = [i.scripts_dir for i in installations]
+    paths.append(scripts_dir)
+    stats = {}
+    for path in paths:
+        try:
+            stats[str(path)] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            stats[str(path)] = None
+    return stats
+
+
+def remove_stale_scripts(manifest, scripts_dir, using_names, *, quiet):
+    if manifest.loaded:
+        stale_names = set(manifest.entries) - using_names
+    else:
+        # Nothing is known about what's in the directory. Look.
+        stale_names = {p.name for p in scripts_dir.iterdir()} - using_names
+    if not stale_names:
+        return
+    if not quiet:
+        click.echo('Cleaning stale scripts...')
+    for name in sorted(stale_names):
+        if not quiet:
+            click.echo('  {}'.format(name))
+        script = scripts_dir.joinpath(name)
+        safe_unlink(script)
+        if not os.path.lexists(str(script)):
+            manifest.entries.pop(name, None)
+
+
+def materialize(versions, scripts_dir, manifest, *,
+                overwrite, quiet, strategy, refresh, only=None):
+    """Publish scripts of versions into a directory, incrementally.
+
+    Unless ``refresh`` is set, nothing is checked if no scripts were added
+    or removed in the involved directories since the last time. If ``only``
+    is given, scripts with other names are left as they are.
+    """
+    installations = [v.get_installation() for v in versions]
+    sources_stat = get_sources_stat(installations, scripts_dir)
+    if not refresh and manifest.loaded and manifest.sources == sources_stat:
+        return
+    if not manifest.loaded:
+        # Don't know what else is in the directory. Check everything.
+        only = None
+
+    scripts = scan_scripts(
+        (v, i.scripts_dir) for v, i in zip(versions, installations)
+    )
+    using_names = set()
+    if only is not None:
+        using_names.update(n for n in manifest.entries if n not in only)
+
+    def is_skipped(name):
+        if name in using_names:
+            return True
+        using_names.add(name)
+        return only is not None and name not in only
+
+    if scripts or versions:
         if not quiet:
             click.echo('Publishing scripts....')
-        for source in source_scripts:
-            target = scripts_dir.joinpath(source.name)
-            if not source.is_file():
-                continue
-            using_scripts.add(target)
-            publish_file(source, target, overwrite=overwrite, quiet=quiet)
-        for source in shimmed_scripts:
-            target = scripts_dir.joinpath(source.name)
-            if target in using_scripts:
+        for script in scripts:
+            if is_skipped(script.name):
                 continue
-            using_scripts.add(target)
-            publish_shim(
-                source, target, relink=True, overwrite=overwrite, quiet=quiet,
+            publish_tracked(
+                manifest, script.kind, script.path,
+                scripts_dir.joinpath(script.name),
+                overwrite=overwrite, quiet=quiet, strategy=strategy,
+                relink=(script.kind == 'shim'), source_stat=script.stat,
             )
-        for version in versions:
-            target = version.python_major_command
-            if target in using_scripts:
+        for version, installation in zip(versions, installations):
+            target = scripts_dir.joinpath(version.python_major_command.name)
+            if is_skipped(target.name):
                 continue
-            using_scripts.add(target)
-            publish_shim(
-                version.get_installation().python, target,
-                relink=False, overwrite=overwrite, quiet=quiet,
+            publish_tracked(
+                manifest, 'shim', installation.python, target,
+                overwrite=overwrite, quiet=quiet,
             )
 
+    remove_stale_scripts(manifest, scripts_dir, using_names, quiet=quiet)
+    manifest.loaded = True
+    manifest.sources = get_sources_stat(installations, scripts_dir)
+    manifest.save()
+
+
+def get_version_scripts_dirs(versions):
+    return [str(v.get_installation().scripts_dir) for v in versions]
+
+
+def get_activation_lock():
+    store_path = configs.get_scripts_store_path()
+    store_path.mkdir(parents=True, exist_ok=True)
+    return locks.FileLock(store_path.joinpath('activate.lock'))
+
+
+def activate(versions, *, overwrite=Overwrite.yes,
+             allow_empty=False, quiet=False, refresh=False):
+    if not allow_empty and not versions:
+        click.echo('No active versions.', err=True)
+        click.get_current_context().exit(1)
+    with get_activation_lock():
+        _activate(versions, overwrite=overwrite, quiet=quiet, refresh=refresh)
+
+
+def _activate(versions, *, overwrite, quiet, refresh,
+              only=None, snapshot=None):
+    # Snapshot sources before reading them, so changes made while publishing
+    # are picked up by the next relink.
+    if snapshot is None:
+        snapshot = relink.take_snapshot(get_version_scripts_dirs(versions))
+
+    # Each combination of versions has its own scripts directory. Bring it
+    # up to date, and point the scripts directory link to it.
+    strategy = get_link_strategy()
+    store = scriptdirs.get_store()
+    key = scriptdirs.get_key([v.name for v in versions])
+    materialize(
+        versions, store.get_dir(key),
+        load_scripts_manifest(store.get_manifest_path(key)),
+        overwrite=overwrite, quiet=quiet, strategy=strategy, refresh=refresh,
+        only=only,
+    )
+    relink.save_snapshot(get_snapshot_path(), snapshot)
+
     set_active_versions(versions)
 
-    stale_scripts = set(scripts_dir.iterdir()) - using_scripts
-    if stale_scripts:
-        if not quiet:
-            click.echo('Cleaning stale scripts...')
-        for script in stale_scripts:
-            if not quiet:
-                click.echo('  {}'.format(script.name))
-            safe_unlink(script)
+    try:
+        store.switch(key)
+    except OSError as e:
+        message = 'WARNING: Failed to switch scripts directory.\n{}: {}'
+        click.echo(message.format(type(e).__name__, e), err=True)
+        if scriptdirs.is_dir_link(store.link_path):
+            return
+        # Still a real directory. Publish into it as a fallback.
+        materialize(
+            versions, store.link_path,
+            load_scripts_manifest(store.link_path.with_name(
+                '{}.manifest.json'.format(store.link_path.name),
+            )),
+            overwrite=overwrite, quiet=quiet, strategy=strategy,
+            refresh=refresh,
+        )
+
+
+def publish_changes():
+    """Publish scripts that changed in active versions since the snapshot.
+
+    The caller should hold the activation lock. This runs outside the
+    command line interface, so active versions that can't be loaded are
+    skipped instead of aborting.
+    """
+    versions = get_active_versions()
+    if not versions:
+        return
+
+    dirs = get_version_scripts_dirs(versions)
+    old = relink.load_snapshot(get_snapshot_path())
+    new = relink.take_snapshot(dirs)
+    if old is None or set(old) != set(dirs):
+        # Active versions changed without activation. Check everything.
+        names = None
+    else:
+        names = relink.diff_snapshots(old, new)
+        if not names:
+            return
+
+    _activate(
+        versions, overwrite=Overwrite.smart, quiet=False, refresh=True,
+        only=names, snapshot=new,
+    )
+
+
+def request_relink():
+    """Publish changed scripts, unless another process is already doing it.
+
+    This is run by :mod:`pythonup.relink` after pip commands. Concurrent
+    requests are coalesced: if a relink is in progress, it runs once more
+    to cover this request, instead of this process waiting for it.
+    """
+    store_path = configs.get_scripts_store_path()
+    coalescer = locks.Coalescer(
+        get_activation_lock(), store_path.joinpath('relink.dirty'),
+    )
+    coalescer.request(publish_changes)
 
 
 def link_commands(version):
@@ -241,10 +594,7 @@ def use(ctx, versions, add):
                 new_versions.append(v)
         versions = active_versions + new_versions
 
-    # Remove duplicate inputs (keep first apperance).
-    versions = list(collections.OrderedDict(
-        (version.name, version) for version in versions
-    ).values())
+    versions = unique_versions(versions)
 
     if active_versions == versions:
         click.echo('No version changes.', err=True)
@@ -279,7 +629,7 @@ def link(ctx, command, link_all, overwrite, user_friendly):
     if link_all:
         activate(
             [get_version(n) for n in active_names],
-            overwrite=overwrite, allow_empty=True,
+            overwrite=overwrite, allow_empty=True, refresh=True,
         )
         return
 
@@ -310,6 +660,19 @@ def link(ctx, command, link_all, overwrite, user_friendly):
         click.echo('{} exists. Use --overwrite=yes to overwrite.', err=True)
         ctx.exit(1)
 
-    ok = publish_file(command, target, overwrite=Overwrite.yes, quiet=True)
+    store = scriptdirs.get_store()
+    key = store.current
+    if key is None:
+        manifest = manifests.Manifest(path=None)
+    else:
+        manifest = load_scripts_manifest(store.get_manifest_path(key))
+    ok = publish_tracked(
+        manifest, 'file', command, target,
+        overwrite=Overwrite.yes, quiet=True, strategy=get_link_strategy(),
+    )
     if ok:
+        # Without a manifest, the next activation looks at every file in the
+        # directory anyway. Don't start one that only knows about this.
+        if manifest.loaded:
+            manifest.save()
         click.echo('Linked {} from {}'.format(target_name, version))
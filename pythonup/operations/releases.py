@@ -45,5 +45,5 @@ def self_upgrade(*, installer, pre):
         return
 
     url = asset.browser_download_url
-    path = utils.download_file(url, check=asset.check_download)
+    path = utils.download_file(url, verifier=asset.get_download_verifier())
     install_self_upgrade(path)
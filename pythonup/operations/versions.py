@@ -1,5 +1,6 @@
 import click
 
+from .. import probing
 from .common import (
     check_installation, get_active_names, get_versions, version_command,
 )
@@ -12,20 +13,23 @@ def where(version):
 
 
 def list_(list_all):
-    vers = get_versions(installed_only=(not list_all))
+    states = probing.probe_versions(get_versions(installed_only=False))
+    if not list_all:
+        states = [s for s in states if s.is_installed]
     active_names = set(get_active_names())
 
-    for v in vers:
+    for state in states:
         marker = ' '
-        if v.name in active_names:
+        if state.version.name in active_names:
             marker = '*'
-        elif v.is_installed():
+        elif state.is_installed:
             marker = 'o'
-        # TODO: Show '+' for upgradable.
-        # How should we show an upgradable *and* active version?
-        click.echo('{} {}'.format(marker, v.name))
+        upgrade_marker = '+' if state.is_upgradable else ' '
+        click.echo('{}{} {}'.format(
+            marker, upgrade_marker, state.version.name,
+        ))
 
-    if not list_all and not vers:
+    if not list_all and not states:
         click.echo(
             'No installed versions. Use --all to list all available versions '
             'for installation.',
@@ -0,0 +1,188 @@
+"""Read version and architecture from Windows executables.
+
+Only the headers and the version resource are read, through a memory map,
+so this is much cheaper than running the executable to ask.
+"""
+
+import mmap
+import struct
+
+import attr
+
+
+class PEFormatError(ValueError):
+    pass
+
+
+MACHINES_32BIT = frozenset({
+    0x014c,     # IMAGE_FILE_MACHINE_I386
+    0x01c4,     # IMAGE_FILE_MACHINE_ARMNT
+})
+
+MACHINES_64BIT = frozenset({
+    0x8664,     # IMAGE_FILE_MACHINE_AMD64
+    0xaa64,     # IMAGE_FILE_MACHINE_ARM64
+})
+
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+
+RT_VERSION = 16
+
+RESOURCE_DIRECTORY_INDEX = 2
+
+VS_FIXEDFILEINFO_SIGNATURE = 0xfeef04bd
+
+SUBDIRECTORY_FLAG = 0x80000000
+
+
+@attr.s
+class PEInfo:
+
+    machine = attr.ib()
+    file_version = attr.ib()
+
+    @property
+    def is_32bit(self):
+        if self.machine in MACHINES_32BIT:
+            return True
+        if self.machine in MACHINES_64BIT:
+            return False
+        raise PEFormatError('unknown machine {:#x}'.format(self.machine))
+
+    @property
+    def python_version_info(self):
+        """Python version of a CPython binary, as ``(major, minor, micro)``.
+
+        CPython sets the third field of its file version to ``micro * 1000``
+        plus the release level and serial.
+        """
+        if self.file_version is None:
+            return None
+        major, minor, field3, _ = self.file_version
+        return (major, minor, field3 // 1000)
+
+
+def _read_sections(data, offset, count):
+    sections = []
+    for i in range(count):
+        virtual_size, virtual_address, raw_size, raw_pointer = (
+            struct.unpack_from('<IIII', data, offset + i * 40 + 8)
+        )
+        sections.append((virtual_address, virtual_size, raw_pointer, raw_size))
+    return sections
+
+
+def _get_file_offset(sections, rva):
+    for virtual_address, virtual_size, raw_pointer, raw_size in sections:
+        if virtual_address <= rva < virtual_address + max(
+                virtual_size, raw_size):
+            return rva - virtual_address + raw_pointer
+    raise PEFormatError('address {:#x} is not in any section'.format(rva))
+
+
+def _find_resource(data, base, offset, ident):
+    named_count, id_count = struct.unpack_from('<HH', data, base + offset + 12)
+    for i in range(named_count + id_count):
+        name, target = struct.unpack_from(
+            '<II', data, base + offset + 16 + i * 8,
+        )
+        if ident is None or name == ident:
+            return target
+    return None
+
+
+def _read_version_resource(data, sections, resource_rva):
+    base = _get_file_offset(sections, resource_rva)
+
+    # Resources are in a three-level tree: type, name, and language. Take
+    # the first name and language under the version type.
+    offset = 0
+    for ident in (RT_VERSION, None):
+        target = _find_resource(data, base, offset, ident)
+        if target is None:
+            return None
+        if not target & SUBDIRECTORY_FLAG:
+            raise PEFormatError('malformed resource directory')
+        offset = target & ~SUBDIRECTORY_FLAG
+    offset = _find_resource(data, base, offset, None)
+    if offset is None:
+        return None
+    if offset & SUBDIRECTORY_FLAG:
+        raise PEFormatError('malformed resource directory')
+
+    data_rva, _ = struct.unpack_from('<II', data, base + offset)
+    info_offset = _get_file_offset(sections, data_rva)
+
+    # VS_VERSIONINFO: three WORDs, the key, and padding to a DWORD boundary.
+    _, value_length, _ = struct.unpack_from('<HHH', data, info_offset)
+    key = bytes(data[info_offset + 6:info_offset + 38])
+    if key != 'VS_VERSION_INFO\0'.encode('utf-16-le'):
+        raise PEFormatError('malformed version resource')
+    if not value_length:
+        return None
+    fixed_offset = info_offset + 40
+
+    signature, _, version_ms, version_ls = struct.unpack_from(
+        '<IIII', data, fixed_offset,
+    )
+    if signature != VS_FIXEDFILEINFO_SIGNATURE:
+        raise PEFormatError('malformed version resource')
+    return (
+        version_ms >> 16, version_ms & 0xffff,
+        version_ls >> 16, version_ls & 0xffff,
+    )
+
+
+def parse_pe_info(data):
+    if bytes(data[:2]) != b'MZ':
+        raise PEFormatError('not an executable')
+    pe_offset, = struct.unpack_from('<I', data, 0x3c)
+    if bytes(data[pe_offset:pe_offset + 4]) != b'PE\0\0':
+        raise PEFormatError('not a PE executable')
+
+    coff_offset = pe_offset + 4
+    machine, section_count = struct.unpack_from('<HH', data, coff_offset)
+    optional_size, = struct.unpack_from('<H', data, coff_offset + 16)
+
+    optional_offset = coff_offset + 20
+    magic, = struct.unpack_from('<H', data, optional_offset)
+    if magic == PE32_MAGIC:
+        directories_offset = optional_offset + 96
+    elif magic == PE32_PLUS_MAGIC:
+        directories_offset = optional_offset + 112
+    else:
+        raise PEFormatError('unknown optional header {:#x}'.format(magic))
+    directory_count, = struct.unpack_from('<I', data, directories_offset - 4)
+
+    file_version = None
+    if directory_count > RESOURCE_DIRECTORY_INDEX:
+        resource_rva, _ = struct.unpack_from(
+            '<II', data, directories_offset + RESOURCE_DIRECTORY_INDEX * 8,
+        )
+        if resource_rva:
+            sections = _read_sections(
+                data, optional_offset + optional_size, section_count,
+            )
+            file_version = _read_version_resource(
+                data, sections, resource_rva,
+            )
+
+    return PEInfo(machine=machine, file_version=file_version)
+
+
+def read_pe_info(path):
+    """Read machine type and file version from a PE file.
+
+    Raises PEFormatError if the file can't be parsed.
+    """
+    with path.open('rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file.
+            raise PEFormatError('not an executable')
+        with data:
+            try:
+                return parse_pe_info(data)
+            except struct.error as e:
+                raise PEFormatError(str(e))
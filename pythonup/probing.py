@@ -0,0 +1,58 @@
+import concurrent.futures
+import subprocess
+
+import attr
+
+
+# Probes mostly wait on the registry, the disk, or a subprocess.
+DEFAULT_PROBE_WORKERS = 8
+
+
+@attr.s
+class VersionState:
+    """What is known about a version on this machine.
+    """
+    version = attr.ib()
+    installation = attr.ib(default=None)
+    version_info = attr.ib(default=None)
+
+    @property
+    def is_installed(self):
+        return self.installation is not None
+
+    @property
+    def is_upgradable(self):
+        return (
+            self.version_info is not None and
+            tuple(self.version_info) < self.version.version_info
+        )
+
+
+def probe_version(version):
+    """Find whether a version is installed, and what patch version it is.
+    """
+    try:
+        installation = version.get_installation()
+    except FileNotFoundError:
+        return VersionState(version=version)
+    try:
+        version_info = installation.get_version_info()
+    except (OSError, ValueError, SyntaxError, subprocess.CalledProcessError):
+        version_info = None
+    return VersionState(
+        version=version, installation=installation,
+        version_info=version_info,
+    )
+
+
+def probe_versions(versions, *, workers=DEFAULT_PROBE_WORKERS):
+    """Probe versions concurrently.
+
+    Returns a list of VersionState, in the same order as ``versions``.
+    """
+    versions = list(versions)
+    if not versions:
+        return []
+    workers = min(workers, len(versions))
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(probe_version, versions))
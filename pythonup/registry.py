@@ -0,0 +1,136 @@
+import threading
+import winreg
+
+import attr
+
+
+PYTHON_KEY_PATHS = [
+    (winreg.HKEY_CURRENT_USER, 'Software\\Python\\PythonCore'),
+    (winreg.HKEY_LOCAL_MACHINE, 'Software\\Python\\PythonCore'),
+    (winreg.HKEY_LOCAL_MACHINE, 'Software\\Wow6432Node\\Python\\PythonCore'),
+]
+
+
+class WinregBackend:
+    """Read the Windows registry.
+    """
+    def enum_subkeys(self, root, path):
+        with winreg.OpenKey(root, path) as key:
+            subkey_count, _, _ = winreg.QueryInfoKey(key)
+            return [winreg.EnumKey(key, i) for i in range(subkey_count)]
+
+    def query_value(self, root, path, name=''):
+        with winreg.OpenKey(root, path) as key:
+            value, _ = winreg.QueryValueEx(key, name)
+        return value
+
+    def query_values(self, root, path, names):
+        """Read several values from a key, skipping missing ones.
+        """
+        values = {}
+        with winreg.OpenKey(root, path) as key:
+            for name in names:
+                try:
+                    values[name], _ = winreg.QueryValueEx(key, name)
+                except FileNotFoundError:
+                    continue
+        return values
+
+
+@attr.s
+class MemoryBackend:
+    """A registry kept in memory, for testing and benchmarking.
+
+    Keys are ``(root, path)`` pairs, each mapping to a dict of values. Parent
+    keys exist implicitly. ``open_count`` counts keys opened so far.
+    """
+    keys = attr.ib(default=attr.Factory(dict))
+    open_count = attr.ib(default=0)
+
+    def set_value(self, root, path, name, value):
+        self.keys.setdefault((root, path), {})[name] = value
+
+    def _open(self, root, path):
+        self.open_count += 1
+        prefix = path + '\\'
+        children = set()
+        found = (root, path) in self.keys
+        for key_root, key_path in self.keys:
+            if key_root == root and key_path.startswith(prefix):
+                children.add(key_path[len(prefix):].split('\\', 1)[0])
+                found = True
+        if not found:
+            raise FileNotFoundError(path)
+        return sorted(children), self.keys.get((root, path), {})
+
+    def enum_subkeys(self, root, path):
+        children, _ = self._open(root, path)
+        return children
+
+    def query_value(self, root, path, name=''):
+        _, values = self._open(root, path)
+        try:
+            return values[name]
+        except KeyError:
+            raise FileNotFoundError('{}\\{}'.format(path, name))
+
+    def query_values(self, root, path, names):
+        _, values = self._open(root, path)
+        return {name: values[name] for name in names if name in values}
+
+
+def read_install_paths(backend):
+    """Read install paths of all registered Pythons, keyed by name.
+
+    Each key path is enumerated once. If a name is registered under several
+    roots, the first root in ``PYTHON_KEY_PATHS`` wins.
+    """
+    paths = {}
+    for root, prefix in PYTHON_KEY_PATHS:
+        try:
+            names = backend.enum_subkeys(root, prefix)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            if name in paths:
+                continue
+            keypath = '{}\\{}\\InstallPath'.format(prefix, name)
+            try:
+                paths[name] = backend.query_value(root, keypath)
+            except FileNotFoundError:
+                continue
+    return paths
+
+
+_backend = WinregBackend()
+_install_paths = None
+_lock = threading.Lock()
+
+
+def set_backend(backend):
+    global _backend
+    with _lock:
+        _backend = backend
+    invalidate()
+
+
+def get_backend():
+    return _backend
+
+
+def get_install_paths():
+    """Get a snapshot of registered install paths, read once per process.
+    """
+    global _install_paths
+    with _lock:
+        if _install_paths is None:
+            _install_paths = read_install_paths(_backend)
+        return _install_paths
+
+
+def invalidate():
+    """Forget the snapshot. Call this after installing or uninstalling.
+    """
+    global _install_paths
+    with _lock:
+        _install_paths = None
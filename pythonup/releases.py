@@ -5,7 +5,8 @@ import warnings
 
 import attr
 import packaging.version
-import requests
+
+from . import httpclient, utils
 
 
 GITHUB_API_TOKEN_KEY = 'PYTHONUP_GITHUB_API_TOKEN'
@@ -24,7 +25,7 @@ def get_request_headers():
 def get(endpoint):
     url = urllib.parse.urljoin('https://api.github.com', endpoint)
     headers = get_request_headers()
-    resp = requests.get(url, headers=headers)
+    resp = httpclient.get_session().get(url, headers=headers)
     resp.raise_for_status()
     return resp
 
@@ -49,9 +50,8 @@ class ReleaseAsset(Parsable):
     browser_download_url = attr.ib(converter=str)
     size = attr.ib(converter=int)
 
-    def check_download(self, data):
-        assert len(data) == self.size, \
-            'expect {} bytes, got {}'.format(self.size, len(data))
+    def get_download_verifier(self):
+        return utils.SizeVerifier(self.size)
 
 
 def parse_asset_list(data_list):
@@ -0,0 +1,95 @@
+"""Publish scripts pip added or removed, if there are any.
+
+Shims of pip commands run ``python -m pythonup.relink <snapshot>`` after pip
+exits. The active versions' Scripts directories are compared against a
+snapshot taken when scripts were last published, and the rest of PythonUp
+is only loaded if something differs. Keep this module's imports in the
+standard library (and :mod:`pythonup.fileio`, which only uses it), so a pip
+command that changes nothing stays cheap.
+"""
+
+import os
+import sys
+
+from . import fileio
+
+
+# Name of the snapshot file, in the scripts store directory.
+SNAPSHOT_NAME = 'relink.json'
+
+# Bump this when the snapshot layout changes.
+SNAPSHOT_FORMAT = 1
+
+
+def scan_dir(path):
+    """Snapshot entries in a directory as ``{name: [size, mtime_ns]}``.
+
+    This is one ``os.scandir`` pass. On Windows, the stat results come with
+    the directory listing, so no file is opened.
+    """
+    entries = {}
+    try:
+        it = os.scandir(path)
+    except FileNotFoundError:
+        return entries
+    with it:
+        for entry in it:
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:   # Removed while scanning.
+                continue
+            entries[entry.name] = [stat.st_size, stat.st_mtime_ns]
+    return entries
+
+
+def take_snapshot(dirs):
+    return {str(path): scan_dir(str(path)) for path in dirs}
+
+
+def diff_snapshots(old, new):
+    """Names of entries added, removed, or changed between two snapshots.
+    """
+    names = set()
+    for path in old.keys() | new.keys():
+        before = old.get(path, {})
+        after = new.get(path, {})
+        names.update(
+            name for name in before.keys() | after.keys()
+            if before.get(name) != after.get(name)
+        )
+    return names
+
+
+def load_snapshot(path):
+    """Read a snapshot, or None if there isn't a usable one.
+    """
+    data = fileio.read_json(path)
+    if not isinstance(data, dict) or data.get('format') != SNAPSHOT_FORMAT:
+        return None
+    return data.get('dirs')
+
+
+def save_snapshot(path, snapshot):
+    fileio.write_json_atomic(
+        path, {'format': SNAPSHOT_FORMAT, 'dirs': snapshot},
+    )
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) != 1:
+        print('usage: python -m pythonup.relink SNAPSHOT', file=sys.stderr)
+        return 2
+
+    old = load_snapshot(argv[0])
+    if old is not None and not diff_snapshots(old, take_snapshot(old)):
+        return 0
+
+    from .operations.link import request_relink
+    request_relink()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Materialized scripts directories, one per combination of used versions.
+
+The scripts directory on PATH is a link (a junction on Windows) to one of
+these. Switching between combinations only re-points the link.
+"""
+
+import contextlib
+import os
+import shutil
+import stat
+import sys
+import time
+
+import attr
+
+from . import configs, fileio
+
+
+# Number of materialized directories to keep, unless configured otherwise.
+DEFAULT_MAX_SCRIPT_DIRS = 8
+
+# Key of the directory used when no versions are used.
+EMPTY_KEY = '_'
+
+INDEX_NAME = 'index.json'
+
+
+def get_key(names):
+    """Get the key of a combination of version names.
+
+    Order matters, since the first version takes precedence.
+    """
+    return '+'.join(names) or EMPTY_KEY
+
+
+def is_dir_link(path):
+    try:
+        st = os.lstat(str(path))
+    except FileNotFoundError:
+        return False
+    if stat.S_ISLNK(st.st_mode):
+        return True
+    # Junctions are reparse points, but not symbolic links.
+    attributes = getattr(st, 'st_file_attributes', 0)
+    return bool(attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def create_dir_link(target, path):
+    if sys.platform == 'win32':
+        # Junctions don't need the privilege symbolic links do.
+        import _winapi
+        _winapi.CreateJunction(str(target), str(path))
+    else:
+        os.symlink(str(target), str(path), target_is_directory=True)
+
+
+def remove_dir_link(path):
+    """Remove a link to a directory, without touching the directory.
+    """
+    if sys.platform == 'win32':
+        os.rmdir(str(path))
+    else:
+        os.unlink(str(path))
+
+
+@attr.s
+class ScriptDirStore:
+    """Materialized scripts directories, and the link to the current one.
+
+    Directories live in ``root``, keyed by :func:`get_key`, each with a
+    manifest next to it. Least recently used ones are removed beyond
+    ``max_size``. ``index.json`` records the current key and when each was
+    last used.
+    """
+    root = attr.ib()
+    link_path = attr.ib()
+    max_size = attr.ib(default=DEFAULT_MAX_SCRIPT_DIRS)
+    _index = attr.ib(init=False, default=None, repr=False)
+
+    def get_dir(self, key):
+        path = self.root.joinpath(key)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def get_manifest_path(self, key):
+        return self.root.joinpath('{}.manifest.json'.format(key))
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        self._index = fileio.read_json(self.root.joinpath(INDEX_NAME), {})
+        self._index.setdefault('current', None)
+        self._index.setdefault('last_used', {})
+        return self._index
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fileio.write_json_atomic(self.root.joinpath(INDEX_NAME), self._index)
+
+    @property
+    def current(self):
+        """Key of the directory the link points to, or None.
+        """
+        if not is_dir_link(self.link_path):
+            return None
+        return self._load_index()['current']
+
+    def _replace_link(self, target):
+        temp = self.link_path.with_name('.{}.{}.tmp'.format(
+            self.link_path.name, os.getpid(),
+        ))
+        if is_dir_link(temp):
+            remove_dir_link(temp)
+        create_dir_link(target, temp)
+        try:
+            if is_dir_link(self.link_path):
+                # Windows can't replace a directory; this can on POSIX.
+                if sys.platform == 'win32':
+                    remove_dir_link(self.link_path)
+            elif os.path.lexists(str(self.link_path)):
+                # A real directory, from before directories were
+                # materialized. Move it out of the way to remove it.
+                legacy = self.root.joinpath('.legacy-{}'.format(os.getpid()))
+                os.replace(str(self.link_path), str(legacy))
+                shutil.rmtree(str(legacy), ignore_errors=True)
+            os.replace(str(temp), str(self.link_path))
+        except OSError:
+            remove_dir_link(temp)
+            raise
+
+    def switch(self, key):
+        """Point the link at the directory of ``key``.
+
+        Raises OSError if the link can't be replaced.
+        """
+        index = self._load_index()
+        if self.current != key:
+            self._replace_link(self.get_dir(key))
+            index['current'] = key
+        index['last_used'][key] = time.time()
+        self.collect_garbage()
+        self._save_index()
+
+    def collect_garbage(self):
+        """Remove least recently used directories beyond the size limit.
+
+        The current directory is never removed. Returns removed keys.
+        """
+        index = self._load_index()
+        keys = sorted(
+            index['last_used'], key=index['last_used'].get, reverse=True,
+        )
+        removed = []
+        for key in keys[self.max_size:]:
+            if key == index['current']:
+                continue
+            path = self.root.joinpath(key)
+            # Scripts in use (e.g. on Windows) can't be removed. Try later.
+            shutil.rmtree(str(path), ignore_errors=True)
+            if path.exists():
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                self.get_manifest_path(key).unlink()
+            del index['last_used'][key]
+            removed.append(key)
+        return removed
+
+
+def get_store():
+    max_size = configs.get_setting('max_script_dirs', DEFAULT_MAX_SCRIPT_DIRS)
+    return ScriptDirStore(
+        root=configs.get_scripts_store_path(),
+        link_path=configs.get_scripts_dir_path(),
+        max_size=max(int(max_size), 1),
+    )
@@ -0,0 +1,96 @@
+"""Reading and writing shims.
+
+A shim is an pre-compiled executable, with extra data appended to the end
+of it. The extra data contain what command(s) the shim should attempt to
+execute when launched. Arguments are seperated by NULL characters, and
+commands (if there are multiple) are seperated by line feeds. Two extra
+line feeds signify the end of the command sequence.
+
+The extra data are encoded with UTF-8, and written *backwards* into the
+executable. This makes it easier to read data out.
+"""
+
+import os
+import threading
+
+import attr
+
+from . import configs
+
+
+# Bytes of the template's end to compare, along with the trailer, when
+# checking an existing shim.
+TEMPLATE_SAMPLE_SIZE = 4096
+
+
+def encode_trailer(cmds):
+    return bytes(reversed(
+        ('\n'.join('\0'.join(args) for args in cmds) + '\n\n').encode('utf-8')
+    ))
+
+
+@attr.s(frozen=True)
+class ShimTemplate:
+    """The shim executable, which shims are built from by adding a trailer.
+
+    Existing shims are checked against it by size and by the template's
+    last few KiB, so they don't need to be read, or hashed, in whole.
+    """
+    data = attr.ib(repr=False)
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @classmethod
+    def load(cls, path):
+        return cls(data=path.read_bytes())
+
+    def build(self, trailer):
+        return self.data + trailer
+
+    def matches(self, target, trailer):
+        """Check whether ``target`` is a shim of this template and trailer.
+
+        Only the file's size, and its last few KiB, are checked.
+        """
+        try:
+            size = os.stat(str(target)).st_size
+        except FileNotFoundError:
+            return False
+        if size != self.size + len(trailer):
+            return False
+        sample = min(TEMPLATE_SAMPLE_SIZE, self.size)
+        expected = self.data[self.size - sample:] + trailer
+        with target.open('rb') as f:
+            f.seek(-len(expected), os.SEEK_END)
+            return f.read(len(expected)) == expected
+
+    def write(self, target, trailer):
+        # Replace, not overwrite, in case the target is a hard link.
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+        with target.open('wb') as f:
+            f.write(self.build(trailer))
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template():
+    """Get the shim template, read once per process.
+    """
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = ShimTemplate.load(configs.get_shim_path())
+        return _template
+
+
+def clear_template():
+    global _template
+    with _template_lock:
+        _template = None
@@ -0,0 +1,47 @@
+import pathlib
+import urllib.parse
+import urllib.request
+
+from . import configs, mirrors
+
+
+def parse_source(value):
+    """Parse a configured source, either a directory path or a file: URL.
+    """
+    parsed = urllib.parse.urlparse(value)
+    if parsed.scheme != 'file':
+        return pathlib.Path(value)
+    path = urllib.parse.unquote(parsed.path)
+    if parsed.netloc and parsed.netloc != 'localhost':
+        path = '//{}{}'.format(parsed.netloc, path)   # UNC share.
+    return pathlib.Path(urllib.request.url2pathname(path))
+
+
+def get_relative_paths(url):
+    """Possible locations of an installer, relative to a source directory.
+
+    An installer can be placed directly in the directory, or in the same
+    layout as python.org (e.g. ``3.8.10/python-3.8.10-amd64.exe``).
+    """
+    filename = url.rsplit('/', 1)[-1]
+    yield pathlib.PurePosixPath(filename)
+    if url.startswith(mirrors.OFFICIAL_PREFIX + '/'):
+        relative = url[len(mirrors.OFFICIAL_PREFIX) + 1:]
+        if relative != filename:
+            yield pathlib.PurePosixPath(relative)
+
+
+def iter_local_installers(url, sources):
+    """Find files in local ``sources`` that may be the installer at ``url``.
+
+    Candidates are matched by filename only; callers should verify them.
+    """
+    for source in sources:
+        for relative in get_relative_paths(url):
+            path = source.joinpath(*relative.parts)
+            if path.is_file():
+                yield path
+
+
+def get_sources():
+    return [parse_source(v) for v in configs.get_setting('sources', [])]
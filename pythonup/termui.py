@@ -38,5 +38,18 @@ def progressbar(*, length, label, width=36):
     return click.progressbar(**kwargs)
 
 
+class NullProgressBar:
+    """Stand-in for a progress bar that should not be displayed.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def update(self, n):
+        pass
+
+
 def warn(message, category, filename, lineno, file=None, line=None):
     click.echo('WARNING: {}'.format(message), err=True)
@@ -0,0 +1,147 @@
+import re
+import winreg
+
+import attr
+
+from . import configs, fileio, registry
+
+
+UNINSTALL_KEY_PATH = (
+    winreg.HKEY_LOCAL_MACHINE,
+    'Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall',
+)
+
+PUBLISHER = 'Python Software Foundation'
+
+DISPLAY_NAME_RE = re.compile(r'^Python (\d+\.\d+)\.(\d+)')
+
+
+def iter_registered_uninstallers(backend):
+    """Find Python uninstallers in the system's uninstaller list.
+
+    Yields ``(name, patch, product_code)`` tuples, where ``name`` is like
+    ``3.4`` and ``patch`` is like ``3.4.4``.
+    """
+    root, prefix = UNINSTALL_KEY_PATH
+    try:
+        product_codes = backend.enum_subkeys(root, prefix)
+    except FileNotFoundError:
+        return
+    for product_code in product_codes:
+        try:
+            values = backend.query_values(
+                root, '{}\\{}'.format(prefix, product_code),
+                ['DisplayName', 'Publisher'],
+            )
+        except FileNotFoundError:
+            continue
+        if values.get('Publisher') != PUBLISHER:
+            continue
+        match = DISPLAY_NAME_RE.match(values.get('DisplayName', ''))
+        if not match:
+            continue
+        name, micro = match.groups()
+        yield name, '{}.{}'.format(name, micro), product_code
+
+
+def get_patch_sort_key(patch):
+    return tuple(int(part) for part in patch.split('.'))
+
+
+@attr.s
+class UninstallerIndex:
+    """Product codes of installed MSI packages, by version name and patch.
+
+    Codes are recorded when PythonUp installs a version. Installations made
+    otherwise are picked up by :meth:`scan`, which reads the whole system
+    uninstaller list in one pass. The index is saved to ``path``.
+    """
+    path = attr.ib()
+    backend = attr.ib(default=attr.Factory(registry.get_backend))
+    _entries = attr.ib(init=False, default=None, repr=False)
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = fileio.read_json(self.path, {})
+        return self._entries
+
+    def _save(self):
+        fileio.write_json_atomic(self.path, self._entries)
+
+    def get(self, name, patch=None):
+        """Get a recorded product code, or None.
+
+        If ``patch`` is None, the code of the latest patch is returned.
+        """
+        codes = self._load().get(name, {})
+        if patch is None and codes:
+            patch = max(codes, key=get_patch_sort_key)
+        return codes.get(patch)
+
+    def record(self, name, patch, product_code):
+        self._load().setdefault(name, {})[patch] = product_code
+        self._save()
+
+    def forget(self, name):
+        """Remove all recorded product codes of a version.
+        """
+        if self._load().pop(name, None) is not None:
+            self._save()
+
+    def scan(self):
+        """Record every Python uninstaller in the system uninstaller list.
+
+        Returns the number of entries found.
+        """
+        entries = self._load()
+        count = 0
+        for name, patch, product_code in iter_registered_uninstallers(
+                self.backend):
+            entries.setdefault(name, {})[patch] = product_code
+            count += 1
+        self._save()
+        return count
+
+    def find(self, name, patch=None):
+        """Get a product code, scanning the registry if it is not recorded.
+        """
+        product_code = self.get(name, patch)
+        if product_code is None:
+            self.scan()
+            product_code = self.get(name, patch)
+        if product_code is None:
+            raise FileNotFoundError(name)
+        return product_code
+
+
+def get_uninstaller_index():
+    return UninstallerIndex(
+        path=configs.get_base_dir_path().joinpath('uninstallers.json'),
+    )
+
+
+def read_msi_product_code(path):
+    """Read the product code from an MSI package.
+
+    Raises OSError if the package can't be read.
+    """
+    try:
+        import msilib
+    except ImportError as e:
+        raise OSError('msilib is not available') from e
+    try:
+        db = msilib.OpenDatabase(str(path), msilib.MSIDBOPEN_READONLY)
+        view = db.OpenView(
+            "SELECT Value FROM Property WHERE Property = 'ProductCode'",
+        )
+        view.Execute(None)
+        try:
+            record = view.Fetch()
+        finally:
+            view.Close()
+    except msilib.MSIError as e:
+        raise OSError('cannot read {}: {}'.format(path, e)) from e
+    if record is None:
+        raise FileNotFoundError('no ProductCode in {}'.format(path))
+    return record.GetString(1)
@@ -1,45 +1,469 @@
 import atexit
+import concurrent.futures
+import contextlib
+import errno
+import hashlib
+import itertools
+import json
+import mmap
+import os
 import pathlib
+import queue
+import re
 import shutil
 import tempfile
+import threading
 
+import attr
 import requests
 
-from . import termui
+from . import httpclient, termui
 
 
 class DownloadIntegrityError(ValueError):
     pass
 
 
-def download_file(url, *, filename=None, container=None, check=None):
-    response = requests.get(url, stream=True)
+@attr.s
+class HashVerifier:
+    """Verify a download by its digest, computed as chunks arrive.
+    """
+    algorithm = attr.ib()
+    expected = attr.ib()
+    _hash = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        self.reset()
+
+    def reset(self):
+        self._hash = hashlib.new(self.algorithm)
+
+    def update(self, chunk):
+        self._hash.update(chunk)
+
+    def verify(self):
+        checksum = self._hash.hexdigest()
+        if checksum != self.expected:
+            raise DownloadIntegrityError('expect checksum {}, got {}'.format(
+                self.expected, checksum,
+            ))
+
+
+@attr.s
+class SizeVerifier:
+    """Verify a download by its total length.
+    """
+    expected = attr.ib()
+    _size = attr.ib(init=False, default=0, repr=False)
+
+    def reset(self):
+        self._size = 0
+
+    def update(self, chunk):
+        self._size += len(chunk)
+
+    def verify(self):
+        if self._size != self.expected:
+            raise DownloadIntegrityError('expect {} bytes, got {}'.format(
+                self.expected, self._size,
+            ))
+
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+def get_chunk_size(total):
+    """Pick a chunk size so the progress bar moves in roughly 1% steps.
+    """
+    if total is None:
+        return DEFAULT_CHUNK_SIZE
+    return min(max(total // 100, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+
+def get_progressbar(*, length, label):
+    """Get a progress bar, or a stand-in if there is nothing to display.
+    """
+    if length is None or label is None:
+        return termui.NullProgressBar()
+    return termui.progressbar(length=length, label=label)
+
+
+def write_chunks(f, chunks, *, verifier, progress=None):
+    for chunk in chunks:
+        if not chunk:
+            continue
+        f.write(chunk)
+        if verifier is not None:
+            verifier.update(chunk)
+        if progress is not None:
+            progress.update(len(chunk))
+
+
+def feed_file(path, verifier):
+    """Feed content of the file at ``path`` to ``verifier``.
+
+    The file is memory-mapped, so the data is hashed straight out of the page
+    cache instead of being copied through Python buffers.
+    """
+    with path.open('rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return  # Empty files can't be mapped.
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            verifier.update(m)
+
+
+# Errors meaning copy_file_range can't be used for the given files.
+COPY_FILE_RANGE_UNSUPPORTED = frozenset(
+    getattr(errno, name)
+    for name in ('EXDEV', 'ENOSYS', 'EINVAL', 'EOPNOTSUPP', 'EPERM', 'EBADF')
+    if hasattr(errno, name)
+)
+
+
+def _copy_file_range(fsrc, fdst):
+    remaining = os.fstat(fsrc.fileno()).st_size
+    while remaining > 0:
+        copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+        if copied == 0:
+            break
+        remaining -= copied
+
+
+def copy_file(source, target):
+    """Copy file content with the OS's in-kernel copy where available.
+
+    ``copy_file_range`` is tried first (Linux), falling back to
+    :func:`shutil.copyfile`, which uses ``sendfile`` or other fast paths the
+    platform provides.
+    """
+    if hasattr(os, 'copy_file_range'):
+        with source.open('rb') as fsrc, target.open('wb') as fdst:
+            try:
+                _copy_file_range(fsrc, fdst)
+            except OSError as e:
+                if e.errno not in COPY_FILE_RANGE_UNSUPPORTED:
+                    raise
+            else:
+                return
+    shutil.copyfile(str(source), str(target))
+
+
+class IncompleteDownloadError(IOError):
+    pass
+
+
+# Errors after which the transfer can pick up where it left off.
+RESUMABLE_ERRORS = (
+    IncompleteDownloadError,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def get_content_length(response):
+    length = response.headers.get('content-length', '')
+    if not length.isdigit():
+        return None
+    return int(length)
+
+
+def get_range_start(response):
+    match = re.match(
+        r'^bytes (\d+)-\d+/(?:\d+|\*)$',
+        response.headers.get('content-range', ''),
+    )
+    if not match:
+        return None
+    return int(match.group(1))
+
+
+@attr.s
+class PartialFile:
+    """A partially downloaded file, and validators of its source.
+
+    The validators are stored in a JSON file beside the data, so a later
+    attempt (in this process or another) can resume the transfer with a
+    ``Range`` request, guarded by ``If-Range``.
+    """
+    path = attr.ib()
+
+    @property
+    def meta_path(self):
+        return self.path.with_name('{}.json'.format(self.path.name))
+
+    def get_resume_request(self, url):
+        """Return the offset to resume from, and headers to request it.
+        """
+        try:
+            size = self.path.stat().st_size
+            with self.meta_path.open() as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return 0, {}
+        if meta.get('url') != url or not size:
+            return 0, {}
+        if meta.get('length') is not None and size >= meta['length']:
+            return 0, {}
+        # Weak ETags can't be used with If-Range.
+        validator = meta.get('etag')
+        if not validator or validator.startswith('W/'):
+            validator = meta.get('last_modified')
+        if not validator:
+            return 0, {}
+        return size, {
+            'Range': 'bytes={}-'.format(size),
+            'If-Range': validator,
+        }
+
+    def save_validators(self, url, response, length):
+        with self.meta_path.open('w') as f:
+            json.dump({
+                'url': url,
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'length': length,
+            }, f)
+
+    def discard(self):
+        for p in (self.path, self.meta_path):
+            with contextlib.suppress(FileNotFoundError):
+                p.unlink()
+
+    def commit(self, path):
+        os.replace(str(self.path), str(path))
+        with contextlib.suppress(FileNotFoundError):
+            self.meta_path.unlink()
+
+
+def transfer(url, partial, *, label, verifier):
+    offset, headers = partial.get_resume_request(url)
+    response = httpclient.get_session().get(url, stream=True, headers=headers)
+    if offset and response.status_code == 416:
+        # Our partial file does not match the remote; start over.
+        response.close()
+        partial.discard()
+        return transfer(url, partial, label=label, verifier=verifier)
     response.raise_for_status()
+    if response.status_code == 206 and get_range_start(response) != offset:
+        response.close()
+        if not offset:
+            raise IncompleteDownloadError(
+                'unexpected partial content from {}'.format(url),
+            )
+        # The range sent does not fit our partial file; start over.
+        partial.discard()
+        return transfer(url, partial, label=label, verifier=verifier)
 
-    if not filename:
-        filename = url.rsplit('/', 1)[-1]
-    total = response.headers.get('content-length', '')
-    chunks = []
-
-    if total.isdigit():
-        with termui.progressbar(length=int(total), label=filename) as b:
-            for chunk in response.iter_content(chunk_size=4096):
-                chunks.append(chunk)
-                b.update(len(chunk))
-    else:
-        chunks.append(response.content)
-
-    data = b''.join(chunks)
-    if callable(check):
+    length = get_content_length(response)
+    if response.status_code != 206:
+        offset = 0  # Server ignored the range, and is sending everything.
+    elif length is not None:
+        length += offset
+    partial.save_validators(url, response, length)
+
+    if verifier is not None:
+        verifier.reset()
+        if offset:  # Catch up with data we already have.
+            feed_file(partial.path, verifier)
+
+    chunks = response.iter_content(chunk_size=get_chunk_size(length))
+    with partial.path.open('ab' if offset else 'wb') as f:
+        with get_progressbar(length=length, label=label) as b:
+            b.update(offset)
+            write_chunks(f, chunks, verifier=verifier, progress=b)
+        size = f.tell()
+    if length is not None and size != length:
+        raise IncompleteDownloadError('expect {} bytes, got {}'.format(
+            length, size,
+        ))
+
+    if verifier is None:
+        return
+    try:
+        verifier.verify()
+    except DownloadIntegrityError:
+        partial.discard()
+        if not offset:
+            raise
+        # The resumed data did not fit the old part. Try once from scratch.
+        transfer(url, partial, label=label, verifier=verifier)
+
+
+# Each segment should be at least this large to be worth a connection.
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+
+class RangeNotSupported(ValueError):
+    pass
+
+
+def get_segmented_source(url, segments):
+    """Find where and how to download ``url`` in segments.
+
+    Returns a ``(url, length, segments)`` tuple, or None if the server does
+    not support byte ranges, or the file is too small to split.
+    """
+    response = httpclient.get_session().head(url, allow_redirects=True)
+    if not response.ok or response.headers.get('accept-ranges') != 'bytes':
+        return None
+    length = get_content_length(response)
+    if length is None:
+        return None
+    segments = min(segments, length // MIN_SEGMENT_SIZE)
+    if segments < 2:
+        return None
+    return response.url, length, segments
+
+
+def split_segments(length, count):
+    """Split ``length`` bytes into ``count`` ``(start, end)`` pairs.
+    """
+    size, extra = divmod(length, count)
+    start = 0
+    for i in range(count):
+        end = start + size + (i < extra)
+        yield start, end
+        start = end
+
+
+def fetch_segment(url, path, start, end, *, progress, cancelled, retries):
+    offset = start
+    for attempt in itertools.count():
+        headers = {'Range': 'bytes={}-{}'.format(offset, end - 1)}
         try:
-            check(data)
-        except AssertionError as e:
-            raise DownloadIntegrityError(str(e))
+            response = httpclient.get_session().get(
+                url, stream=True, headers=headers,
+            )
+            response.raise_for_status()
+            if (response.status_code != 206 or
+                    get_range_start(response) != offset):
+                raise RangeNotSupported(url)
+            chunks = response.iter_content(
+                chunk_size=get_chunk_size(end - start),
+            )
+            with path.open('r+b') as f:
+                f.seek(offset)
+                for chunk in chunks:
+                    if cancelled.is_set():
+                        return
+                    f.write(chunk)
+                    offset += len(chunk)
+                    progress.put(len(chunk))
+            if offset != end:
+                raise IncompleteDownloadError(
+                    'expect {} bytes, got {}'.format(
+                        end - start, offset - start,
+                    ),
+                )
+        except RESUMABLE_ERRORS:
+            if attempt >= retries:
+                raise
+        else:
+            return
+
+
+def transfer_segmented(source, partial, *, label, verifier, retries):
+    """Download in concurrent byte ranges into a preallocated file.
+
+    Verification happens once, after all segments land.
+    """
+    url, length, segments = source
+    partial.discard()
+    with partial.path.open('wb') as f:
+        f.truncate(length)
+
+    progress = queue.Queue()
+    cancelled = threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(segments) as executor:
+        futures = [
+            executor.submit(
+                fetch_segment, url, partial.path, start, end,
+                progress=progress, cancelled=cancelled, retries=retries,
+            )
+            for start, end in split_segments(length, segments)
+        ]
+        # Progress bars are not thread-safe; only update in this thread.
+        with get_progressbar(length=length, label=label) as b:
+            pending = set(futures)
+            while pending:
+                with contextlib.suppress(queue.Empty):
+                    b.update(progress.get(timeout=0.1))
+                done = {f for f in pending if f.done()}
+                if any(f.exception() is not None for f in done):
+                    cancelled.set()
+                pending -= done
+            while not progress.empty():
+                b.update(progress.get_nowait())
+    try:
+        for future in futures:
+            future.result()
+    except BaseException:
+        partial.discard()
+        raise
+
+    if verifier is None:
+        return
+    verifier.reset()
+    feed_file(partial.path, verifier)
+    try:
+        verifier.verify()
+    except DownloadIntegrityError:
+        partial.discard()
+        raise
+
 
+def download_file(url, *, filename=None, container=None, verifier=None,
+                  retries=3, segments=1, show_progress=True):
+    """Download ``url`` into ``container``, and return the written path.
+
+    The response is streamed into a partial file next to the destination,
+    feeding each chunk to ``verifier`` (an object with ``update(chunk)``,
+    ``reset()``, and ``verify()``) on the way. The file is renamed into place
+    only after the verifier accepts it; otherwise the partial file is removed
+    and ``DownloadIntegrityError`` is raised.
+
+    If the transfer is interrupted, it is retried up to ``retries`` times,
+    resuming from the partial file if the server supports range requests.
+    A partial file left by an earlier run is resumed in the same way.
+
+    With ``segments`` greater than one, a fresh download is split into that
+    many byte ranges fetched concurrently, if the server supports it.
+
+    Pass ``show_progress=False`` when downloading from several threads, since
+    progress bars can't share the terminal.
+    """
+    if not filename:
+        filename = url.rsplit('/', 1)[-1]
     if container is None:
         container = pathlib.Path(tempfile.mkdtemp())
         atexit.register(shutil.rmtree, str(container), ignore_errors=True)
     path = container.joinpath(filename)
-    with path.open('wb') as f:
-        f.write(data)
+    partial = PartialFile(container.joinpath('.{}.part'.format(filename)))
+    label = filename if show_progress else None
+
+    source = None
+    if segments > 1 and not partial.get_resume_request(url)[0]:
+        source = get_segmented_source(url, segments)
+
+    for attempt in itertools.count():
+        try:
+            if source is None:
+                transfer(url, partial, label=label, verifier=verifier)
+            else:
+                transfer_segmented(
+                    source, partial,
+                    label=label, verifier=verifier, retries=retries,
+                )
+        except RangeNotSupported:
+            source = None
+        except RESUMABLE_ERRORS:
+            if attempt >= retries:
+                raise
+        else:
+            break
+
+    partial.commit(path)
     return path
@@ -1,3 +1,4 @@
+import collections
 import enum
 import hashlib
 import json
@@ -9,7 +10,7 @@ import subprocess
 
 import attr
 
-from . import configs, installations, metadata
+from . import configs, installations, metadata, uninstallers, utils
 
 
 class VersionNotFoundError(ValueError):
@@ -29,24 +30,147 @@ class InstallerType(enum.Enum):
 VERSIONS_DIR_PATH = pathlib.Path(__file__).with_name('versions').resolve()
 
 
+CATALOG_PATH = pathlib.Path(__file__).with_name('catalog.json')
+
+# Bump this when the catalog layout changes.
+CATALOG_FORMAT = 1
+
+
+def get_version_data_path(name):
+    return VERSIONS_DIR_PATH.joinpath('{}.json'.format(name))
+
+
+def scan_version_files(versions_dir):
+    """Stat version definitions in ``versions_dir``, in one directory scan.
+    """
+    with os.scandir(str(versions_dir)) as it:
+        return {
+            entry.name[:-len('.json')]: entry.stat()
+            for entry in it
+            if entry.name.endswith('.json') and
+            VERSION_NAME_RE.match(entry.name[:-len('.json')])
+        }
+
+
+def get_file_digest(path):
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def compile_catalog(path=CATALOG_PATH, versions_dir=VERSIONS_DIR_PATH):
+    """Compile version definitions into a single catalog file.
+
+    The catalog records the size, mtime, and checksum of each definition it
+    is compiled from, so it can be detected as stale later.
+    """
+    sources = {}
+    entries = []
+    for name, stat in scan_version_files(versions_dir).items():
+        content = versions_dir.joinpath('{}.json'.format(name)).read_bytes()
+        sources[name] = [
+            stat.st_size, stat.st_mtime_ns, hashlib.md5(content).hexdigest(),
+        ]
+        entries.append({'name': name, 'data': json.loads(content.decode())})
+    entries.sort(key=lambda e: (e['data']['version_info'], e['name']))
+    catalog = {
+        'format': CATALOG_FORMAT,
+        'sources': sources,
+        'versions': entries,
+    }
+    temp = path.with_name('.{}.tmp'.format(path.name))
+    with temp.open('w') as f:
+        json.dump(catalog, f, separators=(',', ':'), sort_keys=True)
+    os.replace(str(temp), str(path))
+
+
+def is_catalog_fresh(catalog, versions_dir):
+    sources = catalog['sources']
+    stats = scan_version_files(versions_dir)
+    if stats.keys() != sources.keys():
+        return False
+    for name, stat in stats.items():
+        size, mtime_ns, digest = sources[name]
+        if stat.st_size != size:
+            return False
+        # A VCS checkout may touch files without changing them.
+        if stat.st_mtime_ns != mtime_ns:
+            path = versions_dir.joinpath('{}.json'.format(name))
+            if get_file_digest(path) != digest:
+                return False
+    return True
+
+
+def read_catalog(path=CATALOG_PATH, versions_dir=VERSIONS_DIR_PATH):
+    """Read the compiled catalog as an ordered mapping of name to data.
+
+    Returns None if the catalog is missing, or stale compared to the version
+    definitions, in which case the definitions should be read instead.
+    """
+    try:
+        with path.open() as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if catalog.get('format') != CATALOG_FORMAT:
+        return None
+    if not is_catalog_fresh(catalog, versions_dir):
+        return None
+    return collections.OrderedDict(
+        (entry['name'], entry['data']) for entry in catalog['versions']
+    )
+
+
+_catalog = None
+_catalog_loaded = False
+
+
+def get_catalog():
+    """Get the compiled catalog, read lazily once per process.
+    """
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        _catalog = read_catalog()
+        _catalog_loaded = True
+    return _catalog
+
+
+def invalidate_catalog():
+    global _catalog, _catalog_loaded
+    _catalog = None
+    _catalog_loaded = False
+    clear_interned()
+
+
 def load_version_data(name):
+    catalog = get_catalog()
+    if catalog is not None:
+        try:
+            return catalog[name]
+        except KeyError:
+            raise VersionNotFoundError(name)
     try:
-        with VERSIONS_DIR_PATH.joinpath('{}.json'.format(name)).open() as f:
+        with get_version_data_path(name).open() as f:
             data = json.load(f)
     except FileNotFoundError:
         raise VersionNotFoundError(name)
     return data
 
 
-@attr.s
+@attr.s(slots=True, frozen=True)
 class Version:
+    """A Python version definition.
 
+    Instances are immutable and hashable. Paths to commands are derived from
+    the installation's configuration once, when first accessed.
+    """
     name = attr.ib()
     url = attr.ib()
     md5_sum = attr.ib()
     version_info = attr.ib(converter=tuple)
-    product_codes = attr.ib(default=attr.Factory(dict))
+    product_codes = attr.ib(default=attr.Factory(dict), hash=False)
     forced_32 = attr.ib(default=False)
+    _paths = attr.ib(
+        init=False, default=None, repr=False, eq=False, hash=False,
+    )
 
     def __str__(self):
         return 'Python {}'.format(self.name)
@@ -62,26 +186,33 @@ class Version:
             return {self.name, self.arch_free_name}
         return {self.name}
 
+    def _get_paths(self):
+        if self._paths is not None:
+            return self._paths
+        cmd_dir = configs.get_cmd_dir_path()
+        names = self.script_version_names
+        paths = (
+            tuple(cmd_dir.joinpath('python{}.exe'.format(n)) for n in names),
+            tuple(cmd_dir.joinpath('pip{}.exe'.format(n)) for n in names),
+            configs.get_scripts_dir_path().joinpath(
+                'python{}.exe'.format(self.version_info[0]),
+            ),
+        )
+        # Frozen; bypass the guard to fill in the cache.
+        object.__setattr__(self, '_paths', paths)
+        return paths
+
     @property
     def python_commands(self):
-        dirpath = configs.get_cmd_dir_path()
-        return [
-            dirpath.joinpath('python{}.exe'.format(name))
-            for name in self.script_version_names
-        ]
+        return self._get_paths()[0]
 
     @property
     def pip_commands(self):
-        dirpath = configs.get_cmd_dir_path()
-        return [
-            dirpath.joinpath('pip{}.exe'.format(name))
-            for name in self.script_version_names
-        ]
+        return self._get_paths()[1]
 
     @property
     def python_major_command(self):
-        dirpath = configs.get_scripts_dir_path()
-        return dirpath.joinpath('python{}.exe'.format(self.version_info[0]))
+        return self._get_paths()[2]
 
     def get_installation(self):
         path = metadata.get_install_path(self.name).resolve(strict=True)
@@ -94,10 +225,8 @@ class Version:
             return False
         return exists
 
-    def check_installer(self, data):
-        checksum = hashlib.md5(data).hexdigest()
-        assert checksum == self.md5_sum, \
-            'expect checksum {}, got {}'.format(self.md5_sum, checksum)
+    def get_installer_verifier(self):
+        return utils.HashVerifier('md5', self.md5_sum)
 
     def get_target_for_install(self):
         return pathlib.Path(
@@ -106,6 +235,7 @@ class Version:
         )
 
 
+@attr.s(slots=True, frozen=True)
 class CPythonMSIVersion(Version):
 
     @classmethod
@@ -138,9 +268,24 @@ class CPythonMSIVersion(Version):
             shell=True,     # So we don't need to know what msiexec is.
         )
 
+    def _record_product_code(self, cmd):
+        index = uninstallers.get_uninstaller_index()
+        try:
+            product_code = uninstallers.read_msi_product_code(cmd)
+        except OSError:
+            # Not fatal. The installer just registered itself, so a scan of
+            # the system uninstaller list finds it instead.
+            index.scan()
+            return
+        index.record(
+            self.name, '{0[0]}.{0[1]}.{0[2]}'.format(self.version_info),
+            product_code,
+        )
+
     def install(self, cmd):
         dirpath = self.get_target_for_install()
         self._run_installer(cmd, dirpath)
+        self._record_product_code(cmd)
         return dirpath
 
     def upgrade(self, cmd):
@@ -158,18 +303,27 @@ class CPythonMSIVersion(Version):
         # where the installation is. This will leave old components (e.g. old
         # docs) unmodified and out of sync, but there's nothing we can do.
         version._run_installer(cmd, installation.path)
+        version._record_product_code(cmd)
 
     def get_cached_uninstaller(self):
         info = self.get_installation().get_version_info()
         try:
-            return self.product_codes['{0[0]}.{0[1]}.{0[2]}'.format(info)]
-        except (IndexError, KeyError, TypeError):
-            return metadata.find_uninstaller_id(self.name)
+            patch = '{0[0]}.{0[1]}.{0[2]}'.format(info)
+        except (IndexError, TypeError):
+            patch = None
+        try:
+            return self.product_codes[patch]
+        except KeyError:
+            pass
+        index = uninstallers.get_uninstaller_index()
+        return index.find(self.name, patch)
 
     def uninstall(self, cmd):
         subprocess.check_call('msiexec /x "{}" /qb'.format(cmd), shell=True)
+        uninstallers.get_uninstaller_index().forget(self.name)
 
 
+@attr.s(slots=True, frozen=True)
 class CPythonVersion(Version):
 
     @classmethod
@@ -209,23 +363,52 @@ class CPythonVersion(Version):
         subprocess.check_call([cmd, '/uninstall', '/passive'])
 
 
+# Versions already loaded, keyed by get_version() arguments.
+_interned = {}
+
+
 def get_version(name, *, force_32):
+    """Get a version by name.
+
+    Each name is loaded once per process; later lookups get the same object.
+    """
+    key = (name, force_32)
+    try:
+        return _interned[key]
+    except KeyError:
+        pass
     data = load_version_data(name)
     installer_type = InstallerType(data['type'])
     klass = {
         InstallerType.cpython_msi: CPythonMSIVersion,
         InstallerType.cpython: CPythonVersion,
     }[installer_type]
-    return klass.load(name, data, force_32=force_32)
+    version = klass.load(name, data, force_32=force_32)
+    return _interned.setdefault(key, version)
+
+
+def clear_interned():
+    """Forget loaded versions, so they are loaded again on next lookup.
+    """
+    _interned.clear()
 
 
 VERSION_NAME_RE = re.compile(r'^\d+\.\d+(?:\-32)?$')
 
 
+def get_version_names():
+    catalog = get_catalog()
+    if catalog is not None:
+        return list(catalog)
+    return [
+        p.stem for p in VERSIONS_DIR_PATH.iterdir()
+        if p.suffix == '.json' and VERSION_NAME_RE.match(p.stem)
+    ]
+
+
 def get_versions():
     versions = (
-        get_version(p.stem, force_32=False)
-        for p in VERSIONS_DIR_PATH.iterdir()
-        if p.suffix == '.json' and VERSION_NAME_RE.match(p.stem)
+        get_version(name, force_32=False)
+        for name in get_version_names()
     )
     return sorted(versions, key=operator.attrgetter("version_info"))
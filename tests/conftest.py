@@ -1,6 +1,156 @@
+import hashlib
+import http.server
+import re
+import socketserver
+import threading
 import unittest.mock
 import sys
 
+import pytest
+
+import pythonup.httpclient
+
 
 def pytest_collectstart():
     sys.modules['winreg'] = unittest.mock.Mock()
+
+
+class FileRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def get_range(self, data, etag):
+        if not self.server.accept_ranges:
+            return None
+        match = re.match(r'^bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if not match:
+            return None
+        if self.headers.get('If-Range', etag) != etag:
+            return None
+        start = int(match.group(1))
+        end = int(match.group(2)) + 1 if match.group(2) else len(data)
+        return start, min(end, len(data))
+
+    def send_head(self):
+        self.server.requests.append((self.command, self.path, self.headers))
+        try:
+            data = self.server.files[self.path]
+        except KeyError:
+            self.send_error(404)
+            return None
+        etag = '"{}"'.format(hashlib.md5(data).hexdigest())
+        byte_range = self.get_range(data, etag)
+        if byte_range is None:
+            self.send_response(200)
+            body = data
+        elif byte_range[0] >= len(data):
+            self.send_error(416)
+            return None
+        else:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                start, end - 1, len(data),
+            ))
+            body = data[start:end]
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        if self.server.accept_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self.send_head()
+
+    def do_GET(self):
+        body = self.send_head()
+        if body is None:
+            return
+
+        # Simulate a dropped connection.
+        cutoff = self.server.interruptions.pop(self.path, None)
+        if cutoff is not None:
+            self.wfile.write(body[:cutoff])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class FileServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Local stand-in for python.org, serving ``files`` by URL path.
+
+    Set ``interruptions[path]`` to a byte count to drop the connection after
+    sending that many bytes of the next response to ``path``.
+    """
+    daemon_threads = True
+
+    def __init__(self, handler_class=FileRequestHandler):
+        super().__init__(('127.0.0.1', 0), handler_class)
+        self.files = {}
+        self.requests = []
+        self.interruptions = {}
+        self.accept_ranges = True
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}{}'.format(self.server_port, path)
+
+
+@pytest.fixture
+def start_file_server():
+    servers = []
+
+    def start():
+        server = FileServer()
+        thread = threading.Thread(
+            target=server.serve_forever, kwargs={'poll_interval': 0.05},
+            daemon=True,
+        )
+        thread.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def file_server(start_file_server):
+    return start_file_server()
+
+
+@pytest.fixture(autouse=True)
+def http_session(monkeypatch):
+    """Use a session with default options, instead of reading user settings.
+    """
+    session = pythonup.httpclient.Session()
+    monkeypatch.setattr(pythonup.httpclient, '_session', session)
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def interned_versions():
+    """Don't share loaded versions, and their cached paths, between tests.
+    """
+    import pythonup.versions
+    pythonup.versions.clear_interned()
+    yield
+    pythonup.versions.clear_interned()
+
+
+@pytest.fixture(autouse=True)
+def registry_backend():
+    """Replace the Windows registry with an empty in-memory one.
+    """
+    import pythonup.registry
+    backend = pythonup.registry.MemoryBackend()
+    pythonup.registry.set_backend(backend)
+    yield backend
+    pythonup.registry.set_backend(pythonup.registry.WinregBackend())
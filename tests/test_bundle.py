@@ -0,0 +1,103 @@
+import hashlib
+import json
+import pathlib
+import zipfile
+
+import click
+import pytest
+
+import pythonup.caches
+import pythonup.operations.bundle
+import pythonup.versions
+
+
+DATA = b'installer' * 1024
+
+
+@pytest.fixture
+def root(tmpdir):
+    return pathlib.Path(str(tmpdir))
+
+
+@pytest.fixture
+def version():
+    return pythonup.versions.CPythonVersion(
+        name='3.8',
+        url='https://www.python.org/ftp/python/3.8.10/python-3.8.10.exe',
+        md5_sum=hashlib.md5(DATA).hexdigest(),
+        version_info=(3, 8, 10),
+    )
+
+
+@pytest.fixture
+def cache(root, mocker):
+    cache = pythonup.caches.InstallerCache(root=root.joinpath('cache'))
+    mocker.patch.object(
+        pythonup.operations.bundle.caches, 'get_installer_cache',
+        return_value=cache,
+    )
+    return cache
+
+
+@pytest.fixture
+def installer(root, version, mocker):
+    path = root.joinpath('python-3.8.10.exe')
+    path.write_bytes(DATA)
+    mocker.patch.object(
+        pythonup.operations.bundle, 'iter_installers',
+        return_value=[(version, path)],
+    )
+    return path
+
+
+def test_export_import(root, version, installer, cache):
+    bundle = root.joinpath('bundle.zip')
+    ctx = click.Context(click.Command('export'))
+    pythonup.operations.bundle.export.__wrapped__(
+        ctx, versions=[version], output=str(bundle),
+    )
+
+    with zipfile.ZipFile(str(bundle)) as zf:
+        index = json.loads(zf.read('index.json').decode('utf-8'))
+        arcname = 'installers/{}/python-3.8.10.exe'.format(version.md5_sum)
+        assert zf.read(arcname) == DATA
+        assert zf.getinfo(arcname).compress_type == zipfile.ZIP_STORED
+        assert json.loads(zf.read('versions/3.8.json').decode('utf-8'))
+    assert index['versions'] == [{
+        'name': '3.8',
+        'url': version.url,
+        'md5_sum': version.md5_sum,
+        'installer': arcname,
+        'spec': 'versions/3.8.json',
+    }]
+
+    assert cache.get(version.md5_sum) is None
+    pythonup.operations.bundle.import_(ctx, bundle=str(bundle))
+    assert cache.get(version.md5_sum).read_bytes() == DATA
+
+
+def test_get_known_checksums():
+    assert pythonup.operations.bundle.get_known_checksums('2.7') == {
+        '0ffa44a86522f9a37b916b361eebc552',
+        '023e49c9fba54914ebc05c4662a93ffe',
+    }
+    assert pythonup.operations.bundle.get_known_checksums('1.0') == set()
+
+
+@pytest.mark.parametrize('md5_sum, installer', [
+    ('../escaped', 'installers/x/python-3.8.10.exe'),
+    ('0' * 32 + '\n', 'installers/x/python-3.8.10.exe'),
+    ('0' * 32, 'installers/x/..'),
+])
+def test_import_rejects_unsafe_entries(root, cache, md5_sum, installer):
+    bundle = root.joinpath('bundle.zip')
+    with zipfile.ZipFile(str(bundle), 'w') as zf:
+        zf.writestr(installer, DATA)
+        zf.writestr('index.json', json.dumps({'format': 1, 'versions': [{
+            'name': '3.8', 'md5_sum': md5_sum, 'installer': installer,
+        }]}))
+
+    ctx = click.Context(click.Command('import'))
+    with pytest.raises(click.exceptions.Exit):
+        pythonup.operations.bundle.import_(ctx, bundle=str(bundle))
+    assert sorted(p.name for p in root.iterdir()) == ['bundle.zip']
@@ -0,0 +1,177 @@
+import hashlib
+import io
+import os
+import pathlib
+import threading
+
+import pytest
+
+import pythonup.caches
+import pythonup.utils
+
+
+PAYLOADS = {
+    '/3.8/python-3.8.10.exe': b'3.8' * 1024,
+    '/3.9/python-3.9.9.exe': b'3.9' * 1024,
+    '/3.10/python-3.10.1.exe': b'3.10' * 1024,
+}
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+@pytest.fixture
+def server(file_server):
+    file_server.files.update(PAYLOADS)
+    return file_server
+
+
+@pytest.fixture
+def cache(tmpdir):
+    root = pathlib.Path(str(tmpdir)).joinpath('installers')
+    return pythonup.caches.InstallerCache(root=root)
+
+
+def fetch(server, cache, path):
+    return cache.fetch(server.url(path), md5(PAYLOADS[path]))
+
+
+def test_fetch_then_get(server, cache):
+    data = PAYLOADS['/3.8/python-3.8.10.exe']
+    assert cache.get(md5(data)) is None
+    path = fetch(server, cache, '/3.8/python-3.8.10.exe')
+    assert path.name == 'python-3.8.10.exe'
+    assert path.read_bytes() == data
+    assert cache.get(md5(data)) == path
+    assert fetch(server, cache, '/3.8/python-3.8.10.exe') == path
+    assert len(server.requests) == 1
+
+
+def test_fetch_mismatch(server, cache):
+    with pytest.raises(pythonup.utils.DownloadIntegrityError):
+        cache.fetch(server.url('/3.8/python-3.8.10.exe'), '0' * 32)
+    assert cache.get('0' * 32) is None
+    assert list(cache.iter_entries()) == []
+
+
+def test_fetch_single_flight(server, cache):
+    results = []
+
+    def target():
+        results.append(fetch(server, cache, '/3.9/python-3.9.9.exe'))
+
+    threads = [threading.Thread(target=target) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == 1
+    assert len(results) == 4
+    assert len(server.requests) == 1
+
+
+def test_prune_lru(server, cache):
+    paths = [fetch(server, cache, p) for p in sorted(PAYLOADS)]
+    for i, path in enumerate(paths):
+        os.utime(str(path), (i, i))
+
+    # Using an entry makes it the most recent.
+    cache.get(md5(paths[0].read_bytes()))
+
+    evicted = cache.prune(paths[0].stat().st_size + paths[2].stat().st_size)
+    assert [e.path for e in evicted] == [paths[1]]
+    assert sorted(e.path for e in cache.iter_entries()) == [
+        paths[0], paths[2],
+    ]
+
+
+def test_clear(server, cache):
+    for p in PAYLOADS:
+        fetch(server, cache, p)
+    assert len(cache.clear()) == len(PAYLOADS)
+    assert list(cache.iter_entries()) == []
+
+
+def test_ingest(cache, tmpdir):
+    data = PAYLOADS['/3.8/python-3.8.10.exe']
+    source = pathlib.Path(str(tmpdir)).joinpath('python-3.8.10.exe')
+    source.write_bytes(data)
+
+    path = cache.ingest(source, md5(data))
+    assert path.name == 'python-3.8.10.exe'
+    assert path.read_bytes() == data
+    assert cache.get(md5(data)) == path
+    assert source.exists()
+
+
+def test_ingest_mismatch(cache, tmpdir):
+    source = pathlib.Path(str(tmpdir)).joinpath('python-3.8.10.exe')
+    source.write_bytes(b'corrupted')
+    with pytest.raises(pythonup.utils.DownloadIntegrityError):
+        cache.ingest(source, md5(PAYLOADS['/3.8/python-3.8.10.exe']))
+    assert list(cache.iter_entries()) == []
+    assert not any(p.is_file() for p in cache.root.rglob('*.part'))
+
+
+def test_store_rejects_unsafe_paths(tmp_path):
+    cache = pythonup.caches.InstallerCache(root=tmp_path.joinpath('cache'))
+    with pytest.raises(ValueError):
+        cache.ingest_stream(io.BytesIO(b''), '../escaped', 'python.exe')
+    with pytest.raises(ValueError):
+        cache.ingest_stream(io.BytesIO(b''), 'a' * 32, '../python.exe')
+    assert not tmp_path.joinpath('cache').exists()
+
+
+def test_fetch_keeps_batch(server, cache):
+    names = sorted(PAYLOADS)
+    keep = frozenset(md5(PAYLOADS[p]) for p in names)
+    cache.size_limit = 1
+    paths = [
+        cache.fetch(server.url(p), md5(PAYLOADS[p]), keep=keep)
+        for p in names
+    ]
+    assert all(path.exists() for path in paths)
+
+    # Without a batch, only the newest one is kept.
+    fetch(server, cache, names[0])
+    assert [e.path for e in cache.iter_entries()] == [paths[0]]
+
+
+def make_partial(cache, md5_sum, mtime=None):
+    partial = cache.root.joinpath(md5_sum, '.python.exe.part')
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(b'partial')
+    cache.root.joinpath('{}.lock'.format(md5_sum)).touch()
+    if mtime is not None:
+        os.utime(str(partial), (mtime, mtime))
+    return partial
+
+
+def test_prune_removes_abandoned_partials(cache):
+    stale = make_partial(cache, 'a' * 32, mtime=0)
+    fresh = make_partial(cache, 'b' * 32)
+    cache.root.joinpath('{}.lock'.format('c' * 32)).touch()
+
+    assert cache.prune() == []
+    assert not stale.parent.exists()
+    assert fresh.exists()
+    assert sorted(p.name for p in cache.root.iterdir()) == [
+        'b' * 32, '{}.lock'.format('b' * 32),
+    ]
+
+
+def test_clear_removes_partials(server, cache):
+    fetch(server, cache, '/3.8/python-3.8.10.exe')
+    make_partial(cache, 'a' * 32)
+    cache.clear()
+    assert list(cache.root.iterdir()) == []
+
+
+def test_remove_partials_skips_locked(cache):
+    partial = make_partial(cache, 'a' * 32, mtime=0)
+    with cache._get_lock('a' * 32):
+        assert cache.remove_partials() == []
+    assert partial.exists()
+    assert cache.remove_partials() == ['a' * 32]
@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import sys
+
+import pytest
+
+import pythonup.configs
+
+
+@pytest.fixture
+def configuration(tmp_path):
+    package = tmp_path.joinpath('pythonup')
+    package.mkdir()
+    path = package.joinpath('installation.json')
+    path.write_text(json.dumps({
+        'base_dir': '..',
+        'cmd_dir': '../cmd',
+        'scripts_dir': '../scripts',
+    }))
+    return pythonup.configs.Configuration(path=path)
+
+
+def test_get_value_reads_once(mocker, configuration):
+    spy = mocker.spy(configuration.path.__class__, 'open')
+    assert configuration.get_value('cmd_dir') == '../cmd'
+    assert configuration.get_value('scripts_dir') == '../scripts'
+    assert spy.call_count == 1
+
+
+def test_get_directory_lazy(tmp_path, configuration):
+    assert not tmp_path.joinpath('cmd').exists()
+    path = configuration.get_directory('cmd_dir')
+    assert path == tmp_path.joinpath('cmd').resolve()
+    assert path.is_dir()
+    assert not tmp_path.joinpath('scripts').exists()
+
+
+def test_get_directory_cached(mocker, tmp_path, configuration):
+    path = configuration.get_directory('cmd_dir')
+    mkdir = mocker.patch.object(path.__class__, 'mkdir')
+    resolve = mocker.patch.object(path.__class__, 'resolve')
+    assert configuration.get_directory('cmd_dir') == path
+    mkdir.assert_not_called()
+    resolve.assert_not_called()
+
+
+def test_get_subdirectory(tmp_path, configuration):
+    path = configuration.get_subdirectory('base_dir', 'cache')
+    assert path == tmp_path.resolve().joinpath('cache')
+    assert path.is_dir()
+
+
+def test_invalidate():
+    configuration = pythonup.configs.get_configuration()
+    assert pythonup.configs.get_configuration() is configuration
+    pythonup.configs.invalidate()
+    assert pythonup.configs.get_configuration() is not configuration
+
+
+def test_get_active_names_does_not_create(mocker, tmp_path):
+    conf_path = tmp_path.joinpath('config')
+    mocker.patch.object(
+        pythonup.configs, 'get_conf_path', return_value=conf_path,
+    )
+    assert pythonup.configs.get_active_names() == []
+    assert not conf_path.exists()
+
+    conf_path.write_text(json.dumps({'using': ['3.6'], 'mirrors': []}))
+    assert pythonup.configs.get_active_names() == ['3.6']
+    assert pythonup.configs.get_setting('mirrors') == []
+
+
+@pytest.fixture
+def conf_path(mocker, tmp_path):
+    conf_path = tmp_path.joinpath('config')
+    mocker.patch.object(
+        pythonup.configs, 'get_conf_path', return_value=conf_path,
+    )
+    pythonup.configs.invalidate()
+    yield conf_path
+    pythonup.configs.invalidate()
+
+
+def test_set_active_names_keeps_settings(conf_path):
+    conf_path.write_text(json.dumps({'using': ['3.6'], 'mirrors': ['a']}))
+    pythonup.configs.set_active_names(['3.7', '3.6'])
+    assert json.loads(conf_path.read_text()) == {
+        'using': ['3.7', '3.6'], 'mirrors': ['a'],
+    }
+    assert sorted(p.name for p in conf_path.parent.iterdir()) == [
+        'config', 'config.lock',
+    ]
+
+
+def test_load_conf_cached(mocker, conf_path):
+    pythonup.configs.set_active_names(['3.6'])
+    read = mocker.spy(pythonup.configs, 'read_conf')
+    assert pythonup.configs.get_active_names() == ['3.6']
+    assert pythonup.configs.get_setting('mirrors') is None
+    assert read.call_count == 1
+
+    pythonup.configs.set_active_names(['3.7'])
+    read.reset_mock()
+    assert pythonup.configs.get_active_names() == ['3.7']
+    assert read.call_count == 1
+
+
+def write_and_read(conf_path, index, barrier, errors):
+    barrier.wait()
+    for i in range(20):
+        def update(data):
+            data[str(index)] = i
+            data['using'] = ['3.6']
+        pythonup.configs.update_conf(update)
+        # Readers don't lock, but never see a partial file.
+        data = pythonup.configs.read_conf(conf_path)
+        if data.get('using') != ['3.6'] or data.get(str(index)) != i:
+            errors.put(data)
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='needs fork')
+def test_update_conf_concurrent(conf_path):
+    count = 8
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(count)
+    errors = context.Queue()
+    processes = [
+        context.Process(
+            target=write_and_read, args=(conf_path, i, barrier, errors),
+        )
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert [p.exitcode for p in processes] == [0] * count
+    assert errors.empty()
+
+    expected = {str(i): 19 for i in range(count)}
+    expected['using'] = ['3.6']
+    assert json.loads(conf_path.read_text()) == expected
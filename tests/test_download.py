@@ -0,0 +1,68 @@
+import hashlib
+import pathlib
+
+import pytest
+
+import pythonup.caches
+import pythonup.operations.download
+import pythonup.versions
+
+
+@pytest.fixture
+def cache(tmpdir, mocker):
+    cache = pythonup.caches.InstallerCache(
+        root=pathlib.Path(str(tmpdir)).joinpath('installers'),
+    )
+    mocker.patch.object(
+        pythonup.operations.download.caches, 'get_installer_cache',
+        return_value=cache,
+    )
+    mocker.patch.object(
+        pythonup.operations.download.configs, 'get_setting',
+        side_effect=lambda key, default=None: default,
+    )
+    return cache
+
+
+def make_version(server, name, data):
+    path = '/{}/python-{}.exe'.format(name, name)
+    server.files[path] = data
+    return pythonup.versions.CPythonVersion(
+        name=name, url=server.url(path),
+        md5_sum=hashlib.md5(data).hexdigest(), version_info=(3, 0, 0),
+    )
+
+
+def test_iter_installers(file_server, cache):
+    versions = [
+        make_version(file_server, name, name.encode('ascii') * 1024)
+        for name in ('3.8', '3.9', '3.10')
+    ]
+    results = dict(
+        (v.name, p)
+        for v, p in pythonup.operations.download.iter_installers(versions)
+    )
+    assert sorted(results) == ['3.10', '3.8', '3.9']
+    for version in versions:
+        assert results[version.name] == cache.get(version.md5_sum)
+
+
+def test_iter_installers_failure(file_server, cache):
+    good = make_version(file_server, '3.8', b'3.8' * 1024)
+    bad = make_version(file_server, '3.9', b'3.9' * 1024)
+    file_server.files['/3.9/python-3.9.exe'] = b'corrupted'
+    results = dict(
+        (v.name, p)
+        for v, p in pythonup.operations.download.iter_installers([good, bad])
+    )
+    assert results == {'3.8': cache.get(good.md5_sum), '3.9': None}
+
+
+def test_iter_installers_keeps_batch(file_server, cache):
+    cache.size_limit = 1
+    versions = [
+        make_version(file_server, name, name.encode('ascii') * 1024)
+        for name in ('3.8', '3.9', '3.10')
+    ]
+    results = list(pythonup.operations.download.iter_installers(versions))
+    assert all(path.exists() for _, path in results)
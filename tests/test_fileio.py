@@ -0,0 +1,43 @@
+import pytest
+
+from pythonup import fileio
+
+
+def test_write_json_atomic(tmp_path):
+    path = tmp_path.joinpath('state.json')
+    fileio.write_json_atomic(path, {'a': 1})
+    fileio.write_json_atomic(path, {'b': 2})
+    assert fileio.read_json(path) == {'b': 2}
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
+
+
+def test_write_json_atomic_failure(tmp_path):
+    path = tmp_path.joinpath('state.json')
+    fileio.write_json_atomic(path, {'a': 1})
+    with pytest.raises(TypeError):
+        fileio.write_json_atomic(path, {'a': object()})
+    assert fileio.read_json(path) == {'a': 1}
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
+
+
+def test_read_json_default(tmp_path):
+    path = tmp_path.joinpath('state.json')
+    assert fileio.read_json(path) is None
+    path.write_text('{"a": ')
+    assert fileio.read_json(path, {}) == {}
+
+
+def test_replace_file_retries(mocker):
+    sleep = mocker.patch.object(fileio.time, 'sleep')
+    replace = mocker.patch.object(fileio.os, 'replace', side_effect=[
+        PermissionError(13, 'in use'), PermissionError(13, 'in use'), None,
+    ])
+    fileio.replace_file('source', 'target')
+    assert replace.call_count == 3
+    assert sleep.call_count == 2
+
+    replace.reset_mock()
+    replace.side_effect = PermissionError(13, 'in use')
+    with pytest.raises(PermissionError):
+        fileio.replace_file('source', 'target')
+    assert replace.call_count == fileio.REPLACE_ATTEMPTS
@@ -0,0 +1,74 @@
+import pathlib
+import subprocess
+
+import attr
+import click
+import pytest
+
+from pythonup.operations import install
+
+
+@attr.s
+class FakeVersion:
+
+    name = attr.ib()
+    fails = attr.ib(default=False)
+
+    def __str__(self):
+        return 'Python {}'.format(self.name)
+
+    def is_installed(self):
+        return False
+
+    def install(self, cmd):
+        if self.fails:
+            raise subprocess.CalledProcessError(1603, ['msiexec', cmd])
+        return 'C:\\Python{}'.format(self.name.replace('.', ''))
+
+
+@pytest.fixture
+def operations(mocker):
+    def iter_installers(versions):
+        for version in versions:
+            yield version, pathlib.Path('python-{}.exe'.format(version.name))
+
+    return mocker.patch.multiple(
+        install,
+        iter_installers=iter_installers,
+        link_commands=mocker.DEFAULT,
+        activate=mocker.DEFAULT,
+        get_versions=mocker.Mock(return_value=[]),
+        get_active_names=mocker.Mock(return_value=[]),
+        registry=mocker.DEFAULT,
+    )
+
+
+def run_install(versions):
+    ctx = click.Context(click.Command('install'))
+    with ctx:
+        install.install.__wrapped__(
+            ctx, versions=versions, use=None, from_file=None,
+        )
+
+
+def test_install_multiple(operations):
+    versions = [FakeVersion('3.6'), FakeVersion('3.7')]
+    run_install(versions)
+    linked = [c[0][0] for c in operations['link_commands'].call_args_list]
+    assert linked == versions
+    operations['activate'].assert_called_once_with(versions, allow_empty=True)
+
+
+def test_install_failure_continues(operations):
+    versions = [FakeVersion('3.6'), FakeVersion('3.7', fails=True),
+                FakeVersion('3.8')]
+    with pytest.raises(click.exceptions.Exit) as ctx:
+        run_install(versions)
+    assert ctx.value.exit_code == 1
+
+    installed = [versions[0], versions[2]]
+    linked = [c[0][0] for c in operations['link_commands'].call_args_list]
+    assert linked == installed
+    operations['activate'].assert_called_once_with(
+        installed, allow_empty=True,
+    )
@@ -1,4 +1,6 @@
 import pathlib
+import sys
+import sysconfig
 import uuid
 
 import pytest
@@ -26,3 +28,58 @@ def test_python(instpath, installation):
 
 def test_pip(instpath, installation):
     assert installation.pip == instpath.joinpath('Scripts', 'pip.exe')
+
+
+def test_run_probe():
+    result = pythonup.installations.run_probe(pathlib.Path(sys.executable))
+    assert result.version_info == tuple(sys.version_info[:3])
+    assert result.is_32bit == (sys.maxsize <= 2 ** 32)
+    assert result.prefix == sys.prefix
+    assert result.scripts_dir == sysconfig.get_path('scripts')
+
+
+@pytest.fixture
+def probe_cache(tmp_path, mocker):
+    prober = mocker.Mock(return_value=pythonup.installations.ProbeResult(
+        version_info=[3, 6, 8], is_32bit=False,
+        prefix='C:\\Python36', scripts_dir='C:\\Python36\\Scripts',
+    ))
+    return pythonup.installations.ProbeCache(
+        path=tmp_path.joinpath('probes.json'), prober=prober,
+    )
+
+
+def test_probe_cache(instpath, probe_cache):
+    python = instpath.joinpath('python.exe')
+    python.write_bytes(b'MZ')
+
+    result = probe_cache.get(python)
+    assert result.version_info == (3, 6, 8)
+    assert probe_cache.get(python) == result
+
+    # Results are persisted.
+    cache = pythonup.installations.ProbeCache(
+        path=probe_cache.path, prober=probe_cache.prober,
+    )
+    assert cache.get(python) == result
+    probe_cache.prober.assert_called_once_with(python)
+
+
+def test_probe_cache_changed(instpath, probe_cache):
+    python = instpath.joinpath('python.exe')
+    python.write_bytes(b'MZ')
+    probe_cache.get(python)
+
+    python.write_bytes(b'MZ' * 2)
+    probe_cache.get(python)
+    assert probe_cache.prober.call_count == 2
+
+
+def test_get_version_info(mocker, installation, probe_cache):
+    mocker.patch.object(
+        pythonup.installations, 'get_probe_cache', return_value=probe_cache,
+    )
+    installation.python.write_bytes(b'MZ')
+    assert installation.get_version_info() == (3, 6, 8)
+    assert installation.is_32bit() is False
+    probe_cache.prober.assert_called_once_with(installation.python)
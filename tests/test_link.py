@@ -0,0 +1,500 @@
+import json
+import multiprocessing
+import os
+import sys
+import unittest.mock
+
+import attr
+import pytest
+
+import pythonup.installations
+import pythonup.versions
+
+from pythonup.operations import common, link
+
+
+@attr.s
+class FakeVersion:
+
+    name = attr.ib()
+    path = attr.ib()
+    scripts_dir = attr.ib()
+
+    @property
+    def arch_free_name(self):
+        return self.name
+
+    @property
+    def version_info(self):
+        return tuple(int(p) for p in self.name.split('.'))
+
+    @property
+    def python_major_command(self):
+        return self.scripts_dir.joinpath(
+            'python{}.exe'.format(self.version_info[0]),
+        )
+
+    def get_installation(self):
+        return pythonup.installations.Installation(self.path)
+
+
+@pytest.fixture
+def scripts_dir(tmp_path, mocker):
+    scripts_dir = tmp_path.joinpath('scripts')
+    scripts_dir.mkdir()
+    shim = tmp_path.joinpath('shim.exe')
+    shim.write_bytes(b'SHIM')
+    mocker.patch.multiple(
+        link.configs,
+        get_scripts_dir_path=mocker.Mock(return_value=scripts_dir),
+        get_scripts_store_path=mocker.Mock(
+            return_value=tmp_path.joinpath('scripts.d'),
+        ),
+        get_shim_path=mocker.Mock(return_value=shim),
+        get_setting=mocker.Mock(side_effect=lambda key, default=None: default),
+    )
+    mocker.patch.object(link, 'set_active_versions')
+    link.shimio.clear_template()
+    yield scripts_dir
+    link.shimio.clear_template()
+
+
+@pytest.fixture
+def version(tmp_path, scripts_dir):
+    path = tmp_path.joinpath('python36')
+    path.joinpath('Scripts').mkdir(parents=True)
+    path.joinpath('python.exe').write_bytes(b'PYTHON')
+    path.joinpath('Scripts', 'foo.exe').write_bytes(b'FOO')
+    path.joinpath('Scripts', 'bar.exe').write_bytes(b'BAR')
+    path.joinpath('Scripts', 'pip3.exe').write_bytes(b'PIP')
+    return FakeVersion(name='3.6', path=path, scripts_dir=scripts_dir)
+
+
+@pytest.fixture
+def writes(mocker):
+    return {
+        'file': mocker.spy(link, 'publish_file'),
+        'shim': mocker.spy(link, 'publish_shim'),
+    }
+
+
+def read_manifest(scripts_dir, key):
+    path = scripts_dir.with_name('scripts.d').joinpath(
+        '{}.manifest.json'.format(key),
+    )
+    return json.loads(path.read_text())
+
+
+def get_written(writes):
+    names = set()
+    for spy in writes.values():
+        names.update(call[0][1].name for call in spy.call_args_list)
+        spy.reset_mock()
+    return names
+
+
+def test_activate(scripts_dir, version, writes):
+    link.activate([version])
+    assert get_written(writes) == {
+        'foo.exe', 'bar.exe', 'pip3.exe', 'python3.exe',
+    }
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'FOO'
+    assert scripts_dir.joinpath('pip3.exe').read_bytes().startswith(b'SHIM')
+
+    manifest = read_manifest(scripts_dir, '3.6')
+    assert manifest['entries']['foo.exe']['kind'] == 'file'
+    assert manifest['entries']['pip3.exe']['kind'] == 'shim'
+
+    link.activate([version])
+    assert get_written(writes) == set()
+
+
+def test_activate_changed(scripts_dir, version, writes):
+    link.activate([version])
+    get_written(writes)
+
+    version.path.joinpath('Scripts', 'foo.exe').write_bytes(b'NEWFOO')
+    link.activate([version], refresh=True)
+    assert get_written(writes) == {'foo.exe'}
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'NEWFOO'
+
+
+def test_activate_touched(scripts_dir, version, writes):
+    link.activate([version])
+    get_written(writes)
+
+    source = version.path.joinpath('Scripts', 'foo.exe')
+    stat = source.stat()
+    os.utime(str(source), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    link.activate([version], refresh=True)
+    assert get_written(writes) == set()
+
+
+def test_activate_stat_without_inode(mocker, scripts_dir, version, writes):
+    link.activate([version])
+    get_written(writes)
+
+    # Stat results from os.scandir on Windows have no inode.
+    fingerprint = link.manifests.get_stat_fingerprint
+    mocker.patch.object(
+        link.manifests, 'get_stat_fingerprint',
+        side_effect=lambda stat: fingerprint(stat)[:2] + [0],
+    )
+    get_digest = mocker.spy(link.manifests, 'get_file_digest')
+    link.activate([version], refresh=True)
+    assert get_written(writes) == set()
+    assert not get_digest.called
+
+
+@pytest.mark.parametrize('a, b, same', [
+    ([3, 100, 7], [3, 100, 7], True),
+    ([3, 100, 7], [3, 100, 8], False),
+    ([3, 100, 0], [3, 100, 8], True),
+    ([3, 100, 7], [3, 100, 0], True),
+    ([3, 100, 0], [3, 101, 0], False),
+    ([3, 100, 0], [4, 100, 7], False),
+])
+def test_same_stat(a, b, same):
+    assert link.manifests.same_stat(a, b) is same
+
+
+def test_activate_target_removed(scripts_dir, version, writes):
+    link.activate([version])
+    get_written(writes)
+
+    scripts_dir.joinpath('bar.exe').unlink()
+    link.activate([version])
+    assert get_written(writes) == {'bar.exe'}
+
+
+def test_activate_stale(scripts_dir, version, writes):
+    scripts_dir.joinpath('old.exe').write_bytes(b'OLD')
+    link.activate([version])
+
+    # Without a manifest, everything unknown is removed.
+    assert not scripts_dir.joinpath('old.exe').exists()
+
+    # With a manifest, only recorded files are removed.
+    scripts_dir.joinpath('mine.exe').write_bytes(b'MINE')
+    version.path.joinpath('Scripts', 'foo.exe').unlink()
+    link.activate([version])
+    assert not scripts_dir.joinpath('foo.exe').exists()
+    assert scripts_dir.joinpath('mine.exe').exists()
+
+    manifest = read_manifest(scripts_dir, '3.6')
+    assert 'foo.exe' not in manifest['entries']
+
+
+def test_activate_smart_records_identical(mocker, scripts_dir, version):
+    materialized_dir = scripts_dir.with_name('scripts.d').joinpath('3.6')
+    materialized_dir.mkdir(parents=True)
+    materialized_dir.joinpath('foo.exe').write_bytes(b'FOO')
+    copy = mocker.spy(link.shutil, 'copy2')
+    link.activate([version], overwrite=link.Overwrite.smart)
+    copied = {os.path.basename(call[0][1]) for call in copy.call_args_list}
+    assert copied == {'bar.exe'}
+
+    manifest = read_manifest(scripts_dir, '3.6')
+    assert 'foo.exe' in manifest['entries']
+
+
+@pytest.mark.parametrize('strategy, check', [
+    (link.LinkStrategy.copy, lambda s, t: not os.path.samefile(s, t)),
+    (link.LinkStrategy.hardlink, lambda s, t: os.stat(t).st_nlink == 2),
+    (link.LinkStrategy.symlink, lambda s, t: os.path.islink(t)),
+    (link.LinkStrategy.auto, lambda s, t: os.stat(t).st_nlink == 2),
+])
+def test_publish_file_strategy(tmp_path, strategy, check):
+    source = tmp_path.joinpath('source.exe')
+    source.write_bytes(b'SOURCE')
+    target = tmp_path.joinpath('target.exe')
+
+    assert link.publish_file(
+        source, target,
+        overwrite=link.Overwrite.yes, quiet=True, strategy=strategy,
+    )
+    assert target.read_bytes() == b'SOURCE'
+    assert check(str(source), str(target))
+
+    # Linked and copied files are both seen as up to date.
+    assert link.publish_file(
+        source, target,
+        overwrite=link.Overwrite.smart, quiet=True, strategy=strategy,
+    )
+
+
+def test_publish_file_strategy_fallback(mocker, tmp_path):
+    mocker.patch.object(link.os, 'link', side_effect=OSError)
+    source = tmp_path.joinpath('source.exe')
+    source.write_bytes(b'SOURCE')
+    target = tmp_path.joinpath('target.exe')
+    link.publish_file(
+        source, target, overwrite=link.Overwrite.yes, quiet=True,
+        strategy=link.LinkStrategy.hardlink,
+    )
+    assert target.read_bytes() == b'SOURCE'
+    assert not os.path.samefile(str(source), str(target))
+
+
+def test_copy_over_hardlink(tmp_path):
+    source = tmp_path.joinpath('source.exe')
+    source.write_bytes(b'SOURCE')
+    other = tmp_path.joinpath('other.exe')
+    other.write_bytes(b'OTHER')
+    target = tmp_path.joinpath('target.exe')
+    os.link(str(source), str(target))
+
+    link.publish_file(other, target, overwrite=link.Overwrite.yes, quiet=True)
+    assert target.read_bytes() == b'OTHER'
+    assert source.read_bytes() == b'SOURCE'
+
+
+def test_activate_symlink_stale(mocker, scripts_dir, version):
+    mocker.patch.object(
+        link, 'get_link_strategy', return_value=link.LinkStrategy.symlink,
+    )
+    link.activate([version])
+    target = scripts_dir.joinpath('foo.exe')
+    assert target.is_symlink()
+
+    # A dangling link is removed, and its source is left alone.
+    source = version.path.joinpath('Scripts', 'foo.exe')
+    source.unlink()
+    link.activate([version])
+    assert not os.path.lexists(str(target))
+    assert version.path.joinpath('Scripts', 'bar.exe').exists()
+
+
+def test_activate_switch(mocker, tmp_path, scripts_dir, version, writes):
+    other_path = tmp_path.joinpath('python37')
+    other_path.joinpath('Scripts').mkdir(parents=True)
+    other_path.joinpath('python.exe').write_bytes(b'PYTHON')
+    other_path.joinpath('Scripts', 'foo.exe').write_bytes(b'FOO37')
+    other = FakeVersion(name='3.7', path=other_path, scripts_dir=scripts_dir)
+
+    link.activate([version])
+    link.activate([other])
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'FOO37'
+    assert not scripts_dir.joinpath('bar.exe').exists()
+    get_written(writes)
+
+    # Switching back only re-points the link.
+    collect = mocker.spy(link, 'scan_scripts')
+    link.activate([version])
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'FOO'
+    assert get_written(writes) == set()
+    collect.assert_not_called()
+
+    # A new script in a version is picked up.
+    version.path.joinpath('Scripts', 'baz.exe').write_bytes(b'BAZ')
+    link.activate([version])
+    assert get_written(writes) == {'baz.exe'}
+
+
+def test_publish_changes(mocker, scripts_dir, version, writes):
+    mocker.patch.object(
+        link, 'get_active_versions', return_value=[version],
+    )
+    link.activate([version])
+    get_written(writes)
+    snapshot_path = link.get_snapshot_path()
+
+    # Nothing changed.
+    publish = mocker.spy(link, 'publish_changes')
+    assert link.relink.main([str(snapshot_path)]) == 0
+    publish.assert_not_called()
+
+    version.path.joinpath('Scripts', 'baz.exe').write_bytes(b'BAZ')
+    version.path.joinpath('Scripts', 'bar.exe').unlink()
+    collect = mocker.spy(link, 'publish_tracked')
+    assert link.relink.main([str(snapshot_path)]) == 0
+    assert get_written(writes) == {'baz.exe'}
+    assert {c[0][3].name for c in collect.call_args_list} == {'baz.exe'}
+    assert scripts_dir.joinpath('baz.exe').read_bytes() == b'BAZ'
+    assert not scripts_dir.joinpath('bar.exe').exists()
+    assert set(read_manifest(scripts_dir, '3.6')['entries']) == {
+        'foo.exe', 'baz.exe', 'pip3.exe', 'python3.exe',
+    }
+
+    # The snapshot is up to date again.
+    publish.reset_mock()
+    assert link.relink.main([str(snapshot_path)]) == 0
+    publish.assert_not_called()
+
+
+def test_publish_changes_unknown_version(mocker, scripts_dir, version):
+    def get_version(name, *, force_32):
+        if name != '3.6':
+            raise pythonup.versions.VersionNotFoundError(name)
+        return version
+
+    mocker.patch.object(
+        common, 'get_active_names', return_value=['2.5', '3.6'],
+    )
+    mocker.patch.object(pythonup.versions, 'get_version', get_version)
+
+    # Run outside a click context, like pythonup.relink does.
+    link.publish_changes()
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'FOO'
+
+
+def relink_concurrently(version, index, barrier):
+    scripts = version.path.joinpath('Scripts')
+    barrier.wait()
+    # Each worker is a pip command changing scripts, then running its hook.
+    scripts.joinpath('tool{}.exe'.format(index)).write_bytes(b'TOOL')
+    scripts.joinpath('foo.exe').write_bytes(
+        'FOO{}'.format(index).encode('ascii'),
+    )
+    if index == 0:
+        scripts.joinpath('bar.exe').unlink()
+    assert link.relink.main([str(link.get_snapshot_path())]) == 0
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='needs fork')
+def test_request_relink_stress(mocker, scripts_dir, version):
+    mocker.patch.object(
+        link, 'get_active_versions', return_value=[version],
+    )
+    link.activate([version])
+
+    count = 16
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(count)
+    processes = [
+        context.Process(
+            target=relink_concurrently, args=(version, i, barrier),
+        )
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [p.exitcode for p in processes] == [0] * count
+
+    # Everything pip left is published, and nothing else.
+    sources = version.path.joinpath('Scripts')
+    names = {p.name for p in sources.iterdir()} | {'python3.exe'}
+    assert {p.name for p in scripts_dir.iterdir()} == names
+    for name in names - {'pip3.exe', 'python3.exe'}:
+        assert (
+            scripts_dir.joinpath(name).read_bytes() ==
+            sources.joinpath(name).read_bytes()
+        )
+
+    # The manifest describes what is published.
+    entries = read_manifest(scripts_dir, '3.6')['entries']
+    assert set(entries) == names
+    for name, entry in entries.items():
+        target = scripts_dir.joinpath(name)
+        assert entry['target_stat'] == link.manifests.get_target_stat(target)
+        if entry['kind'] == 'file':
+            assert entry['digest'] == link.manifests.get_file_digest(target)
+
+    # The snapshot is current, so the next hook has nothing to do.
+    publish = mocker.spy(link, 'publish_changes')
+    assert link.relink.main([str(link.get_snapshot_path())]) == 0
+    publish.assert_not_called()
+    assert not scripts_dir.with_name('scripts.d').joinpath(
+        'relink.dirty',
+    ).exists()
+
+
+def test_activate_shim_command_changed(mocker, scripts_dir, version, writes):
+    link.activate([version])
+    get_written(writes)
+
+    mocker.patch.object(link.sys, 'executable', 'C:\\Python37\\python.exe')
+    link.activate([version], refresh=True)
+    assert get_written(writes) == {'pip3.exe'}
+    data = link.get_shim_data(
+        version.path.joinpath('Scripts', 'pip3.exe'), relink=True,
+    )
+    assert scripts_dir.joinpath('pip3.exe').read_bytes().endswith(data)
+
+
+def test_request_relink_in_progress(mocker, scripts_dir):
+    publish = mocker.patch.object(link, 'publish_changes')
+    with link.get_activation_lock():
+        link.request_relink()
+    publish.assert_not_called()
+    assert scripts_dir.with_name('scripts.d').joinpath('relink.dirty').exists()
+
+    link.request_relink()
+    publish.assert_called_once_with()
+
+
+def test_scan_scripts(tmp_path, version):
+    other_path = tmp_path.joinpath('python27')
+    other_scripts_dir = other_path.joinpath('Scripts')
+    other_scripts_dir.joinpath('dir.exe').mkdir(parents=True)
+    for name in ['foo.exe', 'baz.exe', 'pip2.exe', 'pip2.7.exe', 'pip.exe']:
+        other_scripts_dir.joinpath(name).write_bytes(b'27')
+    other = FakeVersion(name='2.7', path=other_path, scripts_dir=None)
+    version.path.joinpath('Scripts', 'pip3.6.exe').write_bytes(b'PIP')
+    version.path.joinpath('Scripts', 'easy_install.exe').write_bytes(b'EI')
+
+    # Types and stats come from the directory listing.
+    path_class = other_path.__class__
+    with unittest.mock.patch.multiple(
+            path_class, is_file=unittest.mock.DEFAULT,
+            stat=unittest.mock.DEFAULT) as mocks:
+        scripts = link.scan_scripts([
+            (version, version.path.joinpath('Scripts')),
+            (other, other_scripts_dir),
+            (other, tmp_path.joinpath('missing')),
+        ])
+    assert not any(m.called for m in mocks.values())
+
+    assert {(s.name, s.kind, s.path.parent.parent.name) for s in scripts} == {
+        ('foo.exe', 'file', 'python36'),
+        ('bar.exe', 'file', 'python36'),
+        ('pip3.exe', 'shim', 'python36'),
+        ('baz.exe', 'file', 'python27'),
+        ('pip2.exe', 'shim', 'python27'),
+    }
+    for script in scripts:
+        assert script.stat == link.manifests.get_stat(script.path)
+
+
+def test_publish_changes_modified(mocker, scripts_dir, version, writes):
+    mocker.patch.object(
+        link, 'get_active_versions', return_value=[version],
+    )
+    link.activate([version])
+    get_written(writes)
+
+    version.path.joinpath('Scripts', 'foo.exe').write_bytes(b'NEWFOO')
+    link.publish_changes()
+    assert get_written(writes) == {'foo.exe'}
+    assert scripts_dir.joinpath('foo.exe').read_bytes() == b'NEWFOO'
+
+
+def test_activate_smart_shim_command_changed(mocker, scripts_dir, version):
+    link.activate([version])
+
+    mocker.patch.object(link.sys, 'executable', 'C:\\Python37\\python.exe')
+    link.activate([version], overwrite=link.Overwrite.smart, refresh=True)
+    data = link.get_shim_data(
+        version.path.joinpath('Scripts', 'pip3.exe'), relink=True,
+    )
+    assert scripts_dir.joinpath('pip3.exe').read_bytes().endswith(data)
+
+
+@pytest.mark.parametrize('overwrite, same, written, result', [
+    (link.Overwrite.yes, True, True, True),
+    (link.Overwrite.no, False, False, False),
+    (link.Overwrite.smart, True, False, True),
+    (link.Overwrite.smart, False, True, True),
+])
+def test_safe_publish_existing(mocker, tmp_path, overwrite, same, written,
+                               result):
+    target = tmp_path.joinpath('foo.exe')
+    target.write_bytes(b'FOO')
+    writer = mocker.Mock()
+    assert link.safe_publish(
+        target, overwrite=overwrite, comparer=lambda: same, writer=writer,
+        quiet=True,
+    ) == result
+    assert writer.called == written
@@ -0,0 +1,116 @@
+import multiprocessing
+import sys
+import threading
+import time
+
+import pytest
+
+from pythonup import locks
+
+
+def make_coalescer(tmp_path):
+    return locks.Coalescer(
+        locks.FileLock(tmp_path.joinpath('task.lock')),
+        tmp_path.joinpath('task.dirty'),
+    )
+
+
+def test_file_lock_exclusive(tmp_path):
+    with locks.FileLock(tmp_path.joinpath('task.lock')):
+        other = locks.FileLock(tmp_path.joinpath('task.lock'))
+        with pytest.raises(locks.LockUnavailable):
+            other.acquire(blocking=False)
+        assert not other.locked
+    other.acquire(blocking=False)
+    other.release()
+
+
+def test_file_lock_removed_by_holder(tmp_path):
+    path = tmp_path.joinpath('task.lock')
+    holder = locks.FileLock(path)
+    holder.acquire()
+    other = locks.FileLock(path)
+    waiter = threading.Thread(target=other.acquire)
+    waiter.start()
+    time.sleep(0.1)
+    path.unlink()
+    holder.release()
+    waiter.join()
+
+    # The waiter locked a new file, so a third party can't take it.
+    assert other.locked
+    assert path.exists()
+    with pytest.raises(locks.LockUnavailable):
+        locks.FileLock(path).acquire(blocking=False)
+    other.release()
+
+
+def test_coalescer_runs(tmp_path):
+    runs = []
+    assert make_coalescer(tmp_path).request(lambda: runs.append(1))
+    assert runs == [1]
+    assert not tmp_path.joinpath('task.dirty').exists()
+
+
+def test_coalescer_coalesces(tmp_path):
+    runs = []
+    requested = []
+
+    def task():
+        runs.append(1)
+        # Other processes asking while the task runs leave it to us.
+        if len(runs) == 1:
+            requested.extend(
+                make_coalescer(tmp_path).request(task) for _ in range(3)
+            )
+
+    assert make_coalescer(tmp_path).request(task)
+    assert requested == [False, False, False]
+    assert len(runs) == 2
+    assert not tmp_path.joinpath('task.dirty').exists()
+
+
+def test_coalescer_request_after_release(mocker, tmp_path):
+    coalescer = make_coalescer(tmp_path)
+    runs = []
+    release = coalescer.lock.release
+
+    def release_and_request():
+        # A request slipping in between the last check and the release.
+        if len(runs) == 1:
+            coalescer._mark_dirty()
+        release()
+
+    mocker.patch.object(coalescer.lock, 'release', release_and_request)
+    assert coalescer.request(lambda: runs.append(1))
+    assert len(runs) == 2
+
+
+def request_concurrently(tmp_path, barrier):
+    def task():
+        with tmp_path.joinpath('runs.log').open('a') as f:
+            f.write('run\n')
+        time.sleep(0.5)
+
+    barrier.wait()
+    make_coalescer(tmp_path).request(task)
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='needs fork')
+def test_coalescer_stress(tmp_path):
+    count = 16
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(count)
+    processes = [
+        context.Process(target=request_concurrently, args=(tmp_path, barrier))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert [p.exitcode for p in processes] == [0] * count
+
+    runs = tmp_path.joinpath('runs.log').read_text().splitlines()
+    assert 1 <= len(runs) <= 2
+    assert not tmp_path.joinpath('task.dirty').exists()
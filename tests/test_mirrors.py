@@ -0,0 +1,120 @@
+import hashlib
+import pathlib
+
+import pytest
+
+import pythonup.mirrors
+import pythonup.utils
+
+
+DATA = b'python' * 1024
+
+PATH = '/3.8.10/python-3.8.10-amd64.exe'
+
+URL = pythonup.mirrors.OFFICIAL_PREFIX + PATH
+
+
+@pytest.fixture
+def servers(start_file_server):
+    return [start_file_server() for _ in range(2)]
+
+
+@pytest.fixture
+def state_path(tmpdir):
+    return pathlib.Path(str(tmpdir)).joinpath('mirrors.json')
+
+
+@pytest.fixture
+def container(tmpdir):
+    path = pathlib.Path(str(tmpdir)).joinpath('container')
+    path.mkdir()
+    return path
+
+
+def make_pool(servers, state_path):
+    return pythonup.mirrors.MirrorPool(
+        prefixes=[s.url('/python') for s in servers],
+        state_path=state_path,
+    )
+
+
+def test_rewrite_url():
+    assert pythonup.mirrors.rewrite_url(URL, 'http://mirror/python/') == (
+        'http://mirror/python' + PATH
+    )
+    assert pythonup.mirrors.rewrite_url('http://other' + PATH, 'x') is None
+
+
+def test_rank_skips_unhealthy(servers, state_path):
+    servers[1].files['/python' + PATH] = DATA
+    pool = make_pool(servers, state_path)
+    ranked = [prefix for prefix, _ in pool.rank(URL)]
+    assert ranked == [servers[1].url('/python'), servers[0].url('/python')]
+    assert pool.get_health(servers[0].url('/python')).failures == 1
+
+    # Health is remembered between runs.
+    pool = make_pool(servers, state_path)
+    assert pool.get_health(servers[0].url('/python')).failures == 1
+    assert pool.get_health(servers[1].url('/python')).latency is not None
+
+
+def test_rank_cooling_down(servers, state_path):
+    for server in servers:
+        server.files['/python' + PATH] = DATA
+    pool = make_pool(servers, state_path)
+    for _ in range(pythonup.mirrors.MAX_FAILURES):
+        pool.record_failure(servers[0].url('/python'))
+    ranked = [prefix for prefix, _ in pool.rank(URL)]
+    assert ranked == [servers[1].url('/python'), servers[0].url('/python')]
+    assert [r[0] for r in servers[0].requests] == []
+
+
+def test_download_fails_over_on_mismatch(servers, state_path, container):
+    servers[0].files['/python' + PATH] = b'corrupted'
+    servers[1].files['/python' + PATH] = DATA
+    pool = make_pool(servers, state_path)
+
+    # Make the corrupted mirror the preferred one.
+    pool.rank = lambda url: [
+        (s.url('/python'), pythonup.mirrors.rewrite_url(url, s.url('/python')))
+        for s in servers
+    ]
+    path = pool.download_file(
+        URL, container=container,
+        verifier=pythonup.utils.HashVerifier(
+            'md5', hashlib.md5(DATA).hexdigest(),
+        ),
+    )
+    assert path.read_bytes() == DATA
+    assert pool.get_health(servers[0].url('/python')).failures == 1
+    assert pool.get_health(servers[1].url('/python')).failures == 0
+
+
+def test_download_single_candidate_not_recorded(servers, state_path,
+                                                container):
+    servers[0].files['/python' + PATH] = DATA
+    pool = pythonup.mirrors.MirrorPool(
+        prefixes=[servers[0].url('/python')], state_path=state_path,
+    )
+    path = pool.download_file(
+        URL, container=container,
+        verifier=pythonup.utils.HashVerifier(
+            'md5', hashlib.md5(DATA).hexdigest(),
+        ),
+    )
+    assert path.read_bytes() == DATA
+    assert not state_path.exists()
+
+
+def test_get_mirror_pool_dedupes(mocker):
+    mocker.patch.object(
+        pythonup.mirrors.configs, 'get_setting', return_value=[
+            'http://mirror/python/', pythonup.mirrors.OFFICIAL_PREFIX + '/',
+            'http://mirror/python',
+        ],
+    )
+    mocker.patch.object(pythonup.mirrors.configs, 'get_base_dir_path')
+    pool = pythonup.mirrors.get_mirror_pool()
+    assert pool.prefixes == [
+        'http://mirror/python', pythonup.mirrors.OFFICIAL_PREFIX,
+    ]
@@ -0,0 +1,125 @@
+import struct
+
+import pytest
+
+import pythonup.installations
+import pythonup.peinfo
+
+
+def build_resources(rva, file_version):
+    fixed = struct.pack(
+        '<IIII', 0xfeef04bd, 0x10000,
+        (file_version[0] << 16) | file_version[1],
+        (file_version[2] << 16) | file_version[3],
+    ) + bytes(52 - 16)
+    key = 'VS_VERSION_INFO\0'.encode('utf-16-le')
+    version_info = struct.pack('<HHH', 6 + len(key) + 2 + 52, 52, 0)
+    version_info += key + b'\0\0' + fixed
+
+    def directory(ident, target):
+        return struct.pack('<IIHHHH', 0, 0, 0, 0, 0, 1) + struct.pack(
+            '<II', ident, target,
+        )
+
+    return b''.join([
+        directory(16, 0x80000000 | 24),     # Type.
+        directory(1, 0x80000000 | 48),     # Name.
+        directory(0x409, 72),               # Language.
+        struct.pack('<IIII', rva + 88, len(version_info), 0, 0),
+        version_info,
+    ])
+
+
+def build_pe(machine=0x8664, file_version=None):
+    """Build a minimal PE file with only headers and a version resource.
+    """
+    pe32_plus = machine in pythonup.peinfo.MACHINES_64BIT
+    rva = 0x1000
+    raw_pointer = 0x200
+    if file_version is None:
+        resources = b''
+    else:
+        resources = build_resources(rva, file_version)
+
+    directories = bytearray(16 * 8)
+    if resources:
+        struct.pack_into('<II', directories, 2 * 8, rva, len(resources))
+    if pe32_plus:
+        optional = struct.pack('<H', 0x20b) + bytes(106)
+    else:
+        optional = struct.pack('<H', 0x10b) + bytes(90)
+    optional += struct.pack('<I', 16) + bytes(directories)
+
+    section = b'.rsrc\0\0\0' + struct.pack(
+        '<IIII', len(resources), rva, len(resources), raw_pointer,
+    ) + bytes(16)
+
+    dos = bytearray(0x40)
+    dos[:2] = b'MZ'
+    struct.pack_into('<I', dos, 0x3c, 0x40)
+
+    headers = bytes(dos) + b'PE\0\0' + struct.pack(
+        '<HHIIIHH', machine, 1, 0, 0, 0, len(optional), 0,
+    ) + optional + section
+    return headers.ljust(raw_pointer, b'\0') + resources
+
+
+@pytest.mark.parametrize('machine, is_32bit', [
+    (0x014c, True),
+    (0x8664, False),
+])
+def test_read_pe_info(tmp_path, machine, is_32bit):
+    path = tmp_path.joinpath('python.exe')
+    path.write_bytes(build_pe(machine, (3, 6, 8150, 1013)))
+
+    info = pythonup.peinfo.read_pe_info(path)
+    assert info.file_version == (3, 6, 8150, 1013)
+    assert info.python_version_info == (3, 6, 8)
+    assert info.is_32bit is is_32bit
+
+
+def test_read_pe_info_no_resources(tmp_path):
+    path = tmp_path.joinpath('python.exe')
+    path.write_bytes(build_pe())
+    info = pythonup.peinfo.read_pe_info(path)
+    assert info.file_version is None
+    assert info.python_version_info is None
+
+
+@pytest.mark.parametrize('content', [
+    b'', b'MZ', b'#!/bin/sh\n', build_pe()[:0x50],
+], ids=['empty', 'truncated', 'script', 'truncated-header'])
+def test_read_pe_info_invalid(tmp_path, content):
+    path = tmp_path.joinpath('python.exe')
+    path.write_bytes(content)
+    with pytest.raises(pythonup.peinfo.PEFormatError):
+        pythonup.peinfo.read_pe_info(path)
+
+
+def test_installation_reads_dll(mocker, tmp_path):
+    mocker.patch.object(pythonup.installations, 'get_probe_cache')
+    tmp_path.joinpath('python.exe').write_bytes(build_pe(0x014c))
+    tmp_path.joinpath('python3.dll').write_bytes(
+        build_pe(0x014c, (3, 0, 0, 0)),
+    )
+    tmp_path.joinpath('python27.dll').write_bytes(
+        build_pe(0x014c, (2, 7, 15150, 1013)),
+    )
+
+    installation = pythonup.installations.Installation(tmp_path)
+    assert installation.get_version_info() == (2, 7, 15)
+    assert installation.is_32bit()
+    pythonup.installations.get_probe_cache.assert_not_called()
+
+
+def test_installation_falls_back_to_probe(mocker, tmp_path):
+    probe = mocker.patch.object(
+        pythonup.installations.Installation, 'probe',
+    )
+    probe.return_value.version_info = (3, 6, 8)
+    probe.return_value.is_32bit = False
+    tmp_path.joinpath('python.exe').write_bytes(b'MZ')
+
+    installation = pythonup.installations.Installation(tmp_path)
+    assert installation.get_version_info() == (3, 6, 8)
+    assert installation.is_32bit() is False
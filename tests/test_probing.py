@@ -0,0 +1,98 @@
+import time
+
+import click
+import click.testing
+import pytest
+
+import pythonup.probing
+
+from pythonup.operations import versions as version_operations
+
+
+class FakeInstallation:
+
+    def __init__(self, version_info, delay=0):
+        self.version_info = version_info
+        self.delay = delay
+
+    def get_version_info(self):
+        time.sleep(self.delay)
+        if self.version_info is None:
+            raise FileNotFoundError('python.exe')
+        return self.version_info
+
+
+class FakeVersion:
+
+    def __init__(self, name, version_info, installation):
+        self.name = name
+        self.version_info = version_info
+        self.installation = installation
+
+    def get_installation(self):
+        if self.installation is None:
+            raise FileNotFoundError(self.name)
+        return self.installation
+
+
+def make_version(name, version_info, installed_info, delay=0):
+    if installed_info is False:
+        installation = None
+    else:
+        installation = FakeInstallation(installed_info, delay)
+    return FakeVersion(name, version_info, installation)
+
+
+def test_probe_versions():
+    versions = [
+        make_version('3.5', (3, 5, 4), False),
+        make_version('3.6', (3, 6, 8), (3, 6, 8)),
+        make_version('3.7', (3, 7, 9), (3, 7, 4)),
+        make_version('3.8', (3, 8, 10), None),
+    ]
+    states = pythonup.probing.probe_versions(versions)
+    assert [s.version for s in states] == versions
+    assert [s.is_installed for s in states] == [False, True, True, True]
+    assert [s.is_upgradable for s in states] == [False, False, True, False]
+    assert states[3].version_info is None
+
+
+def test_probe_versions_concurrent():
+    versions = [
+        make_version('3.{}'.format(i), (3, i, 1), (3, i, 0), 0.2)
+        for i in range(8)
+    ]
+    start = time.perf_counter()
+    states = pythonup.probing.probe_versions(versions, workers=8)
+    elapsed = time.perf_counter() - start
+    assert all(s.is_upgradable for s in states)
+    assert elapsed < 0.2 * 4
+
+
+def test_probe_versions_empty():
+    assert pythonup.probing.probe_versions([]) == []
+
+
+@pytest.mark.parametrize('list_all, output', [
+    (False, '*  3.6\no+ 3.7\n'),
+    (True, '   3.5\n*  3.6\no+ 3.7\n'),
+])
+def test_list(mocker, list_all, output):
+    versions = [
+        make_version('3.5', (3, 5, 4), False),
+        make_version('3.6', (3, 6, 8), (3, 6, 8)),
+        make_version('3.7', (3, 7, 9), (3, 7, 4)),
+    ]
+    mocker.patch.object(
+        version_operations, 'get_versions', return_value=versions,
+    )
+    mocker.patch.object(
+        version_operations, 'get_active_names', return_value=['3.6'],
+    )
+
+    @click.command()
+    def command():
+        version_operations.list_(list_all=list_all)
+
+    result = click.testing.CliRunner().invoke(command)
+    assert result.output == output
@@ -0,0 +1,61 @@
+import pytest
+
+import pythonup.metadata
+import pythonup.registry
+
+from pythonup.registry import PYTHON_KEY_PATHS
+
+
+def register(backend, key_path, name, install_path):
+    root, prefix = key_path
+    backend.set_value(
+        root, '{}\\{}\\InstallPath'.format(prefix, name), '',
+        str(install_path),
+    )
+
+
+def test_read_install_paths(registry_backend, tmp_path):
+    register(registry_backend, PYTHON_KEY_PATHS[0], '3.6', tmp_path / 'a')
+    register(registry_backend, PYTHON_KEY_PATHS[1], '3.6', tmp_path / 'b')
+    register(registry_backend, PYTHON_KEY_PATHS[2], '3.5-32', tmp_path / 'c')
+
+    # A key without InstallPath is ignored.
+    root, prefix = PYTHON_KEY_PATHS[0]
+    registry_backend.set_value(
+        root, '{}\\3.7\\Help'.format(prefix), '', 'foo',
+    )
+
+    paths = pythonup.registry.read_install_paths(registry_backend)
+    assert paths == {
+        '3.6': str(tmp_path / 'a'),
+        '3.5-32': str(tmp_path / 'c'),
+    }
+
+
+def test_read_install_paths_empty(registry_backend):
+    assert pythonup.registry.read_install_paths(registry_backend) == {}
+
+
+def test_get_install_path_snapshot(registry_backend, tmp_path):
+    register(registry_backend, PYTHON_KEY_PATHS[0], '3.6', tmp_path)
+
+    assert pythonup.metadata.get_install_path('3.6') == tmp_path.resolve()
+    opened = registry_backend.open_count
+    for name in ('3.6', '3.7', '3.6'):
+        try:
+            pythonup.metadata.get_install_path(name)
+        except FileNotFoundError:
+            pass
+    assert registry_backend.open_count == opened
+
+
+def test_invalidate(registry_backend, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        pythonup.metadata.get_install_path('3.6')
+
+    register(registry_backend, PYTHON_KEY_PATHS[0], '3.6', tmp_path)
+    with pytest.raises(FileNotFoundError):
+        pythonup.metadata.get_install_path('3.6')
+
+    pythonup.registry.invalidate()
+    assert pythonup.metadata.get_install_path('3.6') == tmp_path.resolve()
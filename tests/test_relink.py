@@ -0,0 +1,70 @@
+import pathlib
+import subprocess
+import sys
+
+from pythonup import relink
+
+
+def test_scan_dir(tmp_path):
+    tmp_path.joinpath('foo.exe').write_bytes(b'FOO')
+    stat = tmp_path.joinpath('foo.exe').stat()
+    assert relink.scan_dir(str(tmp_path)) == {
+        'foo.exe': [3, stat.st_mtime_ns],
+    }
+    assert relink.scan_dir(str(tmp_path.joinpath('missing'))) == {}
+
+
+def test_diff_snapshots():
+    old = {
+        'a': {'foo.exe': [3, 1], 'bar.exe': [3, 1], 'baz.exe': [3, 1]},
+        'b': {'qux.exe': [3, 1]},
+    }
+    new = {
+        'a': {'foo.exe': [3, 1], 'bar.exe': [4, 2], 'new.exe': [3, 2]},
+        'c': {'other.exe': [3, 1]},
+    }
+    assert relink.diff_snapshots(old, new) == {
+        'bar.exe', 'baz.exe', 'new.exe', 'qux.exe', 'other.exe',
+    }
+    assert relink.diff_snapshots(old, old) == set()
+
+
+def test_load_snapshot(tmp_path):
+    path = tmp_path.joinpath('relink.json')
+    assert relink.load_snapshot(path) is None
+
+    path.write_text('{"format": 0, "dirs": {}}')
+    assert relink.load_snapshot(path) is None
+
+    relink.save_snapshot(path, {'a': {'foo.exe': [3, 1]}})
+    assert relink.load_snapshot(path) == {'a': {'foo.exe': [3, 1]}}
+    assert [p.name for p in tmp_path.iterdir()] == ['relink.json']
+
+
+def test_main_missing_snapshot(mocker, tmp_path):
+    request = mocker.patch('pythonup.operations.link.request_relink')
+    assert relink.main([str(tmp_path.joinpath('relink.json'))]) == 0
+    request.assert_called_once_with()
+
+
+def test_main_unchanged_imports_stdlib_only(tmp_path):
+    scripts_dir = tmp_path.joinpath('Scripts')
+    scripts_dir.mkdir()
+    scripts_dir.joinpath('foo.exe').write_bytes(b'FOO')
+    path = tmp_path.joinpath('relink.json')
+    relink.save_snapshot(path, relink.take_snapshot([scripts_dir]))
+
+    code = (
+        'import sys, pythonup.relink\n'
+        'assert pythonup.relink.main(sys.argv[1:]) == 0\n'
+        'print("\\n".join(sys.modules))\n'
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', code, str(path)], universal_newlines=True,
+        cwd=str(pathlib.Path(__file__).resolve().parent.parent),
+    )
+    modules = set(output.split())
+    assert modules.isdisjoint({'attr', 'click', 'pythonup.operations'})
+    assert {m for m in modules if m.startswith('pythonup')} == {
+        'pythonup', 'pythonup.fileio', 'pythonup.relink',
+    }
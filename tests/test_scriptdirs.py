@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import pythonup.scriptdirs
+
+from pythonup.scriptdirs import ScriptDirStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScriptDirStore(
+        root=tmp_path.joinpath('scripts.d'),
+        link_path=tmp_path.joinpath('scripts'),
+        max_size=2,
+    )
+
+
+@pytest.mark.parametrize('names, key', [
+    ([], '_'),
+    (['3.6'], '3.6'),
+    (['3.10', '3.6-32'], '3.10+3.6-32'),
+])
+def test_get_key(names, key):
+    assert pythonup.scriptdirs.get_key(names) == key
+
+
+def test_switch(store):
+    store.get_dir('3.6').joinpath('foo.exe').write_bytes(b'36')
+    store.get_dir('3.7').joinpath('foo.exe').write_bytes(b'37')
+
+    store.switch('3.6')
+    assert pythonup.scriptdirs.is_dir_link(store.link_path)
+    assert store.current == '3.6'
+    assert store.link_path.joinpath('foo.exe').read_bytes() == b'36'
+
+    store.switch('3.7')
+    assert store.current == '3.7'
+    assert store.link_path.joinpath('foo.exe').read_bytes() == b'37'
+
+    # Switching does not touch the directories.
+    assert store.get_dir('3.6').joinpath('foo.exe').read_bytes() == b'36'
+
+
+def test_switch_legacy_dir(store):
+    store.link_path.mkdir()
+    store.link_path.joinpath('old.exe').write_bytes(b'OLD')
+    assert store.current is None
+
+    store.switch('3.6')
+    assert store.current == '3.6'
+    assert not store.link_path.joinpath('old.exe').exists()
+    assert not any(p.name.startswith('.') for p in store.root.iterdir())
+
+
+def test_collect_garbage(store):
+    for key in ('3.5', '3.6', '3.7'):
+        store.switch(key)
+    assert not store.root.joinpath('3.5').exists()
+    assert store.root.joinpath('3.6').exists()
+    assert store.root.joinpath('3.7').exists()
+
+    # Reusing a directory makes it recent.
+    store.switch('3.6')
+    store.switch('3.8')
+    assert not store.root.joinpath('3.7').exists()
+    assert store.root.joinpath('3.6').exists()
+
+
+def test_collect_garbage_keeps_current(store):
+    for key in ('3.5', '3.6', '3.7'):
+        store.switch(key)
+    index = store._load_index()
+    index['last_used']['3.7'] = 0
+    assert store.collect_garbage() == []
+    assert store.root.joinpath('3.7').exists()
+    assert os.path.samefile(str(store.link_path), str(store.get_dir('3.7')))
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import pythonup.shimio
+
+from pythonup.shimio import ShimTemplate
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    path = tmp_path.joinpath('shim.exe')
+    path.write_bytes(bytes(range(256)) * 64)
+    return path
+
+
+def test_encode_trailer():
+    trailer = pythonup.shimio.encode_trailer([['a', 'b'], ['c']])
+    assert trailer == b'\n\nc\nb\x00a'
+
+
+def test_write(tmp_path, template_path):
+    template = ShimTemplate.load(template_path)
+    target = tmp_path.joinpath('pip.exe')
+    template.write(target, b'\n\nfoo')
+    assert target.read_bytes() == template_path.read_bytes() + b'\n\nfoo'
+
+
+def test_matches(tmp_path, template_path):
+    template = ShimTemplate.load(template_path)
+    target = tmp_path.joinpath('pip.exe')
+    assert not template.matches(target, b'\n\nfoo')
+
+    template.write(target, b'\n\nfoo')
+    assert template.matches(target, b'\n\nfoo')
+    assert not template.matches(target, b'\n\nbar')
+    assert not template.matches(target, b'\n\nfoobar')
+
+
+def test_matches_other_template(tmp_path, template_path):
+    template = ShimTemplate.load(template_path)
+    target = tmp_path.joinpath('pip.exe')
+    data = bytearray(template.data)
+    data[-1] ^= 0xff
+    target.write_bytes(bytes(data) + b'\n\nfoo')
+    assert not template.matches(target, b'\n\nfoo')
+
+
+def test_get_template_once(mocker, template_path):
+    mocker.patch.object(
+        pythonup.shimio.configs, 'get_shim_path', return_value=template_path,
+    )
+    load = mocker.spy(ShimTemplate, 'load')
+    pythonup.shimio.clear_template()
+    try:
+        template = pythonup.shimio.get_template()
+        assert pythonup.shimio.get_template() is template
+    finally:
+        pythonup.shimio.clear_template()
+    assert load.call_count == 1
+    assert template.data == template_path.read_bytes()
+
+
+def test_write_replaces_hardlink(tmp_path, template_path):
+    template = ShimTemplate.load(template_path)
+    source = tmp_path.joinpath('source.exe')
+    source.write_bytes(b'SOURCE')
+    target = tmp_path.joinpath('pip.exe')
+    os.link(str(source), str(target))
+
+    template.write(target, b'\n\nfoo')
+    assert source.read_bytes() == b'SOURCE'
+    assert template.matches(target, b'\n\nfoo')
@@ -0,0 +1,42 @@
+import pathlib
+
+import pytest
+
+import pythonup.sources
+
+
+URL = 'https://www.python.org/ftp/python/3.8.10/python-3.8.10-amd64.exe'
+
+
+@pytest.mark.parametrize('value, result', [
+    ('/srv/installers', '/srv/installers'),
+    ('file:///srv/installers', '/srv/installers'),
+    ('file://localhost/srv/python%20installers', '/srv/python installers'),
+])
+def test_parse_source(value, result):
+    assert pythonup.sources.parse_source(value) == pathlib.Path(result)
+
+
+def test_get_relative_paths():
+    assert list(pythonup.sources.get_relative_paths(URL)) == [
+        pathlib.PurePosixPath('python-3.8.10-amd64.exe'),
+        pathlib.PurePosixPath('3.8.10/python-3.8.10-amd64.exe'),
+    ]
+
+
+def test_iter_local_installers(tmpdir):
+    root = pathlib.Path(str(tmpdir))
+    flat = root.joinpath('flat')
+    flat.mkdir()
+    flat.joinpath('python-3.8.10-amd64.exe').touch()
+    nested = root.joinpath('nested', '3.8.10')
+    nested.mkdir(parents=True)
+    nested.joinpath('python-3.8.10-amd64.exe').touch()
+    empty = root.joinpath('empty')
+    empty.mkdir()
+
+    sources = [empty, flat, nested.parent]
+    assert list(pythonup.sources.iter_local_installers(URL, sources)) == [
+        flat.joinpath('python-3.8.10-amd64.exe'),
+        nested.joinpath('python-3.8.10-amd64.exe'),
+    ]
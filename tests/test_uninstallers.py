@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+import pythonup.uninstallers
+
+from pythonup.uninstallers import UNINSTALL_KEY_PATH, UninstallerIndex
+
+
+def register(backend, product_code, **values):
+    root, prefix = UNINSTALL_KEY_PATH
+    for name, value in values.items():
+        backend.set_value(
+            root, '{}\\{}'.format(prefix, product_code), name, value,
+        )
+
+
+@pytest.fixture
+def uninstall_entries(registry_backend):
+    psf = 'Python Software Foundation'
+    register(
+        registry_backend, '{A}',
+        DisplayName='Python 3.4.4 (64-bit)', Publisher=psf,
+    )
+    register(
+        registry_backend, '{B}',
+        DisplayName='Python 2.7.14', Publisher=psf,
+    )
+    register(
+        registry_backend, '{C}',
+        DisplayName='Python 3.4.4 Fake', Publisher='Someone Else',
+    )
+    register(registry_backend, '{D}', DisplayName='Something Else')
+    return registry_backend
+
+
+def test_iter_registered_uninstallers(uninstall_entries):
+    entries = pythonup.uninstallers.iter_registered_uninstallers(
+        uninstall_entries,
+    )
+    assert sorted(entries) == [
+        ('2.7', '2.7.14', '{B}'),
+        ('3.4', '3.4.4', '{A}'),
+    ]
+
+
+def test_record(tmp_path, registry_backend):
+    path = tmp_path.joinpath('uninstallers.json')
+    index = UninstallerIndex(path=path, backend=registry_backend)
+    index.record('2.7', '2.7.14', '{X}')
+    index.record('2.7', '2.7.9', '{Y}')
+
+    index = UninstallerIndex(path=path, backend=registry_backend)
+    assert index.get('2.7', '2.7.14') == '{X}'
+    assert index.get('2.7', '2.7.9') == '{Y}'
+    assert index.get('2.7') == '{X}'
+    assert index.get('2.7', '2.7.15') is None
+    assert index.get('3.4') is None
+
+
+def test_find_recorded_skips_scan(tmp_path, uninstall_entries):
+    index = UninstallerIndex(
+        path=tmp_path.joinpath('uninstallers.json'),
+        backend=uninstall_entries,
+    )
+    index.record('2.7', '2.7.14', '{X}')
+    assert index.find('2.7', '2.7.14') == '{X}'
+    assert uninstall_entries.open_count == 0
+
+
+def test_find_scans_and_writes_back(tmp_path, uninstall_entries):
+    path = tmp_path.joinpath('uninstallers.json')
+    index = UninstallerIndex(path=path, backend=uninstall_entries)
+    assert index.find('3.4', '3.4.4') == '{A}'
+
+    # Everything found is recorded, so the next lookup does not scan.
+    with path.open() as f:
+        assert json.load(f) == {
+            '2.7': {'2.7.14': '{B}'},
+            '3.4': {'3.4.4': '{A}'},
+        }
+    opened = uninstall_entries.open_count
+    index = UninstallerIndex(path=path, backend=uninstall_entries)
+    assert index.find('2.7') == '{B}'
+    assert uninstall_entries.open_count == opened
+
+
+def test_find_not_found(tmp_path, uninstall_entries):
+    index = UninstallerIndex(
+        path=tmp_path.joinpath('uninstallers.json'),
+        backend=uninstall_entries,
+    )
+    with pytest.raises(FileNotFoundError):
+        index.find('3.4', '3.4.3')
+
+
+def test_scan_replaces_stale(tmp_path, uninstall_entries):
+    path = tmp_path.joinpath('uninstallers.json')
+    index = UninstallerIndex(path=path, backend=uninstall_entries)
+    index.record('3.4', '3.4.4', '{Stale}')
+    assert index.scan() == 2
+    assert index.get('3.4', '3.4.4') == '{A}'
+
+
+def test_forget(tmp_path, registry_backend):
+    path = tmp_path.joinpath('uninstallers.json')
+    index = UninstallerIndex(path=path, backend=registry_backend)
+    index.record('2.7', '2.7.14', '{X}')
+    index.record('3.4', '3.4.4', '{Y}')
+    index.forget('2.7')
+
+    index = UninstallerIndex(path=path, backend=registry_backend)
+    assert index.get('2.7') is None
+    assert index.get('3.4') == '{Y}'
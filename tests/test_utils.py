@@ -0,0 +1,222 @@
+import hashlib
+import pathlib
+import queue
+import threading
+
+import pytest
+
+import pythonup.utils
+
+
+PAYLOAD = bytes(range(256)) * 4096     # 1 MiB.
+
+
+@pytest.fixture
+def server(file_server):
+    file_server.files['/python.exe'] = PAYLOAD
+    return file_server
+
+
+@pytest.fixture
+def container(tmpdir):
+    return pathlib.Path(str(tmpdir))
+
+
+def test_download_file(server, container):
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(PAYLOAD).hexdigest(),
+    )
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container, verifier=verifier,
+    )
+    assert path == container.joinpath('python.exe')
+    assert path.read_bytes() == PAYLOAD
+    assert list(container.iterdir()) == [path]
+
+
+def test_download_file_mismatch(server, container):
+    verifier = pythonup.utils.HashVerifier('md5', '0' * 32)
+    with pytest.raises(pythonup.utils.DownloadIntegrityError):
+        pythonup.utils.download_file(
+            server.url('/python.exe'),
+            container=container, verifier=verifier,
+        )
+    assert list(container.iterdir()) == []
+
+
+@pytest.mark.parametrize('total, size', [
+    (None, pythonup.utils.DEFAULT_CHUNK_SIZE),
+    (1024, pythonup.utils.MIN_CHUNK_SIZE),
+    (30 * 1024 * 1024, 30 * 1024 * 1024 // 100),
+    (1024 * 1024 * 1024, pythonup.utils.MAX_CHUNK_SIZE),
+])
+def test_get_chunk_size(total, size):
+    assert pythonup.utils.get_chunk_size(total) == size
+
+
+def test_size_verifier():
+    verifier = pythonup.utils.SizeVerifier(3)
+    verifier.update(b'ab')
+    with pytest.raises(pythonup.utils.DownloadIntegrityError):
+        verifier.verify()
+    verifier.update(b'c')
+    verifier.verify()
+
+
+def get_ranges(server):
+    return [headers.get('Range') for _, _, headers in server.requests]
+
+
+def test_download_file_resume(server, container):
+    server.interruptions['/python.exe'] = 262144
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(PAYLOAD).hexdigest(),
+    )
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container, verifier=verifier,
+    )
+    assert path.read_bytes() == PAYLOAD
+    assert get_ranges(server) == [None, 'bytes=262144-']
+    assert list(container.iterdir()) == [path]
+
+
+def test_download_file_resume_ignored(server, container):
+    server.interruptions['/python.exe'] = 262144
+    server.accept_ranges = False
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(PAYLOAD).hexdigest(),
+    )
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container, verifier=verifier,
+    )
+    assert path.read_bytes() == PAYLOAD
+    assert len(server.requests) == 2
+
+
+def test_download_file_resume_previous_run(server, container):
+    server.interruptions['/python.exe'] = 262144
+    with pytest.raises(pythonup.utils.RESUMABLE_ERRORS):
+        pythonup.utils.download_file(
+            server.url('/python.exe'), container=container, retries=0,
+        )
+    assert container.joinpath('.python.exe.part').stat().st_size == 262144
+
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container,
+    )
+    assert path.read_bytes() == PAYLOAD
+    assert get_ranges(server) == [None, 'bytes=262144-']
+
+
+def test_download_file_resume_changed(server, container):
+    server.interruptions['/python.exe'] = 262144
+    with pytest.raises(pythonup.utils.RESUMABLE_ERRORS):
+        pythonup.utils.download_file(
+            server.url('/python.exe'), container=container, retries=0,
+        )
+
+    # The remote file changed; If-Range makes the server send everything.
+    data = PAYLOAD[::-1]
+    server.files['/python.exe'] = data
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(data).hexdigest(),
+    )
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container, verifier=verifier,
+    )
+    assert path.read_bytes() == data
+
+
+def test_download_file_resume_misplaced(server, container):
+    server.interruptions['/python.exe'] = 262144
+    with pytest.raises(pythonup.utils.RESUMABLE_ERRORS):
+        pythonup.utils.download_file(
+            server.url('/python.exe'), container=container, retries=0,
+        )
+
+    # The server replies to range requests from the wrong offset.
+    class MisplacedRangeHandler(server.RequestHandlerClass):
+        def get_range(self, data, etag):
+            byte_range = super().get_range(data, etag)
+            if byte_range is None:
+                return None
+            return byte_range[0] - 1024, byte_range[1]
+
+    server.RequestHandlerClass = MisplacedRangeHandler
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(PAYLOAD).hexdigest(),
+    )
+    path = pythonup.utils.download_file(
+        server.url('/python.exe'), container=container, verifier=verifier,
+    )
+    assert path.read_bytes() == PAYLOAD
+    assert get_ranges(server) == [None, 'bytes=262144-', None]
+
+
+@pytest.fixture
+def large_server(file_server):
+    file_server.files['/python.exe'] = PAYLOAD * 4
+    return file_server
+
+
+def download_segmented(server, container):
+    data = server.files['/python.exe']
+    verifier = pythonup.utils.HashVerifier(
+        'md5', hashlib.md5(data).hexdigest(),
+    )
+    return pythonup.utils.download_file(
+        server.url('/python.exe'),
+        container=container, verifier=verifier, segments=4,
+    )
+
+
+@pytest.mark.parametrize('length, count, result', [
+    (8, 2, [(0, 4), (4, 8)]),
+    (10, 3, [(0, 4), (4, 7), (7, 10)]),
+])
+def test_split_segments(length, count, result):
+    assert list(pythonup.utils.split_segments(length, count)) == result
+
+
+def test_download_file_segmented(large_server, container):
+    path = download_segmented(large_server, container)
+    assert path.read_bytes() == PAYLOAD * 4
+    methods, _, headers = zip(*large_server.requests)
+    assert methods == ('HEAD', 'GET', 'GET', 'GET', 'GET')
+    assert sorted(h.get('Range') for h in headers[1:]) == [
+        'bytes={}-{}'.format(i * len(PAYLOAD), (i + 1) * len(PAYLOAD) - 1)
+        for i in range(4)
+    ]
+    assert list(container.iterdir()) == [path]
+
+
+def test_download_file_segmented_unsupported(large_server, container):
+    large_server.accept_ranges = False
+    path = download_segmented(large_server, container)
+    assert path.read_bytes() == PAYLOAD * 4
+    assert [r[0] for r in large_server.requests] == ['HEAD', 'GET']
+
+
+def test_download_file_segmented_too_small(server, container):
+    path = download_segmented(server, container)
+    assert path.read_bytes() == PAYLOAD
+    assert [r[0] for r in server.requests] == ['HEAD', 'GET']
+
+
+def test_download_file_segmented_interrupted(large_server, container):
+    large_server.interruptions['/python.exe'] = 262144
+    path = download_segmented(large_server, container)
+    assert path.read_bytes() == PAYLOAD * 4
+    assert len(large_server.requests) == 6
+
+
+def test_fetch_segment_short(server, container):
+    path = container.joinpath('python.exe')
+    path.write_bytes(b'\0' * (len(PAYLOAD) + 1024))
+    start = len(PAYLOAD) - 512
+    with pytest.raises(pythonup.utils.IncompleteDownloadError) as ctx:
+        pythonup.utils.fetch_segment(
+            server.url('/python.exe'), path, start, start + 2048,
+            progress=queue.Queue(), cancelled=threading.Event(), retries=0,
+        )
+    assert str(ctx.value) == 'expect 2048 bytes, got 512'
@@ -1,9 +1,12 @@
 import json
+import os
 import pathlib
 import re
 
+import attr
 import pytest
 
+import pythonup.uninstallers
 import pythonup.versions
 
 
@@ -45,6 +48,7 @@ def test_get_version_cpython_msi():
         url='https://www.python.org/ftp/python/3.4.4/python-3.4.4.amd64.msi',
         md5_sum='963f67116935447fad73e09cc561c713',
         version_info=(3, 4, 4),
+        product_codes={'3.4.4': '{56EBF7CF-F2B2-30ED-9DE5-307FC2CE3449}'},
     )
 
 
@@ -140,3 +144,167 @@ def test_is_installed(tmpdir, mocker):
     version = pythonup.versions.get_version('3.6', force_32=False)
     assert version.is_installed()
     mock_metadata.get_install_path.assert_called_once_with('3.6')
+
+
+@pytest.fixture
+def versions_dir(tmp_path):
+    versions_dir = tmp_path.joinpath('versions')
+    versions_dir.mkdir()
+    for name in ('3.4', '3.6', '3.5'):
+        source = pythonup.versions.VERSIONS_DIR_PATH.joinpath(
+            '{}.json'.format(name),
+        )
+        versions_dir.joinpath(source.name).write_bytes(source.read_bytes())
+    return versions_dir
+
+
+def test_catalog(tmp_path, versions_dir):
+    path = tmp_path.joinpath('catalog.json')
+    pythonup.versions.compile_catalog(path=path, versions_dir=versions_dir)
+    catalog = pythonup.versions.read_catalog(path, versions_dir)
+
+    assert list(catalog) == ['3.4', '3.5', '3.6']
+    for name, data in catalog.items():
+        with versions_dir.joinpath('{}.json'.format(name)).open() as f:
+            assert data == json.load(f)
+
+
+def test_catalog_missing(tmp_path, versions_dir):
+    path = tmp_path.joinpath('catalog.json')
+    assert pythonup.versions.read_catalog(path, versions_dir) is None
+
+
+def test_catalog_wrong_format(tmp_path, versions_dir):
+    path = tmp_path.joinpath('catalog.json')
+    pythonup.versions.compile_catalog(path=path, versions_dir=versions_dir)
+    data = json.loads(path.read_text())
+    data['format'] += 1
+    path.write_text(json.dumps(data))
+    assert pythonup.versions.read_catalog(path, versions_dir) is None
+
+
+@pytest.mark.parametrize('change', [
+    lambda d: d.joinpath('3.5.json').unlink(),
+    lambda d: d.joinpath('3.7.json').write_text(
+        d.joinpath('3.6.json').read_text(),
+    ),
+    lambda d: d.joinpath('3.6.json').write_text(
+        d.joinpath('3.6.json').read_text().replace('3.6.8', '3.6.9'),
+    ),
+], ids=['removed', 'added', 'edited'])
+def test_catalog_stale(tmp_path, versions_dir, change):
+    path = tmp_path.joinpath('catalog.json')
+    pythonup.versions.compile_catalog(path=path, versions_dir=versions_dir)
+    change(versions_dir)
+    assert pythonup.versions.read_catalog(path, versions_dir) is None
+
+
+def test_catalog_touched(tmp_path, versions_dir):
+    path = tmp_path.joinpath('catalog.json')
+    pythonup.versions.compile_catalog(path=path, versions_dir=versions_dir)
+    touched = versions_dir.joinpath('3.6.json')
+    stat = touched.stat()
+    os.utime(str(touched), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert pythonup.versions.read_catalog(path, versions_dir) is not None
+
+
+def test_get_version_from_catalog(mocker, tmp_path):
+    path = tmp_path.joinpath('catalog.json')
+    pythonup.versions.compile_catalog(path=path)
+    original_read = pythonup.versions.read_catalog
+    mocker.patch.object(
+        pythonup.versions, 'read_catalog',
+        lambda: original_read(path=path),
+    )
+    pythonup.versions.invalidate_catalog()
+    try:
+        assert pythonup.versions.get_catalog() is not None
+        mock_open = mocker.patch.object(pathlib.Path, 'open')
+        version = pythonup.versions.get_version('3.5', force_32=False)
+        mock_open.assert_not_called()
+    finally:
+        pythonup.versions.invalidate_catalog()
+    assert version.version_info == (3, 5, 4)
+
+
+def test_get_version_interned():
+    version = pythonup.versions.get_version('3.6', force_32=False)
+    assert pythonup.versions.get_version('3.6', force_32=False) is version
+    assert pythonup.versions.get_version('3.6', force_32=True) is not version
+
+
+def test_version_hashable():
+    versions = {
+        pythonup.versions.get_version('3.4', force_32=False),
+        pythonup.versions.get_version('3.6', force_32=False),
+        pythonup.versions.get_version('3.6', force_32=False),
+    }
+    assert {v.name for v in versions} == {'3.4', '3.6'}
+
+
+def test_version_frozen():
+    version = pythonup.versions.get_version('3.6', force_32=False)
+    with pytest.raises(attr.exceptions.FrozenInstanceError):
+        version.name = '3.7'
+    assert not hasattr(version, '__dict__')
+
+
+def test_version_paths_cached(mocker):
+    mock_configs = mocker.patch.object(pythonup.versions, 'configs', **{
+        'get_cmd_dir_path.return_value': pathlib.Path('cmd'),
+        'get_scripts_dir_path.return_value': pathlib.Path('scripts'),
+    })
+    version = pythonup.versions.get_version('3.6', force_32=True)
+    for _ in range(3):
+        assert sorted(version.python_commands) == [
+            pathlib.Path('cmd', 'python3.6-32.exe'),
+            pathlib.Path('cmd', 'python3.6.exe'),
+        ]
+        assert sorted(version.pip_commands) == [
+            pathlib.Path('cmd', 'pip3.6-32.exe'),
+            pathlib.Path('cmd', 'pip3.6.exe'),
+        ]
+        assert version.python_major_command == pathlib.Path(
+            'scripts', 'python3.exe',
+        )
+    mock_configs.get_cmd_dir_path.assert_called_once_with()
+    mock_configs.get_scripts_dir_path.assert_called_once_with()
+
+
+@pytest.fixture
+def uninstaller_index(mocker, tmp_path, registry_backend):
+    index = pythonup.uninstallers.UninstallerIndex(
+        path=tmp_path.joinpath('uninstallers.json'), backend=registry_backend,
+    )
+    mocker.patch.object(
+        pythonup.uninstallers, 'get_uninstaller_index', return_value=index,
+    )
+    return index
+
+
+def test_msi_install_records_product_code(mocker, uninstaller_index):
+    mocker.patch.object(
+        pythonup.uninstallers, 'read_msi_product_code', return_value='{X}',
+    )
+    version = pythonup.versions.get_version('3.4', force_32=False)
+    version._record_product_code('python-3.4.4.amd64.msi')
+    assert uninstaller_index.get('3.4', '3.4.4') == '{X}'
+
+
+def test_msi_install_scans_if_unreadable(mocker, uninstaller_index):
+    mocker.patch.object(
+        pythonup.uninstallers, 'read_msi_product_code', side_effect=OSError,
+    )
+    mock_scan = mocker.patch.object(uninstaller_index, 'scan')
+    version = pythonup.versions.get_version('3.4', force_32=False)
+    version._record_product_code('python-3.4.4.amd64.msi')
+    mock_scan.assert_called_once_with()
+
+
+def test_msi_uninstall_forgets(mocker, uninstaller_index):
+    mock_call = mocker.patch('subprocess.check_call')
+    uninstaller_index.record('3.4', '3.4.4', '{X}')
+    version = pythonup.versions.get_version('3.4', force_32=False)
+    version.uninstall('{X}')
+    mock_call.assert_called_once_with('msiexec /x "{X}" /qb', shell=True)
+    assert uninstaller_index.get('3.4') is None
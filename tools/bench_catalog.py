@@ -0,0 +1,86 @@
+"""Compare version lookups with and without the compiled catalog.
+
+Times ``get_versions()`` (what ``pythonup list --all`` does) and a lookup of
+every version by name, and counts files opened by each.
+"""
+
+import argparse
+import builtins
+import contextlib
+import functools
+import pathlib
+import sys
+import tempfile
+import time
+import unittest.mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+if sys.platform != 'win32':
+    sys.modules['winreg'] = unittest.mock.Mock()
+
+import pythonup.versions     # noqa: E402
+
+
+@contextlib.contextmanager
+def count_opens():
+    counter = {'opens': 0}
+    original_open = builtins.open
+    original_path_open = pathlib.Path.open
+
+    def counting_open(*args, **kwargs):
+        counter['opens'] += 1
+        return original_open(*args, **kwargs)
+
+    def counting_path_open(self, *args, **kwargs):
+        counter['opens'] += 1
+        return original_path_open(self, *args, **kwargs)
+
+    with unittest.mock.patch.object(builtins, 'open', counting_open), \
+            unittest.mock.patch.object(pathlib.Path, 'open',
+                                       counting_path_open):
+        yield counter
+
+
+def run(iterations):
+    names = pythonup.versions.get_version_names()
+    with count_opens() as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            pythonup.versions.invalidate_catalog()
+            pythonup.versions.get_versions()
+            for name in names:
+                pythonup.versions.get_version(name, force_32=True)
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations, counter['opens'] / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = pathlib.Path(tmp, 'catalog.json')
+        pythonup.versions.compile_catalog(path=catalog_path)
+
+        original_read = pythonup.versions.read_catalog
+        with unittest.mock.patch.object(
+                pythonup.versions, 'read_catalog', lambda: None):
+            raw_time, raw_opens = run(options.iterations)
+        with unittest.mock.patch.object(
+                pythonup.versions, 'read_catalog',
+                functools.partial(original_read, path=catalog_path)):
+            catalog_time, catalog_opens = run(options.iterations)
+        pythonup.versions.invalidate_catalog()
+
+    print('JSON files: {:8.3f} ms, {:5.1f} files opened'.format(
+        raw_time * 1000, raw_opens,
+    ))
+    print('Catalog:    {:8.3f} ms, {:5.1f} files opened'.format(
+        catalog_time * 1000, catalog_opens,
+    ))
+
+
+if __name__ == '__main__':
+    main()
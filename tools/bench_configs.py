@@ -0,0 +1,118 @@
+"""Count filesystem calls made by configuration lookups.
+
+Sets up a throwaway installation layout, and runs the lookups one
+``pythonup use`` makes, counting calls into ``os``. Lookups are run once
+with the configuration reloaded before each of them (as it was before it
+was memoized), and once with the configuration loaded once.
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import unittest.mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from pythonup import configs     # noqa: E402
+
+
+COUNTED_FUNCTIONS = [
+    (os, 'stat'), (os, 'lstat'), (os, 'mkdir'), (os, 'open'),
+    (os, 'readlink'), (os, 'utime'), (os, 'scandir'),
+    (builtins, 'open'), (io, 'open'),
+]
+
+
+@contextlib.contextmanager
+def count_calls():
+    counter = {'calls': 0}
+
+    def wrap(function):
+        def wrapped(*args, **kwargs):
+            counter['calls'] += 1
+            return function(*args, **kwargs)
+        return wrapped
+
+    with contextlib.ExitStack() as stack:
+        for module, name in COUNTED_FUNCTIONS:
+            function = getattr(module, name)
+            stack.enter_context(
+                unittest.mock.patch.object(module, name, wrap(function)),
+            )
+        yield counter
+
+
+def make_installation(root):
+    package = root.joinpath('pythonup')
+    package.mkdir()
+    path = package.joinpath('installation.json')
+    path.write_text(json.dumps({
+        'base_dir': '..',
+        'cmd_dir': '../cmd',
+        'scripts_dir': '../scripts',
+        'shims_dir': '../shims',
+    }))
+    return path
+
+
+def lookup(reload):
+    # Roughly what activating a couple of versions asks for.
+    for _ in range(3):
+        if reload:
+            configs.invalidate()
+        configs.get_active_names()
+        for _ in range(4):
+            if reload:
+                configs.invalidate()
+            configs.get_cmd_dir_path()
+            configs.get_scripts_dir_path()
+            configs.get_shim_path()
+
+
+def make_getter(path):
+    def get_configuration():
+        if configs._configuration is None:
+            configs._configuration = configs.Configuration(path=path)
+        return configs._configuration
+    return get_configuration
+
+
+def run(path, reload, iterations):
+    getter = make_getter(path)
+    with unittest.mock.patch.object(configs, 'get_configuration', getter), \
+            count_calls() as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            configs.invalidate()
+            lookup(reload)
+        elapsed = time.perf_counter() - start
+    configs.invalidate()
+    return elapsed / iterations, counter['calls'] / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_installation(pathlib.Path(tmp))
+        reloaded = run(path, True, options.iterations)
+        memoized = run(path, False, options.iterations)
+
+    for label, (elapsed, calls) in [
+            ('Reloaded', reloaded), ('Memoized', memoized)]:
+        print('{}: {:8.3f} ms, {:6.1f} filesystem calls'.format(
+            label, elapsed * 1000, calls,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compare one-off requests against the pooled PythonUp session.
+
+Starts a local HTTPS server with a throwaway self-signed certificate (needs
+the ``openssl`` command), and times a series of small GET requests, first
+with a fresh connection for each request (what ``requests.get`` does), then
+through ``pythonup.httpclient.Session``, which keeps the connection alive.
+"""
+
+import argparse
+import http.server
+import pathlib
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from pythonup import httpclient     # noqa: E402
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b'{"meta": {"next": null}, "objects": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def make_certificate(directory):
+    cert = directory.joinpath('cert.pem')
+    key = directory.joinpath('key.pem')
+    subprocess.check_call([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+        '-keyout', str(key), '-out', str(cert), '-days', '1',
+        '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def start_server(cert, key):
+    server = Server(('127.0.0.1', 0), Handler)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(str(cert), str(key))
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def measure(get, url, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        get(url).raise_for_status()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_certificate(pathlib.Path(tmp))
+        server = start_server(cert, key)
+        url = 'https://127.0.0.1:{}/api/'.format(server.server_port)
+
+        def get_unpooled(url):
+            return requests.get(url, verify=str(cert))
+
+        session = httpclient.Session()
+
+        def get_pooled(url):
+            return session.get(url, verify=str(cert))
+
+        unpooled = measure(get_unpooled, url, options.requests)
+        pooled = measure(get_pooled, url, options.requests)
+        server.shutdown()
+
+    print('{} requests each'.format(options.requests))
+    print('requests.get:       {:8.3f} ms/request'.format(unpooled * 1000))
+    print('httpclient.Session: {:8.3f} ms/request'.format(pooled * 1000))
+    print('Saved per request:  {:8.3f} ms ({:.1f}x)'.format(
+        (unpooled - pooled) * 1000, unpooled / pooled,
+    ))
+
+
+if __name__ == '__main__':
+    main()
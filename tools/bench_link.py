@@ -0,0 +1,78 @@
+"""Compare link strategies for publishing scripts.
+
+Builds a synthetic Scripts directory with many large executables, and times
+publishing all of them into an empty directory, then again when they are
+already published, with each strategy.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import unittest.mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+if sys.platform != 'win32':
+    sys.modules['winreg'] = unittest.mock.Mock()
+
+from pythonup.operations import link     # noqa: E402
+
+
+def publish_all(sources, target_dir, overwrite, strategy):
+    for source in sources:
+        link.publish_file(
+            source, target_dir.joinpath(source.name),
+            overwrite=overwrite, quiet=True, strategy=strategy,
+        )
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scripts', type=int, default=300)
+    parser.add_argument('--size', type=int, default=1024 * 1024)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        source_dir = root.joinpath('Scripts')
+        source_dir.mkdir()
+        sources = []
+        for i in range(options.scripts):
+            source = source_dir.joinpath('tool{}.exe'.format(i))
+            source.write_bytes(os.urandom(options.size))
+            sources.append(source)
+
+        results = []
+        for strategy in link.LinkStrategy:
+            target_dir = root.joinpath(strategy.value)
+            target_dir.mkdir()
+            fresh = measure(
+                publish_all, sources, target_dir,
+                link.Overwrite.yes, strategy,
+            )
+            again = measure(
+                publish_all, sources, target_dir,
+                link.Overwrite.smart, strategy,
+            )
+            results.append((strategy.value, fresh, again))
+
+    print('{} scripts, {} KiB each'.format(
+        options.scripts, options.size // 1024,
+    ))
+    for label, fresh, again in results:
+        print('{:8}  publish {:8.1f} ms, re-check {:8.1f} ms'.format(
+            label, fresh * 1000, again * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    main()
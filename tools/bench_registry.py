@@ -0,0 +1,84 @@
+"""Compare per-name registry lookups against the registry snapshot.
+
+Uses an in-memory registry with a few Pythons registered, and looks up every
+known version the way ``pythonup list`` does, counting keys opened. The
+per-name lookup is what ``metadata.get_install_path`` did before the
+snapshot: try each root in turn for every name.
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+import unittest.mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+if sys.platform != 'win32':
+    sys.modules['winreg'] = unittest.mock.Mock()
+
+from pythonup import registry, versions     # noqa: E402
+
+
+def lookup_per_name(backend, name):
+    for root, prefix in registry.PYTHON_KEY_PATHS:
+        keypath = '{}\\{}\\InstallPath'.format(prefix, name)
+        try:
+            return backend.query_value(root, keypath)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def lookup_snapshot(backend, name):
+    return registry.get_install_paths().get(name)
+
+
+def make_backend(installed):
+    backend = registry.MemoryBackend()
+    root, prefix = registry.PYTHON_KEY_PATHS[0]
+    for name in installed:
+        backend.set_value(
+            root, '{}\\{}\\InstallPath'.format(prefix, name), '',
+            'C:\\Python{}'.format(name.replace('.', '')),
+        )
+    return backend
+
+
+def run(lookup, names, installed, iterations):
+    backend = make_backend(installed)
+    registry.set_backend(backend)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        registry.invalidate()
+        # Listing checks each name, then each installed one is looked up
+        # again to inspect the installation.
+        found = [n for n in names if lookup(backend, n) is not None]
+        for name in found:
+            lookup(backend, name)
+    elapsed = time.perf_counter() - start
+    return elapsed / iterations, backend.open_count / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=1000)
+    options = parser.parse_args()
+
+    names = versions.get_version_names()
+    installed = names[-3:]
+    results = [
+        (label, run(lookup, names, installed, options.iterations))
+        for label, lookup in [
+            ('Per-name', lookup_per_name), ('Snapshot', lookup_snapshot),
+        ]
+    ]
+    print('{} versions, {} installed'.format(len(names), len(installed)))
+    for label, (elapsed, opens) in results:
+        print('{}: {:8.3f} ms, {:6.1f} keys opened'.format(
+            label, elapsed * 1000, opens,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Time the relink a pip shim runs after pip, when pip changed nothing.
+
+Builds a synthetic Scripts directory, takes a snapshot of it, and times
+``python -m pythonup.relink`` against it. For comparison, it also times a
+process that only imports what ``python -m pythonup link --all`` (the hook
+before the dedicated entry point) needs. That is a lower bound, since the
+old hook went on to check every script as well.
+"""
+
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT))
+
+from pythonup import relink     # noqa: E402
+
+
+LINK_IMPORTS = (
+    'import sys, unittest.mock\n'
+    'if sys.platform != "win32":\n'
+    '    sys.modules["winreg"] = unittest.mock.Mock()\n'
+    'import pythonup.__main__, pythonup.operations.link\n'
+)
+
+
+def measure(cmd, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.check_call(cmd, cwd=str(ROOT))
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scripts', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=20)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        scripts_dir = root.joinpath('Scripts')
+        scripts_dir.mkdir()
+        for i in range(options.scripts):
+            scripts_dir.joinpath('tool{}.exe'.format(i)).write_bytes(
+                os.urandom(1024),
+            )
+        path = root.joinpath(relink.SNAPSHOT_NAME)
+        relink.save_snapshot(path, relink.take_snapshot([scripts_dir]))
+
+        noop = measure(
+            [sys.executable, '-m', 'pythonup.relink', str(path)],
+            options.runs,
+        )
+        old = measure([sys.executable, '-c', LINK_IMPORTS], options.runs)
+
+    print('{} scripts, {} runs each'.format(options.scripts, options.runs))
+    print('pythonup.relink (no-op): {:8.1f} ms'.format(noop * 1000))
+    print('link --all imports only: {:8.1f} ms'.format(old * 1000))
+    print('Saved per pip command:   {:8.1f} ms'.format((old - noop) * 1000))
+
+
+if __name__ == '__main__':
+    main()
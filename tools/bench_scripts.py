@@ -0,0 +1,91 @@
+"""Time finding scripts to publish, as Scripts directories grow.
+
+Builds synthetic Scripts directories of increasing sizes, and times the
+scanner in ``pythonup.operations.link`` against a walk like the one it
+replaced: ``Path.iterdir()``, classification rules rebuilt for each file,
+then an ``is_file()`` and a ``stat()`` call for each script.
+"""
+
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+import unittest.mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+if sys.platform != 'win32':
+    sys.modules['winreg'] = unittest.mock.Mock()
+
+from pythonup import manifests              # noqa: E402
+from pythonup.operations import link        # noqa: E402
+
+
+class FakeVersion:
+    arch_free_name = '3.6'
+    version_info = (3, 6, 8)
+
+
+def walk_scripts(version, scripts_dir):
+    found = []
+    for path in scripts_dir.iterdir():
+        blacklisted_stems = {
+            'easy_install', 'pip', 'pip{}'.format(version.arch_free_name),
+        }
+        shimmed_stems = {
+            'pip{}'.format(version.version_info[0]),
+            'easy_install-{}'.format(version.arch_free_name),
+        }
+        if path.stem in blacklisted_stems:
+            continue
+        kind = 'shim' if path.stem in shimmed_stems else 'file'
+        if path.is_file():
+            found.append((path, kind, manifests.get_stat(path)))
+    return found
+
+
+def scan_scripts(version, scripts_dir):
+    return link.scan_scripts([(version, scripts_dir)])
+
+
+def measure(function, *args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    version = FakeVersion()
+    print('{:>8} {:>12} {:>12} {:>8}'.format(
+        'scripts', 'walk (ms)', 'scan (ms)', 'speedup',
+    ))
+    for size in options.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            scripts_dir = pathlib.Path(tmp)
+            for i in range(size):
+                scripts_dir.joinpath('tool{}.exe'.format(i)).write_bytes(b'')
+            walk = measure(
+                walk_scripts, version, scripts_dir, repeat=options.repeat,
+            )
+            scan = measure(
+                scan_scripts, version, scripts_dir, repeat=options.repeat,
+            )
+        print('{:>8} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(
+            size, walk * 1000, scan * 1000, walk / scan,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare shim checks and writes, before and after pythonup.shimio.
+
+Builds a synthetic scripts directory with many shims, then times checking
+whether every shim is up to date, and rewriting every shim. The "full
+read" numbers read the whole target to compare, and re-read the template
+for each write, as publish_shim used to.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from pythonup import shimio     # noqa: E402
+
+
+def make_trailers(count):
+    return [
+        shimio.encode_trailer([
+            ['C:\\Python36\\Scripts\\tool{}.exe'.format(i)],
+            ['C:\\PythonUp\\python.exe', '-m', 'pythonup', 'link', '--all'],
+        ])
+        for i in range(count)
+    ]
+
+
+def check_full_read(template_path, targets, trailers):
+    return all(
+        target.read_bytes().endswith(trailer)
+        for target, trailer in zip(targets, trailers)
+    )
+
+
+def write_full_read(template_path, targets, trailers):
+    for target, trailer in zip(targets, trailers):
+        target.write_bytes(template_path.read_bytes() + trailer)
+
+
+def check_shimio(template_path, targets, trailers):
+    template = shimio.ShimTemplate.load(template_path)
+    return all(
+        template.matches(target, trailer)
+        for target, trailer in zip(targets, trailers)
+    )
+
+
+def write_shimio(template_path, targets, trailers):
+    template = shimio.ShimTemplate.load(template_path)
+    for target, trailer in zip(targets, trailers):
+        template.write(target, trailer)
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shims', type=int, default=500)
+    parser.add_argument('--template-size', type=int, default=256 * 1024)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        template_path = root.joinpath('shim.exe')
+        template_path.write_bytes(os.urandom(options.template_size))
+        scripts_dir = root.joinpath('Scripts')
+        scripts_dir.mkdir()
+        targets = [
+            scripts_dir.joinpath('tool{}.exe'.format(i))
+            for i in range(options.shims)
+        ]
+        trailers = make_trailers(options.shims)
+
+        results = []
+        for label, check, write in [
+                ('Full read', check_full_read, write_full_read),
+                ('shimio', check_shimio, write_shimio)]:
+            write_elapsed = measure(write, template_path, targets, trailers)
+            check_elapsed = measure(check, template_path, targets, trailers)
+            results.append((label, check_elapsed, write_elapsed))
+
+    print('{} shims, {} KiB template'.format(
+        options.shims, options.template_size // 1024,
+    ))
+    for label, check_elapsed, write_elapsed in results:
+        print('{:10} check {:8.2f} ms, write {:8.2f} ms'.format(
+            label, check_elapsed * 1000, write_elapsed * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,17 @@ import json
 import pathlib
 import sys
 
-import requests
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from pythonup import httpclient     # noqa: E402
+
+
+HTTP_SESSION = httpclient.Session()
 
 
 def download_data(url):
     print('Downloading', url, '... ', end='', flush=True)
-    response = requests.get(url)
+    response = HTTP_SESSION.get(url)
     response.raise_for_status()
     print('Done')
     return response.content
@@ -0,0 +1,22 @@
+"""Compile pythonup/versions into pythonup/catalog.json.
+
+The installer build does this automatically. Run this to use the catalog in
+a development environment; it is ignored (and PythonUp reads the definitions
+directly) whenever a definition changes afterwards.
+"""
+
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import pythonup.versions     # noqa: E402
+
+
+def main():
+    pythonup.versions.compile_catalog()
+    print('Catalog written to', pythonup.versions.CATALOG_PATH)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,9 @@ import re
 import sys
 import urllib.parse
 
-import requests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pythonup import httpclient     # noqa: E402
 
 
 BLACKLISTED_IDS = {
@@ -42,9 +44,13 @@ def parse_arguments(argv=None):
     return parser.parse_args(argv)
 
 
+# The python.org API is paginated; reuse one connection for all the pages.
+HTTP_SESSION = httpclient.Session()
+
+
 def _get_page(url, params):
     headers = {'Accept': 'application/json'}
-    response = requests.get(url, params=params, headers=headers)
+    response = HTTP_SESSION.get(url, params=params, headers=headers)
     try:
         response.raise_for_status()
     except Exception: